@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Output-format benchmark: bytes and serialisation time for pretty / compact / columnar
+
+Usage:
+    python bench_format.py
+    python bench_format.py --league-rows 1000,100000
+"""
+
+import argparse
+import json
+import statistics
+import sys
+import time
+
+import sport5_format
+from sport5_extract import parse_league_table
+from sport5_format import FORMATS, serialize
+from sport5_standin import synthetic_league_page
+
+
+def timeit(func, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--league-rows", default="500,10000,100000", help="comma separated league sizes")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"fast serializer: {'orjson' if sport5_format.orjson is not None else 'not installed (json fallback)'}")
+    for rows in (int(size) for size in args.league_rows.split(",")):
+        table = parse_league_table(synthetic_league_page(rows))
+        table["login_method"] = "credentials"
+
+        # The original output: json.dumps(..., indent=2) on every tool result
+        baseline = json.dumps(table, ensure_ascii=False, indent=2)
+        baseline_bytes = len(baseline.encode("utf-8"))
+        baseline_time = timeit(lambda: json.dumps(table, ensure_ascii=False, indent=2), args.repeat)
+        print(f"\nleague:{rows}  json indent=2  {baseline_bytes / 1024:>9.1f} KiB  {baseline_time * 1000:>8.2f} ms")
+
+        for fmt in FORMATS:
+            size = len(serialize(table, fmt).encode("utf-8"))
+            elapsed = timeit(lambda: serialize(table, fmt), args.repeat)
+            print(
+                f"league:{rows}  {fmt:<13}  {size / 1024:>9.1f} KiB  {elapsed * 1000:>8.2f} ms  "
+                f"bytes {size / baseline_bytes:>6.1%}  time {elapsed / baseline_time:>6.1%}"
+            )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Benchmark for the columnar history store
+
+Grows a league history round by round and, at each checkpoint, measures:
+  * append time for one round
+  * query time for a single team's series, a per-team aggregate over all
+    rounds and a CSV export
+  * peak Python/NumPy memory allocated by each query (tracemalloc), which
+    should stay flat as the number of stored rounds grows, since the columns
+    are read through memory maps in bounded chunks
+
+Usage:
+    python bench_history.py
+    python bench_history.py --teams 100000 --rounds 38 --checkpoints 1 10 38
+    python bench_history.py --output history.json
+"""
+
+import argparse
+import io
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from sport5_history import HistoryStore
+
+ACCOUNT = "bench"
+
+
+def league_round(teams, rng, previous=None):
+    points = previous or [0] * teams
+    points = [p + rng.randint(0, 90) for p in points]
+    order = sorted(range(teams), key=lambda i: -points[i])
+    rows = [None] * teams
+    for rank, i in enumerate(order):
+        rows[rank] = {"position": str(rank + 1), "team_name": f"קבוצה {i}", "points": str(points[i])}
+    return {"teams": rows}, points
+
+
+def measure(fn):
+    """(result, elapsed ms, peak allocated KiB)"""
+    tracemalloc.start()
+    started = time.perf_counter()
+    result = fn()
+    elapsed = (time.perf_counter() - started) * 1000
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, round(elapsed, 2), round(peak / 1024, 1)
+
+
+def run(teams, rounds, checkpoints, directory):
+    store = HistoryStore(directory)
+    rng = random.Random(0)
+    points = None
+    rows = []
+    for number in range(1, rounds + 1):
+        data, points = league_round(teams, rng, points)
+        started = time.perf_counter()
+        store.record(ACCOUNT, "league", data)
+        append_ms = round((time.perf_counter() - started) * 1000, 1)
+        if number not in checkpoints:
+            continue
+
+        store = HistoryStore(directory)  # a fresh store reading only what is on disk
+        _, load_ms, _ = measure(lambda: store._dictionary(ACCOUNT))
+        _, series_ms, series_kib = measure(lambda: store.query(ACCOUNT, "league", key="קבוצה 7", field="position"))
+        _, aggregate_ms, aggregate_kib = measure(lambda: store.query(ACCOUNT, "league", aggregate="max", limit=10))
+        _, change_ms, change_kib = measure(lambda: store.query(ACCOUNT, "league", aggregate="change", limit=10))
+        size = sum(os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(directory) for name in names)
+        row = {
+            "rounds": number,
+            "stored_rows": number * teams,
+            "disk_mb": round(size / 1e6, 1),
+            "append_ms": append_ms,
+            "dictionary_load_ms": load_ms,
+            "series_ms": series_ms,
+            "series_peak_kib": series_kib,
+            "aggregate_ms": aggregate_ms,
+            "aggregate_peak_kib": aggregate_kib,
+            "change_ms": change_ms,
+            "change_peak_kib": change_kib,
+        }
+        rows.append(row)
+        print(f"{number:>6}  {row['stored_rows']:>10}  {row['disk_mb']:>7.1f}  {append_ms:>8.1f}  "
+              f"{series_ms:>7.2f} / {series_kib:>7.1f}  {aggregate_ms:>7.2f} / {aggregate_kib:>7.1f}  "
+              f"{change_ms:>7.2f} / {change_kib:>7.1f}")
+
+    out = io.StringIO()
+    started = time.perf_counter()
+    store.export_csv(ACCOUNT, "league", out)
+    export_ms = (time.perf_counter() - started) * 1000
+    print(f"\nCSV export of {rounds * teams} rows: {export_ms:.0f} ms, {len(out.getvalue()) / 1e6:.1f} MB")
+    return rows, export_ms
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--teams", type=int, default=20000, help="league rows per round")
+    parser.add_argument("--rounds", type=int, default=38)
+    parser.add_argument("--checkpoints", type=int, nargs="+", default=[1, 5, 20, 38])
+    parser.add_argument("--output", help="write results as JSON to this file")
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp(prefix="sport5-history-")
+    print(f"{'rounds':>6}  {'rows':>10}  {'disk MB':>7}  {'append':>8}  "
+          f"{'series ms / KiB':>17}  {'max ms / KiB':>17}  {'change ms / KiB':>17}")
+    try:
+        rows, export_ms = run(args.teams, args.rounds, set(args.checkpoints), directory)
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"teams": args.teams, "checkpoints": rows, "export_ms": export_ms}, f, indent=2)
+        print(f"Results written to {args.output}")
+
+    # query memory must not track the history size; the baseline is the second checkpoint
+    # because the first one can hold less than one scan chunk
+    if len(rows) > 2:
+        first, last = rows[1], rows[-1]
+        growth = max(last[key] / max(first[key], 1.0) for key in ("series_peak_kib", "aggregate_peak_kib"))
+        print(f"Peak query memory grew {growth:.1f}x while stored rows grew "
+              f"{last['stored_rows'] / first['stored_rows']:.0f}x")
+        if growth > 2:
+            print("❌ Query memory grows with the history")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Benchmark and correctness check for the squad optimizer
+
+  * quality: on small random instances (few players per position, small quotas),
+    the optimizer's objective must equal an exhaustive brute force, in both
+    squad mode and transfer mode
+  * runtime: full-size synthetic player pools (default 600, 2000 and 5000
+    players) with the real quotas, budget and club limit
+
+Usage:
+    python bench_optimizer.py
+    python bench_optimizer.py --instances 100 --pools 600 5000 --budget-ms 1000
+    python bench_optimizer.py --output optimizer.json
+"""
+
+import argparse
+import itertools
+import json
+import random
+import statistics
+import sys
+import time
+
+from sport5_optimizer import SquadOptimizer
+from sport5_standin import POSITIONS, synthetic_player
+
+SMALL_QUOTAS = {"GK": 1, "DEF": 2, "MID": 2, "FWD": 1}
+
+
+def pool(size, seed=0):
+    players = []
+    for player_id in range(size):
+        player = synthetic_player(player_id, seed)
+        player["price"] = float(player["price"][:-1])
+        player["points"] = float(player["points"])
+        players.append(player)
+    return players
+
+
+def small_instance(rng, per_position=5, clubs=4):
+    players = []
+    for position in POSITIONS:
+        for _ in range(per_position):
+            players.append({
+                "id": str(len(players)),
+                "name": f"player {len(players)}",
+                "club": f"club {rng.randint(1, clubs)}",
+                "position": position,
+                "price": rng.randint(40, 130) / 10,
+                "points": float(rng.randint(0, 180)),
+            })
+    return players
+
+
+def brute_force(optimizer):
+    """Best objective by enumerating every squad that meets the quotas (None when none is feasible)"""
+    per_position = []
+    for code, quota in enumerate(optimizer.quotas.values()):
+        members = [i for i in range(len(optimizer.players)) if optimizer.position[i] == code]
+        per_position.append(list(itertools.combinations(members, quota)))
+
+    best = None
+    for parts in itertools.product(*per_position):
+        squad = [i for part in parts for i in part]
+        if optimizer.cost[squad].sum() > optimizer.capacity:
+            continue
+        if optimizer.max_transfers is not None and optimizer.transfer[squad].sum() > optimizer.max_transfers:
+            continue
+        clubs = [optimizer.club[i] for i in squad]
+        if max(clubs.count(club) for club in set(clubs)) > optimizer.max_per_club:
+            continue
+        value = optimizer.value[squad].sum()
+        if best is None or value > best:
+            best = value
+    return best
+
+
+def check_quality(instances, seed=0):
+    """Compare against brute force; returns (checked, mismatches)"""
+    rng = random.Random(seed)
+    checked, mismatches = 0, []
+    for n in range(instances):
+        players = small_instance(rng)
+        budget = rng.randint(320, 520) / 10
+        kwargs = {"quotas": SMALL_QUOTAS, "max_per_club": 2}
+        if n % 2:
+            owned = rng.sample([p["id"] for p in players], sum(SMALL_QUOTAS.values()))
+            kwargs.update(owned_ids=owned, max_transfers=rng.randint(0, 3))
+
+        expected = brute_force(SquadOptimizer(players, budget, **kwargs))
+        result = SquadOptimizer(players, budget, **kwargs).solve(time_limit=10)
+        got = result.get("projected_points")
+        checked += 1
+        if expected is None:
+            if "error" not in result:
+                mismatches.append({"instance": n, "expected": None, "got": got})
+        elif got is None or abs(got - round(float(expected), 2)) > 0.011 or not result["optimal"]:
+            mismatches.append({"instance": n, "expected": round(float(expected), 2), "got": got})
+    return checked, mismatches
+
+
+def measure_pool(size, runs=3, budget=100.0, max_transfers=2):
+    players = pool(size)
+    # the current squad for transfer mode: the best squad on a tighter budget, so transfers can improve it
+    owned = [p["id"] for p in SquadOptimizer(players, budget - 15).solve(time_limit=5)["squad"]]
+    rows = {}
+    for mode in ("squad", "transfers"):
+        kwargs = {"owned_ids": owned, "max_transfers": max_transfers} if mode == "transfers" else {}
+        timings, result = [], None
+        for _ in range(runs):
+            started = time.perf_counter()
+            result = SquadOptimizer(players, budget, **kwargs).solve(time_limit=5)
+            timings.append((time.perf_counter() - started) * 1000)
+        rows[mode] = {
+            "median_ms": round(statistics.median(timings), 1),
+            "optimal": result.get("optimal"),
+            "projected_points": result.get("projected_points"),
+            "nodes": result.get("nodes"),
+            "pruned": result.get("pruned"),
+        }
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--instances", type=int, default=60, help="small brute-force instances to check")
+    parser.add_argument("--pools", type=int, nargs="+", default=[600, 2000, 5000], help="full pool sizes to time")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--budget-ms", type=float, default=1000, help="fail if a full-pool solve is slower")
+    parser.add_argument("--output", help="write results as JSON to this file")
+    args = parser.parse_args()
+
+    checked, mismatches = check_quality(args.instances)
+    print(f"brute force: {checked - len(mismatches)}/{checked} instances match")
+    for mismatch in mismatches[:10]:
+        print(f"  instance {mismatch['instance']}: expected {mismatch['expected']}, got {mismatch['got']}")
+
+    timings = {}
+    print(f"\n{'pool':>6}  {'mode':<10} {'median':>10}  {'nodes':>6}  {'pruned':>7}  optimal")
+    for size in args.pools:
+        timings[size] = measure_pool(size, args.runs)
+        for mode, row in timings[size].items():
+            print(f"{size:>6}  {mode:<10} {row['median_ms']:>7.1f} ms  {row['nodes']:>6}  "
+                  f"{row['pruned']:>7}  {row['optimal']}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"checked": checked, "mismatches": mismatches, "timings": timings}, f, indent=2)
+        print(f"\nResults written to {args.output}")
+
+    slow = [(size, mode) for size, rows in timings.items() for mode, row in rows.items()
+            if row["median_ms"] > args.budget_ms or not row["optimal"]]
+    if mismatches:
+        print(f"\n❌ {len(mismatches)} instances differ from brute force")
+    if slow:
+        print(f"❌ Over the {args.budget_ms:.0f} ms budget or not proven optimal: {slow}")
+    return 1 if mismatches or slow else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Parse-time benchmark: lxml extraction engine vs. the original BeautifulSoup path
+
+Usage:
+    python bench_parse.py                               # synthetic pages
+    python bench_parse.py --team-page my-team.html --league-page league.html
+"""
+
+import argparse
+import statistics
+import sys
+import time
+
+from bs4 import BeautifulSoup
+
+from sport5_extract import parse_league_table, parse_league_window, parse_my_team
+from sport5_standin import synthetic_league_page, synthetic_team_page
+
+
+def legacy_parse_my_team(html):
+    """The BeautifulSoup extraction that get_my_team used before sport5_extract,
+    plus the captain field added since, so both paths extract the same data"""
+    soup = BeautifulSoup(html, 'html.parser')
+    team_data = {"players": [], "budget": None, "points": None, "team_name": None, "captain": None}
+
+    team_name_elem = soup.find(['h1', 'h2'], class_=lambda x: x and 'team' in x.lower())
+    if team_name_elem:
+        team_data["team_name"] = team_name_elem.text.strip()
+
+    for player_elem in soup.find_all(['div', 'tr'], class_=lambda x: x and 'player' in x.lower()):
+        player_name = player_elem.find(['span', 'td'], class_=lambda x: x and 'name' in x.lower())
+        player_price = player_elem.find(['span', 'td'], class_=lambda x: x and ('price' in x.lower() or 'cost' in x.lower()))
+        if player_name:
+            team_data["players"].append({
+                "name": player_name.text.strip(),
+                "price": player_price.text.strip() if player_price else None
+            })
+            classes = " ".join(player_elem.get("class", [])).lower()
+            if team_data["captain"] is None and "captain" in classes and "vice" not in classes:
+                team_data["captain"] = player_name.text.strip()
+
+    budget_elem = soup.find(['span', 'div'], class_=lambda x: x and 'budget' in x.lower())
+    if budget_elem:
+        team_data["budget"] = budget_elem.text.strip()
+
+    points_elem = soup.find(['span', 'div'], class_=lambda x: x and 'point' in x.lower())
+    if points_elem:
+        team_data["points"] = points_elem.text.strip()
+
+    return team_data
+
+
+def legacy_parse_league_table(html):
+    """The BeautifulSoup extraction that get_league_table used before sport5_extract,
+    plus the team_url field added since, so both paths extract the same data"""
+    soup = BeautifulSoup(html, 'html.parser')
+    table_data = {"teams": []}
+
+    table = soup.find('table', class_=lambda x: x and 'league' in x.lower())
+    if table:
+        for row in table.find_all('tr')[1:]:
+            cells = row.find_all(['td', 'th'])
+            if len(cells) >= 3:
+                team_info = {
+                    "position": cells[0].text.strip(),
+                    "team_name": cells[1].text.strip(),
+                    "points": cells[2].text.strip()
+                }
+                link = row.find('a', href=True)
+                if link:
+                    team_info["team_url"] = link['href']
+                table_data["teams"].append(team_info)
+
+    return table_data
+
+
+def timeit(func, html, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(html)
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples)
+
+
+def run(label, html, legacy, engine, repeat):
+    expected = legacy(html)
+    actual = engine(html)
+    if expected != actual:
+        print(f"❌ {label}: engine output differs from the BeautifulSoup path")
+        return False
+
+    legacy_time = timeit(legacy, html, repeat)
+    engine_time = timeit(engine, html, repeat)
+    print(
+        f"{label:<14} {len(html) / 1024:>9.1f} KiB  "
+        f"bs4 {legacy_time * 1000:>9.2f} ms  "
+        f"lxml {engine_time * 1000:>8.2f} ms  "
+        f"x{legacy_time / engine_time:.1f}"
+    )
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--team-page", action="append", default=[], help="saved /my-team HTML file")
+    parser.add_argument("--league-page", action="append", default=[], help="saved /league HTML file")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    pages = []
+    for path in args.team_page:
+        with open(path, "rb") as f:
+            pages.append((f"team:{path}", f.read().decode("utf-8", "replace"), legacy_parse_my_team, parse_my_team))
+    for path in args.league_page:
+        with open(path, "rb") as f:
+            pages.append((f"league:{path}", f.read().decode("utf-8", "replace"), legacy_parse_league_table, parse_league_table))
+
+    if not pages:
+        pages = [
+            ("team:15", synthetic_team_page(15), legacy_parse_my_team, parse_my_team),
+            ("league:500", synthetic_league_page(500), legacy_parse_league_table, parse_league_table),
+            ("league:5000", synthetic_league_page(5000), legacy_parse_league_table, parse_league_table),
+        ]
+
+    ok = all(run(label, html, legacy, engine, args.repeat) for label, html, legacy, engine in pages)
+
+    # A 20-row window from a 100k-row league: the streaming parser stops early
+    big_league = synthetic_league_page(100000).encode("utf-8")
+    full_time = timeit(parse_league_table, big_league, 3)
+    window_time = timeit(lambda html: parse_league_window(html, offset=0, limit=20), big_league, 3)
+    print(
+        f"{'window:20/100k':<14} {len(big_league) / 1024:>9.1f} KiB  "
+        f"full {full_time * 1000:>8.2f} ms  "
+        f"window {window_time * 1000:>6.2f} ms  "
+        f"x{full_time / window_time:.1f}"
+    )
+
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,386 @@
+#!/usr/bin/env python3
+"""
+Offline end-to-end benchmark for Sport5FantasyClient and handle_call_tool
+
+Starts the local stand-in site (sport5_standin.py), drives the client and the
+MCP tool handler through it with N concurrent callers, and reports p50/p99
+latency, throughput, parse time and peak RSS as JSON.
+
+Usage:
+    python bench_sport5.py --output bench.json
+    python bench_sport5.py --league-rows 1000,100000 --concurrency 16 --latency-ms 30
+    python bench_sport5.py --parser-pool process       # parse on worker processes
+    python bench_sport5.py --compare bench.json        # fail on regressions vs. a previous run
+    python bench_sport5.py --replay site.sp5           # captured pages from SPORT5_TRANSPORT=record, no network
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Keep benchmark sessions out of the user's real session directory
+os.environ.setdefault("SPORT5_SESSION_DIR", tempfile.mkdtemp(prefix="sport5-bench-"))
+# The stand-in is local; the outbound rate limit would only measure the token bucket
+os.environ.setdefault("SPORT5_RATE_LIMIT", "0")
+
+import sport5_mcp_google as server
+from sport5_extract import LeagueRowStream, parse_league_table, parse_my_team
+from sport5_metrics import LoopLagMonitor
+from sport5_parser_pool import default_parser_pool
+from sport5_players import PlayerCatalog
+from sport5_standin import Sport5StandIn
+from sport5_transport import Transport
+
+BENCH_ACCOUNT = "bench"
+
+
+def peak_rss_kb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak // 1024 if sys.platform == "darwin" else peak
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    index = min(int(round(fraction * (len(ordered) - 1))), len(ordered) - 1)
+    return ordered[index]
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def run_scenario(name, call, concurrency, calls):
+    """Run `calls` invocations per caller across `concurrency` concurrent callers"""
+    latencies = []
+    errors = 0
+
+    async def caller():
+        nonlocal errors
+        for _ in range(calls):
+            start = time.perf_counter()
+            try:
+                ok = await call()
+            except Exception:
+                ok = False
+            latencies.append(time.perf_counter() - start)
+            if not ok:
+                errors += 1
+
+    lag = LoopLagMonitor(interval=0.01)
+    lag.start()
+    started = time.perf_counter()
+    await asyncio.gather(*(caller() for _ in range(concurrency)))
+    wall = time.perf_counter() - started
+    await lag.stop()
+    lag_samples = lag.samples or [0.0]
+
+    result = {
+        "name": name,
+        "concurrency": concurrency,
+        "calls": len(latencies),
+        "errors": errors,
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 3),
+        "mean_ms": round(statistics.mean(latencies) * 1000, 3),
+        "throughput_rps": round(len(latencies) / wall, 1),
+        "loop_lag_p99_ms": round(percentile(lag_samples, 0.99) * 1000, 3),
+        "loop_lag_max_ms": round(max(lag_samples) * 1000, 3),
+        "peak_rss_kb": peak_rss_kb(),
+    }
+    print(
+        f"{name:<34} p50 {result['p50_ms']:>9.2f} ms  p99 {result['p99_ms']:>9.2f} ms  "
+        f"{result['throughput_rps']:>8.1f} req/s  loop lag p99 {result['loop_lag_p99_ms']:>8.2f} ms  errors {errors}"
+    )
+    return result
+
+
+def measure_parse(standin, league_sizes, repeat=5):
+    results = []
+    pages = [("my-team", standin.players, "/my-team", parse_my_team)]
+    pages += [(f"league:{rows}", rows, "/league", parse_league_table) for rows in league_sizes]
+    for label, size, path, parser in pages:
+        if path == "/league":
+            standin.league_rows = size
+        html = standin.page(path)
+        samples = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            parser(html)
+            samples.append(time.perf_counter() - start)
+        result = {"page": label, "bytes": len(html), "median_ms": round(statistics.median(samples) * 1000, 3)}
+        line = f"parse {label:<28} {len(html) / 1024:>9.1f} KiB  {statistics.median(samples) * 1000:>9.2f} ms"
+        if path == "/league":
+            # time until the incremental parser emits its first row from 64 KiB chunks
+            result["first_row_ms"] = round(statistics.median(first_row(html) for _ in range(repeat)) * 1000, 3)
+            line += f"  first row {result['first_row_ms']:>7.2f} ms"
+        results.append(result)
+        print(line)
+    return results
+
+
+def first_row(html, chunk_size=64 * 1024):
+    start = time.perf_counter()
+    stream = LeagueRowStream()
+    for offset in range(0, len(html), chunk_size):
+        if stream.feed(html[offset:offset + chunk_size]):
+            break
+    return time.perf_counter() - start
+
+
+def is_ok(content):
+    text = content[0].text
+    return not text.startswith("נדרשת") and '"error"' not in text
+
+
+async def run_benchmarks(args):
+    league_sizes = [int(size) for size in args.league_rows.split(",")]
+    standin = Sport5StandIn(players=args.players, league_rows=league_sizes[0], latency_ms=args.latency_ms,
+                            catalog_players=args.catalog_players)
+    base_url = await standin.start()
+    os.environ["SPORT5_BASE_URL"] = base_url
+
+    # Fresh pool for the benchmark account; the real server uses the same code path
+    catalog = PlayerCatalog(":memory:")
+    server.session_pool = server.Sport5SessionPool(session_store=None, player_catalog=catalog)
+    scenarios = []
+
+    try:
+        login = await server.handle_call_tool(
+            "login_credentials", {"account": BENCH_ACCOUNT, "email": "bench@example.com", "password": "bench"}
+        )
+        if '"success": true' not in login[0].text:
+            raise RuntimeError(f"login against the stand-in failed: {login[0].text}")
+        client = await server.session_pool.get(BENCH_ACCOUNT)
+        c, n = args.concurrency, args.calls
+
+        async def team_fresh():
+            return "error" not in await client.get_my_team(fresh=True)
+
+        async def team_cached():
+            return "error" not in await client.get_my_team()
+
+        standin.etag = False
+        scenarios.append(await run_scenario("client.get_my_team uncached", team_fresh, c, n))
+        standin.etag = True
+        scenarios.append(await run_scenario("client.get_my_team revalidate(304)", team_fresh, c, n))
+        scenarios.append(await run_scenario("client.get_my_team cached", team_cached, c, n))
+
+        for rows in league_sizes:
+            standin.league_rows = rows
+            standin.etag = False
+            calls = max(1, n // max(1, rows // 10000))  # keep huge leagues from dominating the run
+
+            async def league_full():
+                return "error" not in await client.get_league_table(fresh=True)
+
+            async def league_window():
+                return "error" not in await client.get_league_table(fresh=True, limit=20)
+
+            async def league_around():
+                return "error" not in await client.get_league_table(fresh=True, limit=20, around_my_team=True)
+
+            scenarios.append(await run_scenario(f"client.get_league_table {rows} full", league_full, c, calls))
+            scenarios.append(await run_scenario(f"client.get_league_table {rows} top20", league_window, c, calls))
+            scenarios.append(await run_scenario(f"client.get_league_table {rows} around", league_around, c, calls))
+            standin.etag = True
+
+        standin.league_rows = league_sizes[0]
+
+        async def tool_team():
+            return is_ok(await server.handle_call_tool("get_my_team", {"account": BENCH_ACCOUNT}))
+
+        async def tool_dashboard():
+            return is_ok(await server.handle_call_tool("get_dashboard", {"account": BENCH_ACCOUNT, "fresh": True}))
+
+        async def players_sync():
+            return "error" not in await client.sync_players()
+
+        async def players_search():
+            return "error" not in catalog.search(position="MID", max_price=8, sort_by="value", limit=10)
+
+        async def league_analysis():
+            return "error" not in await client.analyze_league(fresh=True)
+
+        async def league_analysis_cached():
+            return "error" not in await client.analyze_league()
+
+        scenarios.append(await run_scenario(f"client.analyze_league {standin.league_rows}", league_analysis, 1, 3))
+        scenarios.append(await run_scenario(f"client.analyze_league {standin.league_rows} cached",
+                                            league_analysis_cached, 1, 3))
+        scenarios.append(await run_scenario("client.sync_players", players_sync, 1, 3))
+        scenarios.append(await run_scenario("catalog.search MID<=8M by value", players_search, c, n))
+
+        scenarios.append(await run_scenario("tool get_my_team", tool_team, c, n))
+        scenarios.append(await run_scenario("tool get_dashboard fresh", tool_dashboard, c, n))
+
+        parse = measure_parse(standin, league_sizes)
+    finally:
+        await server.session_pool.close_all()
+        catalog.close()
+        await standin.stop()
+        default_parser_pool().shutdown()
+
+    return {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "config": {
+            "players": args.players,
+            "league_rows": league_sizes,
+            "catalog_players": args.catalog_players,
+            "latency_ms": args.latency_ms,
+            "concurrency": args.concurrency,
+            "calls": args.calls,
+            "parser_pool": default_parser_pool().mode,
+        },
+        "scenarios": scenarios,
+        "parse": parse,
+        "peak_rss_kb": peak_rss_kb(),
+    }
+
+
+async def run_replay_benchmarks(args):
+    """The client scenarios against a recorded archive instead of the stand-in
+
+    Whatever pages the archive holds are what gets measured, so a capture of the real site shows how
+    parser and client changes behave on real markup. timing 0 measures only our own code.
+    """
+    transport = Transport("replay", args.replay, timing=args.replay_timing)
+    recorded = {meta["key"] for meta in transport.archive.entries() if meta["method"] == "GET"}
+    client = server.Sport5FantasyClient(transport=transport)
+    await client.__aenter__()
+    client.logged_in = True
+    c, n = args.concurrency, args.calls
+    scenarios = []
+
+    async def team_fresh():
+        return "error" not in await client.get_my_team(fresh=True)
+
+    async def league_full():
+        return "error" not in await client.get_league_table(fresh=True)
+
+    async def league_window():
+        return "error" not in await client.get_league_table(fresh=True, limit=20)
+
+    async def league_around():
+        return "error" not in await client.get_league_table(fresh=True, limit=20, around_my_team=True)
+
+    try:
+        if "/my-team" in recorded:
+            scenarios.append(await run_scenario("replay get_my_team", team_fresh, c, n))
+        if "/league" in recorded:
+            scenarios.append(await run_scenario("replay get_league_table full", league_full, c, n))
+            scenarios.append(await run_scenario("replay get_league_table top20", league_window, c, n))
+            scenarios.append(await run_scenario("replay get_league_table around", league_around, c, n))
+
+        parse = []
+        for label, path, parser in (("my-team", "/my-team", parse_my_team), ("league", "/league", parse_league_table)):
+            full = [meta for meta in transport.archive.entries() if meta["key"] == path and meta["status"] == 200]
+            if not full:
+                continue
+            html = transport.archive.body(full[-1])
+            samples = []
+            for _ in range(5):
+                start = time.perf_counter()
+                parser(html)
+                samples.append(time.perf_counter() - start)
+            parse.append({"page": f"replay:{label}", "bytes": len(html),
+                          "median_ms": round(statistics.median(samples) * 1000, 3)})
+            print(f"parse replay:{label:<21} {len(html) / 1024:>9.1f} KiB  {statistics.median(samples) * 1000:>9.2f} ms")
+    finally:
+        await client.__aexit__(None, None, None)
+        transport.archive.close()
+        default_parser_pool().shutdown()
+
+    if not scenarios:
+        print(f"{args.replay} has no /my-team or /league recordings to replay")
+    print(f"replayed {transport.replayed} responses, {transport.misses} missing from the archive")
+    return {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "config": {
+            "replay": args.replay,
+            "replay_timing": args.replay_timing,
+            "concurrency": args.concurrency,
+            "calls": args.calls,
+            "parser_pool": default_parser_pool().mode,
+        },
+        "scenarios": scenarios,
+        "parse": parse,
+        "peak_rss_kb": peak_rss_kb(),
+    }
+
+
+def compare(results, baseline_path, threshold):
+    """Print per-scenario changes vs. a previous run; returns False on regressions"""
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = {s["name"]: s for s in json.load(f)["scenarios"]}
+
+    ok = True
+    print(f"\nCompared with {baseline_path} (threshold {threshold:.0%}):")
+    for scenario in results["scenarios"]:
+        old = baseline.get(scenario["name"])
+        if old is None:
+            continue
+        p50 = scenario["p50_ms"] / old["p50_ms"] - 1 if old["p50_ms"] else 0
+        p99 = scenario["p99_ms"] / old["p99_ms"] - 1 if old["p99_ms"] else 0
+        regressed = p50 > threshold or p99 > threshold
+        ok = ok and not regressed
+        print(f"{'❌' if regressed else '✅'} {scenario['name']:<34} p50 {p50:+.1%}  p99 {p99:+.1%}")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--players", type=int, default=15)
+    parser.add_argument("--league-rows", default="500,10000", help="comma separated league sizes")
+    parser.add_argument("--catalog-players", type=int, default=600, help="players in the /players listing")
+    parser.add_argument("--latency-ms", type=float, default=0, help="simulated server latency")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--calls", type=int, default=25, help="calls per concurrent caller")
+    parser.add_argument("--parser-pool", choices=["thread", "process", "inline"], help="where HTML parsing runs")
+    parser.add_argument("--output", help="write results as JSON to this file")
+    parser.add_argument("--compare", help="previous JSON results to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed slowdown before --compare fails")
+    parser.add_argument("--replay", help="benchmark against a recorded archive (sport5_transport.py) instead")
+    parser.add_argument("--replay-timing", type=float, default=0,
+                        help="scale of the recorded latency to simulate in --replay (0 = none, 1 = as recorded)")
+    args = parser.parse_args()
+    if args.parser_pool:
+        os.environ["SPORT5_PARSER_POOL"] = args.parser_pool
+
+    results = asyncio.run(run_replay_benchmarks(args) if args.replay else run_benchmarks(args))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"\nResults written to {args.output}")
+
+    if args.compare and not compare(results, args.compare, args.threshold):
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Cold-start benchmark for the MCP server
+
+Measures what the MCP host waits for when it spawns the server:
+  * import time of sport5_mcp_google, from `python -X importtime`, with the
+    slowest modules and any heavy module that should have been deferred
+  * wall time from spawning the process to the `tools/list` response
+
+Usage:
+    python bench_startup.py
+    python bench_startup.py --runs 10 --budget-ms 800
+    python bench_startup.py --output startup.json
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+SERVER_MODULE = "sport5_mcp_google"
+
+# Loaded on the first tool call that needs them, never at startup
+DEFERRED_MODULES = ("aiohttp", "aiohttp.web", "lxml.etree", "webbrowser", "cryptography.fernet", "yarl", "sqlite3", "numpy")
+
+DEFAULT_BUDGET_MS = float(os.getenv("SPORT5_STARTUP_BUDGET_MS", "1000"))
+
+
+def server_env():
+    # Keep the spawned server away from the user's real session directory
+    env = dict(os.environ)
+    env.setdefault("SPORT5_SESSION_DIR", tempfile.mkdtemp(prefix="sport5-startup-"))
+    return env
+
+
+def import_profile(module=SERVER_MODULE):
+    """One `-X importtime` run: {module name: (self_us, cumulative_us)}"""
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, cwd=HERE, env=server_env(), check=True,
+    )
+    modules = {}
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        self_us, cumulative_us, name = (part.strip() for part in line[len("import time:"):].split("|"))
+        if self_us.isdigit():
+            modules[name] = (int(self_us), int(cumulative_us))
+    return modules
+
+
+def measure_imports(runs=5, module=SERVER_MODULE):
+    """Median import time over several cold runs, plus the slowest modules of the median run"""
+    profiles = [import_profile(module) for _ in range(runs)]
+    profiles.sort(key=lambda profile: profile[module][1])
+    median = profiles[len(profiles) // 2]
+    slowest = sorted(median.items(), key=lambda item: item[1][0], reverse=True)[:10]
+    return {
+        "import_ms": round(median[module][1] / 1000, 1),
+        "import_runs_ms": [round(profile[module][1] / 1000, 1) for profile in profiles],
+        "slowest_modules": [{"module": name, "self_ms": round(s / 1000, 1)} for name, (s, _) in slowest],
+        "deferred_loaded": [name for name in DEFERRED_MODULES if name in median],
+    }
+
+
+def _send(process, message):
+    process.stdin.write(json.dumps(message) + "\n")
+    process.stdin.flush()
+
+
+def _receive(process, request_id):
+    while True:
+        line = process.stdout.readline()
+        if not line:
+            raise RuntimeError("server exited before answering")
+        message = json.loads(line)
+        if message.get("id") == request_id:
+            return message
+
+
+def measure_handshake():
+    """Spawn the server over stdio and time initialize and tools/list"""
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, os.path.join(HERE, f"{SERVER_MODULE}.py")],
+        stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+        text=True, encoding="utf-8", cwd=HERE, env=server_env(),
+    )
+    try:
+        _send(process, {
+            "jsonrpc": "2.0", "id": 1, "method": "initialize",
+            "params": {
+                "protocolVersion": "2024-11-05",
+                "capabilities": {},
+                "clientInfo": {"name": "bench_startup", "version": "0"},
+            },
+        })
+        _receive(process, 1)
+        initialized = time.perf_counter()
+
+        _send(process, {"jsonrpc": "2.0", "method": "notifications/initialized"})
+        _send(process, {"jsonrpc": "2.0", "id": 2, "method": "tools/list"})
+        tools = _receive(process, 2)["result"]["tools"]
+        listed = time.perf_counter()
+    finally:
+        process.stdin.close()
+        try:
+            process.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+    return {
+        "initialize_ms": round((initialized - started) * 1000, 1),
+        "list_tools_ms": round((listed - started) * 1000, 1),
+        "tools": [tool["name"] for tool in tools],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5, help="cold import runs (median is reported)")
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS, help="fail if the import takes longer")
+    parser.add_argument("--output", help="write results as JSON to this file")
+    args = parser.parse_args()
+
+    results = measure_imports(args.runs)
+    results["handshake"] = measure_handshake()
+    results["budget_ms"] = args.budget_ms
+
+    print(f"import {SERVER_MODULE:<24} {results['import_ms']:>8.1f} ms  (runs: {results['import_runs_ms']})")
+    for item in results["slowest_modules"]:
+        print(f"  {item['module']:<40} {item['self_ms']:>8.1f} ms self")
+    print(f"spawn -> initialize              {results['handshake']['initialize_ms']:>8.1f} ms")
+    print(f"spawn -> tools/list              {results['handshake']['list_tools_ms']:>8.1f} ms  "
+          f"({len(results['handshake']['tools'])} tools)")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"\nResults written to {args.output}")
+
+    ok = True
+    if results["deferred_loaded"]:
+        print(f"❌ Loaded at startup but should be deferred: {', '.join(results['deferred_loaded'])}")
+        ok = False
+    if results["import_ms"] > args.budget_ms:
+        print(f"❌ Import time {results['import_ms']} ms is over the {args.budget_ms:.0f} ms budget")
+        ok = False
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
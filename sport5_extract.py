@@ -0,0 +1,499 @@
+#!/usr/bin/env python3
+"""
+מנוע חילוץ נתונים מדפי אתר הפנטזי של ספורט 5
+פענוח יחיד עם lxml, סלקטורי XPath מקומפלים מראש ומעבר אחד על העץ
+"""
+
+import re
+from collections import deque
+from typing import Any, Dict, Iterator, List, Optional, Union
+
+from lxml import etree
+
+Markup = Union[str, bytes]
+
+# השוואת class ללא תלות ברישיות - כמו ה-lambda שהיו בגרסת BeautifulSoup
+_LOWER_CLASS = "translate(@class, 'ABCDEFGHIJKLMNOPQRSTUVWXYZ', 'abcdefghijklmnopqrstuvwxyz')"
+
+
+def _has(keyword: str) -> str:
+    return f"contains({_LOWER_CLASS}, '{keyword}')"
+
+
+# כל המועמדים בדף הקבוצה בסריקה אחת של העץ, לפי סדר המסמך
+_TEAM_CANDIDATES = etree.XPath(
+    "//*[@class and ("
+    f"((self::h1 or self::h2) and {_has('team')})"
+    f" or ((self::div or self::tr) and {_has('player')})"
+    f" or ((self::span or self::td) and ({_has('name')} or {_has('price')} or {_has('cost')}))"
+    f" or ((self::span or self::div) and ({_has('budget')} or {_has('point')}))"
+    ")]"
+)
+
+_LEAGUE_ROWS = etree.XPath(f"(//table[{_has('league')}])[1]//tr")
+_ROW_CELLS = etree.XPath(".//td | .//th")
+_ROW_LINK = etree.XPath("(.//a[@href])[1]/@href")
+_PLAYER_LIST_ROWS = etree.XPath(f"//*[@data-player-id or ((self::tr or self::div) and {_has('player-row')})]")
+_PLAYER_FIELDS = etree.XPath(".//*[@class]")
+_PAGE_LINKS = etree.XPath("//a[contains(@href, 'page=')]/@href")
+_CSRF_INPUT = etree.XPath("(//input[@name='_token'])[1]/@value")
+_TEXT = etree.XPath("string()")
+
+_PAGE_NUMBER = re.compile(r"[?&]page=(\d+)")
+
+# שדות שורת שחקן בדף רשימת השחקנים: מילת מפתח ב-class -> שם השדה (הראשונה שמתאימה קובעת)
+_PLAYER_FIELD_KEYWORDS = (
+    ("name", "name"),
+    ("club", "club"),
+    ("team", "club"),
+    ("pos", "position"),
+    ("price", "price"),
+    ("cost", "price"),
+    ("point", "points"),
+)
+
+_META_CHARSET = re.compile(rb"<meta[^>]+charset", re.IGNORECASE)
+
+_HTML_PARSER = etree.HTMLParser()
+_UTF8_PARSER = etree.HTMLParser(encoding="utf-8")
+
+
+def _detect_encoding(head: bytes, encoding: Optional[str]) -> Optional[str]:
+    """קידוד מפורש, או None אם הדף מצהיר על הקידוד שלו, אחרת UTF-8"""
+    if encoding:
+        return encoding
+    if _META_CHARSET.search(head, 0, 2048):
+        # הדף מצהיר על הקידוד שלו - libxml2 יזהה אותו לבד
+        return None
+    return "utf-8"
+
+
+def _parse(html: Markup, encoding: Optional[str] = None) -> Optional[etree._Element]:
+    """פענוח HTML לעץ lxml (None עבור דף ריק)"""
+    if not html:
+        return None
+    if isinstance(html, str):
+        html = html.encode("utf-8")
+        parser = _UTF8_PARSER
+    else:
+        encoding = _detect_encoding(html, encoding)
+        if encoding is None:
+            parser = _HTML_PARSER
+        elif encoding.lower() == "utf-8":
+            parser = _UTF8_PARSER
+        else:
+            parser = etree.HTMLParser(encoding=encoding)
+    return etree.fromstring(html, parser)
+
+
+def _text(elem: etree._Element) -> str:
+    return _TEXT(elem).strip()
+
+
+def _class(elem: etree._Element) -> str:
+    return (elem.get("class") or "").lower()
+
+
+def parse_my_team(html: Markup, encoding: Optional[str] = None) -> Dict[str, Any]:
+    """חילוץ שם הקבוצה, השחקנים, הקפטן, התקציב והנקודות במעבר אחד
+
+    משמש גם לדפי הקבוצות של היריבים בליגה, שבנויים כמו דף הקבוצה שלי.
+    """
+    team_data: Dict[str, Any] = {
+        "players": [],
+        "budget": None,
+        "points": None,
+        "team_name": None,
+        "captain": None,
+    }
+
+    root = _parse(html, encoding)
+    if root is None:
+        return team_data
+
+    # שחקנים פתוחים לפי סדר המסמך: אלמנט -> [שם, מחיר]
+    players: Dict[etree._Element, List[Optional[etree._Element]]] = {}
+    captain: Optional[etree._Element] = None
+
+    for elem in _TEAM_CANDIDATES(root):
+        tag = elem.tag
+        cls = _class(elem)
+
+        if tag in ("h1", "h2"):
+            if team_data["team_name"] is None:
+                team_data["team_name"] = _text(elem)
+            continue
+
+        if tag in ("div", "tr") and "player" in cls:
+            players[elem] = [None, None]
+            if captain is None and "captain" in cls and "vice" not in cls:
+                captain = elem
+
+        if tag in ("span", "td"):
+            is_name = "name" in cls
+            is_price = "price" in cls or "cost" in cls
+            if is_name or is_price:
+                for ancestor in elem.iterancestors("div", "tr"):
+                    slots = players.get(ancestor)
+                    if slots is None:
+                        continue
+                    if is_name and slots[0] is None:
+                        slots[0] = elem
+                    if is_price and slots[1] is None:
+                        slots[1] = elem
+
+        if tag in ("span", "div"):
+            if team_data["budget"] is None and "budget" in cls:
+                team_data["budget"] = _text(elem)
+            if team_data["points"] is None and "point" in cls:
+                team_data["points"] = _text(elem)
+
+    for elem, (name_elem, price_elem) in players.items():
+        if name_elem is not None:
+            team_data["players"].append({
+                "name": _text(name_elem),
+                "price": _text(price_elem) if price_elem is not None else None,
+            })
+            if elem is captain:
+                team_data["captain"] = team_data["players"][-1]["name"]
+
+    return team_data
+
+
+def _league_row(row: etree._Element) -> Optional[Dict[str, str]]:
+    cells = _ROW_CELLS(row)
+    if len(cells) < 3:
+        return None
+    team_info = {
+        "position": _text(cells[0]),
+        "team_name": _text(cells[1]),
+        "points": _text(cells[2]),
+    }
+    # קישור לדף הקבוצה (אם יש) - ממנו analyze_league מושך את הסגלים של היריבים
+    link = _ROW_LINK(row)
+    if link:
+        team_info["team_url"] = link[0]
+    return team_info
+
+
+def parse_league_table(html: Markup, encoding: Optional[str] = None) -> Dict[str, Any]:
+    """חילוץ שורות טבלת הליגה (מיקום, שם קבוצה, נקודות וקישור לדף הקבוצה)"""
+    table_data: Dict[str, Any] = {"teams": []}
+
+    root = _parse(html, encoding)
+    if root is None:
+        return table_data
+
+    for row in _LEAGUE_ROWS(root)[1:]:  # דילוג על כותרת
+        team_info = _league_row(row)
+        if team_info is not None:
+            table_data["teams"].append(team_info)
+
+    return table_data
+
+
+class LeagueRowStream:
+    """פענוח הדרגתי של טבלת הליגה: מקבל חתיכות bytes ומחזיר שורות ברגע שהן נסגרות
+
+    שורות שכבר עובדו נמחקות מהעץ, כך שהזיכרון תלוי בגודל החתיכה ולא בגודל הליגה.
+    """
+
+    def __init__(self, encoding: Optional[str] = None):
+        self._encoding = encoding
+        self._parser = None
+        self._table = None
+        self._header_skipped = False
+        self.done = False
+
+    def feed(self, chunk: Markup) -> List[Dict[str, str]]:
+        if self.done or not chunk:
+            return []
+        if isinstance(chunk, str):
+            chunk = chunk.encode("utf-8")
+            if self._encoding is None:
+                self._encoding = "utf-8"
+        if self._parser is None:
+            self._parser = etree.HTMLPullParser(
+                events=("start", "end"),
+                tag=("table", "tr"),
+                encoding=_detect_encoding(chunk, self._encoding),
+            )
+        self._parser.feed(chunk)
+        return self._drain()
+
+    def close(self) -> List[Dict[str, str]]:
+        if self.done or self._parser is None:
+            return []
+        self._parser.close()
+        rows = self._drain()
+        self.done = True
+        return rows
+
+    def _drain(self) -> List[Dict[str, str]]:
+        rows = []
+        for event, elem in self._parser.read_events():
+            if self.done:
+                break
+            tag = elem.tag
+            if event == "start":
+                if tag == "table" and self._table is None and "league" in _class(elem):
+                    self._table = elem
+                continue
+
+            if self._table is None:
+                continue
+            if elem is self._table:
+                # רק הטבלה הראשונה נחשבת, כמו ב-parse_league_table
+                self.done = True
+                break
+            if tag != "tr":
+                continue
+
+            if not self._header_skipped:
+                self._header_skipped = True
+            else:
+                team_info = _league_row(elem)
+                if team_info is not None:
+                    rows.append(team_info)
+
+            # שחרור שורות שכבר עובדו
+            elem.clear()
+            parent = elem.getparent()
+            while elem.getprevious() is not None:
+                del parent[0]
+        return rows
+
+
+def iter_league_rows(html: Markup, encoding: Optional[str] = None,
+                     chunk_size: int = 64 * 1024) -> Iterator[Dict[str, str]]:
+    """מחולל שורות הליגה שמזין את המפענח בחתיכות ועוצר כשהצרכן מפסיק לקרוא"""
+    if isinstance(html, str):
+        html = html.encode("utf-8")
+        encoding = "utf-8"
+    stream = LeagueRowStream(encoding)
+    view = memoryview(html)
+    for start in range(0, len(view), chunk_size):
+        yield from stream.feed(bytes(view[start:start + chunk_size]))
+        if stream.done:
+            return
+    yield from stream.close()
+
+
+class LeagueTableStream:
+    """parse_league_table בהזנה הדרגתית - השורות נאספות תוך כדי הורדה"""
+
+    def __init__(self, encoding: Optional[str] = None):
+        self._rows = LeagueRowStream(encoding)
+        self._teams: List[Dict[str, str]] = []
+
+    @property
+    def done(self) -> bool:
+        return self._rows.done
+
+    def feed(self, chunk: Markup):
+        self._teams.extend(self._rows.feed(chunk))
+
+    def close(self) -> Dict[str, Any]:
+        self._teams.extend(self._rows.close())
+        return {"teams": self._teams}
+
+
+class LeagueWindowStream:
+    """חלון מתוך טבלת הליגה בהזנה הדרגתית - done ברגע שהחלון התמלא, כך שאפשר להפסיק להוריד
+
+    כאשר team_name נתון, החלון ממורכז סביב השורה של אותה קבוצה.
+    """
+
+    def __init__(self, offset: int = 0, limit: Optional[int] = None, team_name: Optional[str] = None,
+                 encoding: Optional[str] = None):
+        self._rows = LeagueRowStream(encoding)
+        self.offset = offset
+        self.team_name = team_name
+        self.limit = limit if team_name is None else (limit or 10)
+        self._index = 0
+        self._window: List[Dict[str, str]] = []
+        self._has_more = False
+        self._filled = False
+        # מצב החיפוש סביב הקבוצה: השורות שלפניה, השורה עצמה והשורות שאחריה
+        self._before: deque = deque(maxlen=max((self.limit or 1) - 1, 0))
+        self._found = None
+        self._after: List[Dict[str, str]] = []
+        self._after_needed = 0
+
+    @property
+    def done(self) -> bool:
+        return self._filled or self._rows.done
+
+    def feed(self, chunk: Markup):
+        if not self._filled:
+            self._take(self._rows.feed(chunk))
+
+    def _take(self, rows: List[Dict[str, str]]):
+        for row in rows:
+            if self.team_name is None:
+                if self._index >= self.offset:
+                    if self.limit is not None and len(self._window) >= self.limit:
+                        self._has_more = self._filled = True
+                        return
+                    self._window.append(row)
+            elif self._found is None:
+                if row["team_name"] != self.team_name.strip():
+                    self._before.append(row)
+                else:
+                    # השורה שלנו נמצאה: חצי חלון לפניה והשאר אחריה
+                    self._found = (self._index, row)
+                    self._after_needed = self.limit - 1 - min((self.limit - 1) // 2, len(self._before))
+            else:
+                if len(self._after) >= self._after_needed:
+                    self._has_more = self._filled = True
+                    return
+                self._after.append(row)
+            self._index += 1
+
+    def close(self) -> Dict[str, Any]:
+        if not self._filled:
+            self._take(self._rows.close())
+        self._filled = True
+
+        if self.team_name is None:
+            return {"teams": self._window, "offset": self.offset, "limit": self.limit, "has_more": self._has_more}
+        if self._found is None:
+            return {"teams": [], "offset": 0, "limit": self.limit, "has_more": False, "my_team_index": None}
+        index, row = self._found
+        take_before = self.limit - 1 - len(self._after)
+        before = list(self._before)
+        previous = before[len(before) - take_before:] if take_before > 0 else []
+        return {
+            "teams": previous + [row] + self._after,
+            "offset": index - len(previous),
+            "limit": self.limit,
+            "has_more": self._has_more,
+            "my_team_index": index,
+        }
+
+
+def feed_stream(stream, html: bytes, chunk_size: int = 64 * 1024) -> Any:
+    """הזנת דף שכבר נמצא בזיכרון למפענח הדרגתי בחתיכות, עד שהוא מסיים"""
+    view = memoryview(html)
+    for start in range(0, len(view), chunk_size):
+        stream.feed(bytes(view[start:start + chunk_size]))
+        if stream.done:
+            break
+    return stream.close()
+
+
+def parse_league_window(html: Markup, offset: int = 0, limit: Optional[int] = None,
+                        team_name: Optional[str] = None,
+                        encoding: Optional[str] = None) -> Dict[str, Any]:
+    """חלון מתוך טבלת הליגה - הפענוח נעצר ברגע שהחלון התמלא"""
+    if isinstance(html, str):
+        html = html.encode("utf-8")
+        encoding = "utf-8"
+    return feed_stream(LeagueWindowStream(offset, limit, team_name, encoding), html)
+
+
+def _player_row(row: etree._Element) -> Optional[Dict[str, Any]]:
+    player: Dict[str, Any] = {"id": row.get("data-player-id")}
+    for elem in _PLAYER_FIELDS(row):
+        cls = _class(elem)
+        for keyword, field in _PLAYER_FIELD_KEYWORDS:
+            if keyword in cls:
+                if field not in player:
+                    player[field] = _text(elem)
+                break
+    if not player.get("name"):
+        return None
+    if not player["id"]:
+        player["id"] = f"{player['name']}|{player.get('club') or ''}"
+    return player
+
+
+def _is_player_row(elem: etree._Element) -> bool:
+    return elem.get("data-player-id") is not None or (elem.tag in ("tr", "div") and "player-row" in _class(elem))
+
+
+def parse_player_list(html: Markup, encoding: Optional[str] = None) -> Dict[str, Any]:
+    """חילוץ דף מרשימת השחקנים: שורה לכל שחקן ומספר הדפים הכולל לפי קישורי הדפדוף"""
+    list_data: Dict[str, Any] = {"players": [], "pages": 1}
+
+    root = _parse(html, encoding)
+    if root is None:
+        return list_data
+
+    for row in _PLAYER_LIST_ROWS(root):
+        player = _player_row(row)
+        if player is not None:
+            list_data["players"].append(player)
+
+    pages = [int(match.group(1)) for href in _PAGE_LINKS(root) for match in [_PAGE_NUMBER.search(href)] if match]
+    if pages:
+        list_data["pages"] = max(pages)
+
+    return list_data
+
+
+def parse_csrf_token(html: Markup, encoding: Optional[str] = None) -> Optional[str]:
+    """חיפוש טוקן CSRF בטופס הכניסה"""
+    root = _parse(html, encoding)
+    if root is None:
+        return None
+    values = _CSRF_INPUT(root)
+    return values[0] if values else None
+
+
+class PlayerListStream:
+    """parse_player_list בהזנה הדרגתית: שחקן נחלץ ברגע שהשורה שלו נסגרת, ושורות שעובדו נמחקות מהעץ"""
+
+    def __init__(self, encoding: Optional[str] = None):
+        self._encoding = encoding
+        self._parser = None
+        self._players: List[Dict[str, Any]] = []
+        self._pages: List[int] = []
+        self.done = False
+
+    def feed(self, chunk: Markup):
+        if self.done or not chunk:
+            return
+        if isinstance(chunk, str):
+            chunk = chunk.encode("utf-8")
+            if self._encoding is None:
+                self._encoding = "utf-8"
+        if self._parser is None:
+            self._parser = etree.HTMLPullParser(events=("end",), encoding=_detect_encoding(chunk, self._encoding))
+        self._parser.feed(chunk)
+        self._drain()
+
+    def close(self) -> Dict[str, Any]:
+        if not self.done and self._parser is not None:
+            self._parser.close()
+            self._drain()
+        self.done = True
+        return {"players": self._players, "pages": max(self._pages) if self._pages else 1}
+
+    def _drain(self):
+        for _, elem in self._parser.read_events():
+            if elem.tag == "a":
+                match = _PAGE_NUMBER.search(elem.get("href") or "")
+                if match:
+                    self._pages.append(int(match.group(1)))
+                continue
+            if not _is_player_row(elem):
+                continue
+
+            player = _player_row(elem)
+            if player is not None:
+                self._players.append(player)
+            # שורה פנימית נשארת בעץ עד שהשורה שמכילה אותה תיסגר
+            if not any(_is_player_row(ancestor) for ancestor in elem.iterancestors()):
+                elem.clear()
+                parent = elem.getparent()
+                while elem.getprevious() is not None:
+                    del parent[0]
+
+
+# מפענחים הדרגתיים לפי שם פונקציית החילוץ - הקליינט מזין אותם ישירות מהרשת
+STREAMS = {
+    "parse_league_table": LeagueTableStream,
+    "parse_league_window": LeagueWindowStream,
+    "parse_player_list": PlayerListStream,
+}
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+פורמטים לפלט הכלים: pretty (JSON מוזח), compact (JSON צפוף) ו-columnar (שמות עמודות פעם אחת ושורות כמערכים)
+"""
+
+import json
+import re
+from itertools import chain, repeat
+from typing import Any, Dict, List, Optional, Union
+
+try:
+    import orjson
+except ImportError:  # מסריאלייזר מהיר אופציונלי
+    orjson = None
+
+FORMATS = ("pretty", "compact", "columnar")
+DEFAULT_FORMAT = "pretty"
+
+_NUMBER_START = frozenset("-0123456789")
+_INT = re.compile(r"^-?\d+$")
+_FLOAT = re.compile(r"^-?\d+\.\d+$")
+_THOUSANDS = re.compile(r"^-?\d{1,3}(?:,\d{3})+$")
+
+
+def parse_number(value: Any) -> Any:
+    """המרת מחרוזת מספרית ("812", "7.5", "12,345") למספר; כל ערך אחר חוזר כמו שהוא"""
+    if not isinstance(value, str):
+        return value
+    text = value.strip()
+    if not text or text[0] not in _NUMBER_START:
+        return value
+    if text.isdigit() and text.isascii():
+        return int(text)
+    if _INT.match(text):
+        return int(text)
+    if _FLOAT.match(text):
+        return float(text)
+    if _THOUSANDS.match(text):
+        return int(text.replace(",", ""))
+    return value
+
+
+def parse_amount(value: Any) -> Optional[Union[int, float]]:
+    """מספר מתוך ערך כמו "812", "12,345", "7.5M" או "₪7.5" (None אם אין בו מספר)
+
+    המקום היחיד שמפענח מחירים ונקודות - המאגרים, הצילומים וההיסטוריה משתמשים בו.
+    """
+    if isinstance(value, str):
+        value = value.strip().strip("₪").strip()
+        if value.endswith("M"):
+            value = value[:-1].strip()
+    number = parse_number(value)
+    return number if isinstance(number, (int, float)) and not isinstance(number, bool) else None
+
+
+def parse_price(value: Any) -> Optional[float]:
+    """מחיר כמו "7.5M" כמספר במיליונים (None אם אין בו מספר)"""
+    number = parse_amount(value)
+    return float(number) if number is not None else None
+
+
+# שדות שתמיד מספריים בתוצאות הכלים; שאר השדות (שמות קבוצות כמו "1860", מזהים כמו "007") נשארים טקסט
+NUMERIC_FIELDS = frozenset({"position", "rank", "points", "total_points"})
+# סכומים ("7.5M", "₪100M") - מפוענחים עם parse_amount, במיליונים
+AMOUNT_FIELDS = frozenset({"price", "budget"})
+
+
+def _numeric_field(value: Any) -> Any:
+    number = parse_number(value)
+    # מספר שלם עם אפסים מובילים ("007") הוא מזהה ולא כמות - נשאר כמו שהוא
+    if isinstance(number, int) and _INT.match(value.strip()) and str(number) != value.strip():
+        return value
+    return number
+
+
+def _amount_field(value: Any) -> Any:
+    number = parse_amount(value)
+    return value if number is None else number
+
+
+def _convert_column(values: List[Any], convert) -> List[Any]:
+    """המרת עמודה שלמה: כל ערך שונה מומר פעם אחת, והעמודה נבנית בחיפוש במילון (map ב-C)"""
+    try:
+        converted = {value: convert(value) for value in set(values) if isinstance(value, str)}
+    except TypeError:  # ערך שאינו hashable - ממירים תא תא
+        return [convert(value) if isinstance(value, str) else value for value in values]
+    return list(map(converted.get, values, values))
+
+
+def _is_table(items: List[Any]) -> bool:
+    return bool(items) and all(map(isinstance, items, repeat(dict, len(items))))
+
+
+def _column(items: List[Dict[str, Any]], column: str) -> List[Any]:
+    values = list(map(dict.get, items, repeat(column, len(items))))
+    if column in NUMERIC_FIELDS:
+        # המקרה הנפוץ - עמודה שכולה מספרים שלמים בכתיב רגיל - מומר ב-int ומאומת בהמרה חזרה
+        try:
+            numbers = list(map(int, values))
+        except (TypeError, ValueError):
+            return _convert_column(values, _numeric_field)
+        return numbers if list(map(str, numbers)) == values else _convert_column(values, _numeric_field)
+    if column in AMOUNT_FIELDS:
+        return _convert_column(values, _amount_field)
+    if any(map(isinstance, values, repeat((dict, list), len(values)))):
+        return [to_columnar(value, column) for value in values]
+    return values
+
+
+def to_columnar(value: Any, key: Optional[str] = None) -> Any:
+    """רשימות של dict הופכות ל-{"columns": [...], "rows": [[...], ...]}, ומחרוזות מספריות בשדות
+    NUMERIC_FIELDS ו-AMOUNT_FIELDS הופכות למספרים. ההמרה נעשית עמודה אחרי עמודה ולא תא אחרי תא"""
+    if isinstance(value, dict):
+        return {name: to_columnar(item, name) for name, item in value.items()}
+    if isinstance(value, list):
+        if _is_table(value):
+            columns = list(dict.fromkeys(chain.from_iterable(value)))
+            return {
+                "columns": columns,
+                "rows": list(map(list, zip(*(_column(value, column) for column in columns)))),
+            }
+        return [to_columnar(item, key) for item in value]
+    if isinstance(value, str):
+        if key in NUMERIC_FIELDS:
+            return _numeric_field(value)
+        if key in AMOUNT_FIELDS:
+            return _amount_field(value)
+    return value
+
+
+def serialize(result: Any, fmt: str = DEFAULT_FORMAT) -> str:
+    """סריאליזציה של תוצאת כלי בפורמט המבוקש (עם orjson כשהוא מותקן)"""
+    if fmt == "columnar":
+        result = to_columnar(result)
+
+    if orjson is not None:
+        try:
+            option = orjson.OPT_INDENT_2 if fmt == "pretty" else 0
+            return orjson.dumps(result, option=option).decode("utf-8")
+        except TypeError:
+            pass  # טיפוס ש-orjson לא מכיר - נופלים ל-json הרגיל
+
+    if fmt == "pretty":
+        return json.dumps(result, ensure_ascii=False, indent=2)
+    return json.dumps(result, ensure_ascii=False, separators=(",", ":"))
+
+
+def format_argument(arguments: Dict[str, Any], default: str = DEFAULT_FORMAT) -> str:
+    fmt = arguments.get("format") or default
+    return fmt if fmt in FORMATS else DEFAULT_FORMAT
@@ -0,0 +1,497 @@
+#!/usr/bin/env python3
+"""
+מאגר היסטוריה עמודתי: כל סיבוב של טבלת הליגה, הקבוצה וקטלוג השחקנים נוסף לסוף קבצי עמודות
+ברוחב קבוע, והשאילתות קוראות אותם דרך memory map בלי להעתיק - כך שהזיכרון לא גדל עם העונה
+
+"סיבוב" הוא כל מצב שונה שנצפה בטבלה (תוכן זהה לסיבוב האחרון לא נוסף שוב).
+
+שימוש מהשורה (ייצוא וייבוא CSV):
+    python sport5_history.py export league league.csv --account default
+    python sport5_history.py import league league.csv --account default
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import hashlib
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from datetime import datetime
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Optional, Tuple, Union
+
+from sport5_format import parse_amount
+
+if TYPE_CHECKING:
+    import numpy as np
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_HISTORY_DIR = os.path.join(os.path.expanduser("~"), ".sport5_fantasy", "history")
+
+# טבלה -> (עמודות עם סוג ברוחב קבוע, עמודת המפתח). "str" נשמר כמזהה במילון המחרוזות (int32)
+TABLES = {
+    "league": ((("team", "str"), ("position", "<i4"), ("points", "<f4")), "team"),
+    "team": ((("team", "str"), ("points", "<f4"), ("budget", "<f4")), "team"),
+    "squad": ((("player", "str"), ("price", "<f4")), "player"),
+    "players": ((("player", "str"), ("name", "str"), ("club", "str"), ("position", "str"),
+                 ("price", "<f4"), ("points", "<f4")), "player"),
+}
+
+# עמודות שיש בכל טבלה, לפני עמודות הטבלה
+_ROUND_COLUMNS = (("round", "<i4"), ("taken_at", "<f8"))
+
+AGGREGATES = ("sum", "mean", "min", "max", "count", "change")
+
+# שורות בכל חתיכה בסריקה - הזיכרון הזמני חסום בגודל הזה ולא בגודל ההיסטוריה
+_CHUNK_ROWS = 1 << 16
+
+
+def _numpy():
+    # numpy נטען רק בשימוש הראשון במאגר, לא בעליית השרת
+    import numpy
+    return numpy
+
+
+def _number(value: Any) -> float:
+    # ערך חסר נשמר כ-NaN בעמודה המספרית
+    number = parse_amount(value)
+    return float(number) if number is not None else float("nan")
+
+
+def rows_from_result(kind: str, data: Dict[str, Any]) -> Dict[str, List[Dict[str, Any]]]:
+    """תוצאת כלי (league / my_team / players) -> שורות לכל טבלת היסטוריה"""
+    if kind == "league":
+        return {"league": [
+            {"team": row.get("team_name"), "position": row.get("position"), "points": row.get("points")}
+            for row in data.get("teams") or [] if row.get("team_name")
+        ]}
+    if kind == "my_team":
+        return {
+            "team": [{"team": data.get("team_name") or "", "points": data.get("points"), "budget": data.get("budget")}],
+            "squad": [{"player": row.get("name"), "price": row.get("price")} for row in data.get("players") or []
+                      if row.get("name")],
+        }
+    if kind == "players":
+        return {"players": [
+            {"player": str(row.get("id")), "name": row.get("name"), "club": row.get("club"),
+             "position": row.get("position"), "price": row.get("price"), "points": row.get("points")}
+            for row in data.get("players") or []
+        ]}
+    raise ValueError(f"סוג לא מוכר: {kind}")
+
+
+def _parse_time(value: Union[str, float, int]) -> float:
+    if isinstance(value, (int, float)):
+        return float(value)
+    return datetime.fromisoformat(value).timestamp()
+
+
+def _format_time(timestamp: float) -> str:
+    return datetime.fromtimestamp(timestamp).isoformat(timespec="seconds")
+
+
+class _Strings:
+    """מילון מחרוזות לחשבון: קובץ שורות שרק גדל, ומספר השורה הוא המזהה"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.values: List[str] = []
+        self.ids: Dict[str, int] = {}
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            return
+        # שורה שלמה מסתיימת ב-\n; שארית בלי \n היא כתיבה שנקטעה (קריסה באמצע הוספה)
+        complete, _, tail = data.rpartition(b"\n")
+        lines = complete.decode("utf-8", errors="replace").split("\n") if complete else []
+        try:
+            # קריאה אחת של json לכל הקובץ במקום קריאה לכל שורה
+            values = json.loads("[" + ",".join(lines) + "]")
+        except ValueError:
+            values = [self._load_line(line) for line in lines]
+        for value in values:
+            self._add(value)
+        if tail:
+            # נחתכת, כדי שההוספה הבאה לא תידבק אליה
+            logger.warning(f"שורה חלקית בסוף {path} נחתכה ({len(tail)} בתים)")
+            with open(path, "r+b") as f:
+                f.truncate(len(data) - len(tail))
+
+    def _load_line(self, line: str) -> str:
+        try:
+            return str(json.loads(line))
+        except ValueError:
+            # שורה פגומה באמצע הקובץ - נשמר מקום ריק כדי שמספרי השורות שאחריה לא יזוזו
+            logger.warning(f"שורה פגומה ב-{self.path}: {line[:40]!r}")
+            return ""
+
+    def _add(self, value: str) -> int:
+        self.ids[value] = len(self.values)
+        self.values.append(value)
+        return self.ids[value]
+
+    def encode(self, values: Iterable[Any]) -> List[int]:
+        new = []
+        codes = []
+        for value in values:
+            value = "" if value is None else str(value)
+            code = self.ids.get(value)
+            if code is None:
+                code = self._add(value)
+                new.append(value)
+            codes.append(code)
+        if new:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.writelines(json.dumps(value, ensure_ascii=False) + "\n" for value in new)
+        return codes
+
+    def decode(self, code: int) -> str:
+        return self.values[code] if 0 <= code < len(self.values) else ""
+
+
+class HistoryStore:
+    """היסטוריה לכל חשבון בתיקייה SPORT5_HISTORY_DIR
+
+    לכל טבלה יש קובץ bin לכל עמודה (מערך ברוחב קבוע) ו-meta.json עם מספר השורות שנכתבו במלואן -
+    קורא שמגיע באמצע הוספה רואה רק את השורות שב-meta, ושאריות של כתיבה שנקטעה נחתכות בהוספה הבאה.
+    """
+
+    def __init__(self, directory: Optional[str] = None):
+        self.directory = os.path.expanduser(directory or os.getenv("SPORT5_HISTORY_DIR") or DEFAULT_HISTORY_DIR)
+        self._lock = threading.Lock()
+        self._strings: Dict[str, _Strings] = {}
+
+    def _dir(self, account: str) -> str:
+        return os.path.join(self.directory, hashlib.sha256(account.encode("utf-8")).hexdigest()[:24])
+
+    def _dictionary(self, account: str) -> _Strings:
+        directory = self._dir(account)
+        strings = self._strings.get(directory)
+        if strings is None:
+            os.makedirs(directory, exist_ok=True)
+            strings = self._strings[directory] = _Strings(os.path.join(directory, "strings.jsonl"))
+        return strings
+
+    @staticmethod
+    def _columns(table: str) -> Tuple[Tuple[str, str], ...]:
+        return _ROUND_COLUMNS + TABLES[table][0]
+
+    def _meta(self, account: str, table: str) -> Dict[str, Any]:
+        try:
+            with open(os.path.join(self._dir(account), table, "meta.json"), encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {"rows": 0, "rounds": 0, "digest": None}
+
+    def append(self, account: str, table: str, rows: List[Dict[str, Any]], taken_at: Optional[float] = None,
+               round_number: Optional[int] = None) -> Dict[str, Any]:
+        """הוספת סיבוב לטבלה; סיבוב שזהה לאחרון לא נוסף"""
+        np = _numpy()
+        taken_at = taken_at if taken_at is not None else time.time()
+        directory = os.path.join(self._dir(account), table)
+
+        with self._lock:
+            strings = self._dictionary(account)
+            arrays = {}
+            for name, dtype in TABLES[table][0]:
+                values = [row.get(name) for row in rows]
+                if dtype == "str":
+                    arrays[name] = np.array(strings.encode(values), dtype="<i4")
+                elif dtype.startswith("<i"):
+                    # לעמודות שלמות אין NaN - ערך חסר נשמר כ-1-
+                    arrays[name] = np.array([number if number == number else -1
+                                             for number in map(_number, values)], dtype=dtype)
+                else:
+                    arrays[name] = np.array([_number(value) for value in values], dtype=dtype)
+            digest = hashlib.blake2b(b"".join(array.tobytes() for array in arrays.values()), digest_size=8).hexdigest()
+
+            meta = self._meta(account, table)
+            if meta["digest"] == digest and round_number is None:
+                return {"table": table, "round": meta["rounds"], "appended": 0}
+            round_number = round_number if round_number is not None else meta["rounds"] + 1
+            if round_number <= meta["rounds"]:
+                raise ValueError(f"סיבוב {round_number} לא אחרי הסיבוב האחרון בטבלה {table} ({meta['rounds']})")
+
+            arrays["round"] = np.full(len(rows), round_number, dtype="<i4")
+            arrays["taken_at"] = np.full(len(rows), taken_at, dtype="<f8")
+            os.makedirs(directory, exist_ok=True)
+            for name, dtype in self._columns(table):
+                itemsize = np.dtype("<i4" if dtype == "str" else dtype).itemsize
+                path = os.path.join(directory, f"{name}.bin")
+                with open(path, "ab") as f:
+                    f.truncate(meta["rows"] * itemsize)  # שאריות של הוספה שנקטעה
+                    f.write(arrays[name].tobytes())
+
+            meta = {"rows": meta["rows"] + len(rows), "rounds": round_number, "digest": digest}
+            tmp_path = os.path.join(directory, "meta.json.tmp")
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(meta, f)
+            os.replace(tmp_path, os.path.join(directory, "meta.json"))
+        return {"table": table, "round": round_number, "appended": len(rows)}
+
+    def record(self, account: str, kind: str, data: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """הוספת תוצאת כלי לטבלאות ההיסטוריה שלה"""
+        taken_at = time.time()
+        return [self.append(account, table, rows, taken_at) for table, rows in rows_from_result(kind, data).items()]
+
+    def _open(self, account: str, table: str) -> Tuple[Dict[str, Any], Dict[str, np.ndarray]]:
+        """העמודות כ-memory map לקריאה בלבד (רק השורות שנכתבו במלואן)"""
+        np = _numpy()
+        with self._lock:
+            meta = self._meta(account, table)
+        directory = os.path.join(self._dir(account), table)
+        columns = {}
+        for name, dtype in self._columns(table):
+            dtype = "<i4" if dtype == "str" else dtype
+            if meta["rows"]:
+                columns[name] = np.memmap(os.path.join(directory, f"{name}.bin"), dtype=dtype, mode="r",
+                                          shape=(meta["rows"],))
+            else:
+                columns[name] = np.zeros(0, dtype=dtype)
+        return meta, columns
+
+    def tables(self, account: str) -> Dict[str, Dict[str, int]]:
+        with self._lock:
+            return {table: {"rows": meta["rows"], "rounds": meta["rounds"]}
+                    for table in TABLES for meta in [self._meta(account, table)]}
+
+    def round_times(self, account: str, table: str) -> List[float]:
+        """זמן הצילום של כל סיבוב בטבלה - כלומר מתי נראה בה שינוי"""
+        np = _numpy()
+        _, columns = self._open(account, table)
+        rounds, times = columns["round"], columns["taken_at"]
+        if not len(rounds):
+            return []
+        starts = np.searchsorted(rounds, np.arange(int(rounds[0]), int(rounds[-1]) + 1), "left")
+        return times[np.unique(starts)].tolist()
+
+    def query(self, account: str, table: str, key: Optional[str] = None, field: Optional[str] = None,
+              from_round: Optional[int] = None, to_round: Optional[int] = None,
+              since_time: Optional[Union[str, float]] = None, until_time: Optional[Union[str, float]] = None,
+              aggregate: Optional[str] = None, ascending: bool = False, limit: int = 50) -> Dict[str, Any]:
+        """שאילתת טווח על טבלה: סדרה של מפתח, צבירה לכל המפתחות, או רשימת הסיבובים
+
+        עמודות round ו-taken_at ממוינות (הוספה לסוף בלבד), אז הטווח נמצא בחיפוש בינארי
+        והשאילתה עובדת על חיתוכים של ה-memory map בלי להעתיק אותם.
+        """
+        np = _numpy()
+        if table not in TABLES:
+            return {"error": f"טבלה לא מוכרת: {table} (אפשרויות: {', '.join(TABLES)})"}
+        table_columns, key_column = TABLES[table]
+        numeric = [name for name, dtype in table_columns if dtype != "str"]
+        field = field or ("points" if "points" in numeric else numeric[0])
+        if field not in numeric:
+            return {"error": f"שדה לא מוכר: {field} (אפשרויות: {', '.join(numeric)})"}
+        if aggregate is not None and aggregate not in AGGREGATES:
+            return {"error": f"צבירה לא מוכרת: {aggregate} (אפשרויות: {', '.join(AGGREGATES)})"}
+
+        started = time.perf_counter()
+        meta, columns = self._open(account, table)
+        rounds, times = columns["round"], columns["taken_at"]
+        lo, hi = 0, len(rounds)
+        try:
+            if from_round is not None:
+                lo = max(lo, int(np.searchsorted(rounds, from_round, "left")))
+            if to_round is not None:
+                hi = min(hi, int(np.searchsorted(rounds, to_round, "right")))
+            if since_time is not None:
+                lo = max(lo, int(np.searchsorted(times, _parse_time(since_time), "left")))
+            if until_time is not None:
+                hi = min(hi, int(np.searchsorted(times, _parse_time(until_time), "right")))
+        except ValueError:
+            return {"error": "זמן לא תקין"}
+        hi = max(hi, lo)
+
+        result: Dict[str, Any] = {"table": table, "field": field, "rounds_stored": meta["rounds"]}
+        if key is not None:
+            result.update(self._series(account, columns, key_column, key, field, lo, hi, aggregate, limit))
+        elif aggregate is not None:
+            result.update(self._grouped(account, columns, key_column, field, lo, hi, aggregate, ascending, limit))
+        else:
+            result["rounds"] = self._rounds(rounds, times, lo, hi)[-limit:]
+        result["query_ms"] = round((time.perf_counter() - started) * 1000, 3)
+        return result
+
+    @staticmethod
+    def _rounds(rounds: np.ndarray, times: np.ndarray, lo: int, hi: int) -> List[Dict[str, Any]]:
+        np = _numpy()
+        if hi <= lo:
+            return []
+        numbers = np.arange(int(rounds[lo]), int(rounds[hi - 1]) + 2)
+        bounds = np.clip(np.searchsorted(rounds, numbers, "left"), lo, hi)
+        return [
+            {"round": int(number), "taken_at": _format_time(float(times[start])), "rows": int(end - start)}
+            for number, start, end in zip(numbers[:-1], bounds[:-1], bounds[1:]) if end > start
+        ]
+
+    def _series(self, account: str, columns: Dict[str, np.ndarray], key_column: str, key: str, field: str,
+                lo: int, hi: int, aggregate: Optional[str], limit: int) -> Dict[str, Any]:
+        np = _numpy()
+        with self._lock:
+            code = self._dictionary(account).ids.get(key)
+        if code is None:
+            return {"key": key, "series": [], "error": f"{key} לא נמצא בהיסטוריה"}
+
+        keys = columns[key_column]
+        matches = [np.flatnonzero(keys[start:min(start + _CHUNK_ROWS, hi)] == code) + start
+                   for start in range(lo, hi, _CHUNK_ROWS)]
+        rows = np.concatenate(matches) if matches else np.zeros(0, dtype=np.int64)
+        values = np.asarray(columns[field][rows], dtype=float)
+        result: Dict[str, Any] = {"key": key}
+        if len(rows):
+            result["stats"] = {
+                "count": int(len(rows)),
+                "first": float(values[0]),
+                "last": float(values[-1]),
+                "change": round(float(values[-1] - values[0]), 3),
+                "min": float(np.nanmin(values)),
+                "max": float(np.nanmax(values)),
+                "mean": round(float(np.nanmean(values)), 3),
+                "sum": round(float(np.nansum(values)), 3),
+            }
+        if aggregate is None:
+            result["series"] = [
+                {"round": int(columns["round"][row]), "taken_at": _format_time(float(columns["taken_at"][row])),
+                 field: float(value)}
+                for row, value in zip(rows[-limit:], values[-limit:])
+            ]
+        else:
+            result["value"] = result.get("stats", {}).get(aggregate)
+        return result
+
+    def _grouped(self, account: str, columns: Dict[str, np.ndarray], key_column: str, field: str,
+                 lo: int, hi: int, aggregate: str, ascending: bool, limit: int) -> Dict[str, Any]:
+        """צבירה לכל מפתח (bincount על חתיכות) והחזרת ה-top לפי הערך"""
+        np = _numpy()
+        with self._lock:
+            strings = self._dictionary(account)
+            size = len(strings.values)
+        keys, values = columns[key_column], columns[field]
+
+        if aggregate == "change":
+            # הערך בסיבוב האחרון בטווח פחות הערך בסיבוב הראשון, למפתחות שמופיעים בשניהם
+            if hi <= lo:
+                return {"aggregate": aggregate, "groups": [], "total_groups": 0}
+            rounds = columns["round"]
+            first_end = int(np.searchsorted(rounds, rounds[lo], "right"))
+            last_start = max(int(np.searchsorted(rounds, rounds[hi - 1], "left")), lo)
+            first = np.full(size, np.nan)
+            last = np.full(size, np.nan)
+            first[keys[lo:first_end]] = values[lo:first_end]
+            last[keys[last_start:hi]] = values[last_start:hi]
+            totals = last - first
+            present = ~np.isnan(totals)
+        else:
+            counts = np.zeros(size)
+            totals = np.zeros(size) if aggregate in ("sum", "mean", "count") else \
+                np.full(size, np.inf if aggregate == "min" else -np.inf)
+            for start in range(lo, hi, _CHUNK_ROWS):
+                chunk_keys = np.asarray(keys[start:min(start + _CHUNK_ROWS, hi)])
+                chunk_values = np.asarray(values[start:min(start + _CHUNK_ROWS, hi)], dtype=float)
+                valid = ~np.isnan(chunk_values)
+                chunk_keys, chunk_values = chunk_keys[valid], chunk_values[valid]
+                counts += np.bincount(chunk_keys, minlength=size)
+                if aggregate in ("sum", "mean"):
+                    totals += np.bincount(chunk_keys, weights=chunk_values, minlength=size)
+                elif aggregate == "min":
+                    np.minimum.at(totals, chunk_keys, chunk_values)
+                elif aggregate == "max":
+                    np.maximum.at(totals, chunk_keys, chunk_values)
+            present = counts > 0
+            if aggregate == "count":
+                totals = counts
+            elif aggregate == "mean":
+                totals = np.divide(totals, counts, out=np.zeros(size), where=present)
+
+        codes = np.flatnonzero(present)
+        order = np.argsort(totals[codes], kind="stable")
+        if not ascending:
+            order = order[::-1]
+        top = codes[order[:limit]]
+        return {
+            "aggregate": aggregate,
+            "groups": [{key_column: strings.decode(int(code)), aggregate: round(float(totals[code]), 3)} for code in top],
+            "total_groups": int(len(codes)),
+        }
+
+    def export_csv(self, account: str, table: str, out) -> int:
+        """כתיבת הטבלה כ-CSV (מחרוזות מפוענחות, זמן ב-ISO) בחתיכות; מחזיר את מספר השורות"""
+        np = _numpy()
+        meta, columns = self._open(account, table)
+        with self._lock:
+            lookup = np.array(self._dictionary(account).values + [""], dtype=object)
+        names = [name for name, _ in self._columns(table)]
+        decoded = {name for name, dtype in TABLES[table][0] if dtype == "str"}
+        formatted: Dict[float, str] = {}  # taken_at זהה לכל שורות הסיבוב
+        writer = csv.writer(out)
+        writer.writerow(names)
+        for start in range(0, meta["rows"], _CHUNK_ROWS):
+            chunk = []
+            for name in names:
+                column = columns[name][start:start + _CHUNK_ROWS]
+                if name in decoded:
+                    chunk.append(lookup[column].tolist())
+                elif name == "taken_at":
+                    chunk.append([formatted.get(t) or formatted.setdefault(t, _format_time(t)) for t in column.tolist()])
+                else:
+                    chunk.append(column.tolist())
+            writer.writerows(zip(*chunk))
+        return meta["rows"]
+
+    def import_csv(self, account: str, table: str, source) -> Dict[str, int]:
+        """הוספת סיבובים מ-CSV בפורמט של export_csv; הסיבובים צריכים להיות אחרי האחרון בטבלה"""
+        imported = rounds = 0
+        pending: List[Dict[str, Any]] = []
+        current: Optional[Tuple[int, str]] = None
+        for row in csv.DictReader(source):
+            marker = (int(row["round"]), row["taken_at"])
+            if current is not None and marker != current:
+                self.append(account, table, pending, _parse_time(current[1]), current[0])
+                imported, rounds, pending = imported + len(pending), rounds + 1, []
+            current = marker
+            pending.append(row)
+        if current is not None:
+            self.append(account, table, pending, _parse_time(current[1]), current[0])
+            imported, rounds = imported + len(pending), rounds + 1
+        return {"rows": imported, "rounds": rounds}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=("export", "import"))
+    parser.add_argument("table", choices=list(TABLES))
+    parser.add_argument("path", help="קובץ CSV (- לפלט/קלט סטנדרטי)")
+    parser.add_argument("--account", default="default")
+    parser.add_argument("--directory", help="תיקיית ההיסטוריה (ברירת מחדל: SPORT5_HISTORY_DIR)")
+    args = parser.parse_args()
+
+    store = HistoryStore(args.directory)
+    if args.command == "export":
+        if args.path == "-":
+            rows = store.export_csv(args.account, args.table, sys.stdout)
+        else:
+            with open(args.path, "w", encoding="utf-8", newline="") as f:
+                rows = store.export_csv(args.account, args.table, f)
+        print(f"{rows} שורות יוצאו", file=sys.stderr)
+    else:
+        try:
+            if args.path == "-":
+                result = store.import_csv(args.account, args.table, sys.stdin)
+            else:
+                with open(args.path, encoding="utf-8", newline="") as f:
+                    result = store.import_csv(args.account, args.table, f)
+        except (ValueError, KeyError) as e:
+            print(f"שגיאה בייבוא: {str(e)}", file=sys.stderr)
+            return 1
+        print(f"{result['rows']} שורות ב-{result['rounds']} סיבובים יובאו", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,49 +2,78 @@
 """
 Sport5 Fantasy League MCP Server with Google OAuth
 התחברות לאתר הפנטזי של ספורט 5 עם תמיכה בהתחברות Google
+
+המודולים הכבדים (aiohttp, aiohttp.web, lxml, webbrowser) נטענים רק בקריאה הראשונה לכלי שצריך אותם,
+כדי שה-handshake ו-list_tools יענו מהר כשה-host מפעיל את השרת
 """
 
+from __future__ import annotations
+
 import asyncio
-import json
+import functools
 import logging
 import os
 import secrets
-from typing import Any, Dict, List, Optional
+import time
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
 from urllib.parse import urljoin, urlparse, urlencode
-import webbrowser
 from datetime import datetime, timedelta
 
-import aiohttp
-from aiohttp import web
-from bs4 import BeautifulSoup
-from mcp.server import Server
+from mcp.server import NotificationOptions, Server
 from mcp.server.models import InitializationOptions
 from mcp.server.stdio import stdio_server
 from mcp.types import (
-    Resource,
-    Tool,
-    TextContent,
-    ImageContent,
-    EmbeddedResource,
+    ListResourceTemplatesRequest, ListResourceTemplatesResult, Resource, ResourceTemplate, ServerResult,
+    TextContent, Tool,
+)
+
+from sport5_format import FORMATS, format_argument, parse_price, serialize
+from sport5_history import AGGREGATES as HISTORY_AGGREGATES, TABLES as HISTORY_TABLES, HistoryStore
+from sport5_metrics import BYTES_BUCKETS, LoopLagMonitor, http_trace_config, metrics, route_template
+from sport5_oauth import GoogleTokenManager, OAuthError
+from sport5_outbound import (
+    RETRY_STATUSES, CircuitOpenError, OutboundPolicy, SingleFlight, TransientHTTPError,
+    default_outbound_policy, is_transient_error, retry_after_seconds,
+)
+from sport5_parser_pool import ParserPool, default_parser_pool
+from sport5_session_store import SessionStore, export_cookies, import_cookies
+from sport5_prefetch import GameweekCalendar, PrefetchScheduler
+from sport5_resources import (
+    PLAYER_TEMPLATE, RESOURCE_KINDS, ResourceHub, parse_resource_uri, player_uri, resource_uri,
 )
+from sport5_players import SORT_COLUMNS as PLAYER_SORT_COLUMNS, PlayerCatalog
+from sport5_snapshots import KINDS as SNAPSHOT_KINDS, SnapshotStore
+from sport5_transport import Transport, default_transport
+
+if TYPE_CHECKING:
+    import aiohttp
 
 # הגדרת לוגים
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# מצבי optimize_team: בניית סגל מאפס, או העברות מהסגל הנוכחי
+OPTIMIZE_MODES = ("squad", "transfers")
+
+def _extractor(name: str):
+    """פונקציית חילוץ מ-sport5_extract לפי שם - lxml נטען רק בפענוח הראשון"""
+    import sport5_extract
+    return getattr(sport5_extract, name)
+
 class GoogleOAuthHandler:
-    """טיפול בהתחברות Google OAuth"""
+    """טיפול בהתחברות Google OAuth - ה-URL וה-state כאן, הטוקנים ב-GoogleTokenManager"""
     
-    def __init__(self, client_id: str, client_secret: str, redirect_uri: str = "http://localhost:8000/oauth/callback"):
+    def __init__(self, client_id: str, client_secret: str, redirect_uri: str = "http://localhost:8000/oauth/callback",
+                 token_store: Optional[SessionStore] = None):
         self.client_id = client_id
         self.client_secret = client_secret
         self.redirect_uri = redirect_uri
         self.auth_url = "https://accounts.google.com/o/oauth2/v2/auth"
-        self.token_url = "https://oauth2.googleapis.com/token"
-        self.userinfo_url = "https://www.googleapis.com/oauth2/v2/userinfo"
+        self.tokens = GoogleTokenManager(client_id, client_secret, store=token_store)
         self.state = None
-        self.access_token = None
         self.user_info = None
+        self.account = None  # החשבון שיתחבר כשה-callback יגיע
         
     def generate_auth_url(self) -> str:
         """יצירת URL להתחברות Google"""
@@ -62,62 +91,434 @@ class GoogleOAuthHandler:
         
         return f"{self.auth_url}?{urlencode(params)}"
     
+    async def cached_user(self, account: str) -> Optional[Dict[str, Any]]:
+        """userinfo של חשבון שכבר אישר - בלי דפדפן; None אם צריך לעבור את תהליך ההתחברות"""
+        try:
+            await self.tokens.access_token(account)  # פנייה ל-Google רק אם הטוקן צריך רענון
+            return await self.tokens.user_info(account)
+        except OAuthError as e:
+            logger.info(f"אין טוקן Google בתוקף ל-{account}: {str(e)}")
+            return None
+    
     async def handle_callback(self, code: str, state: str) -> Dict[str, Any]:
         """טיפול ב-callback מ-Google"""
         if state != self.state:
             return {"success": False, "error": "State mismatch"}
+        self.state = None  # קוד אחד לכל URL - callback חוזר לא יוחלף שוב
         
-        # החלפת קוד ב-access token
-        token_data = {
-            "client_id": self.client_id,
-            "client_secret": self.client_secret,
-            "code": code,
-            "grant_type": "authorization_code",
-            "redirect_uri": self.redirect_uri
+        try:
+            self.user_info = await self.tokens.exchange_code(self.account or DEFAULT_ACCOUNT, code, self.redirect_uri)
+        except OAuthError as e:
+            logger.error(f"החלפת הקוד של Google נכשלה: {str(e)}")
+            return {"success": False, "error": str(e)}
+        return {
+            "success": True,
+            "user": self.user_info,
+            "message": "התחברות Google הצליחה"
         }
-        
-        async with aiohttp.ClientSession() as session:
-            async with session.post(self.token_url, data=token_data) as response:
-                if response.status == 200:
-                    token_response = await response.json()
-                    self.access_token = token_response.get("access_token")
-                    
-                    if self.access_token:
-                        # קבלת מידע על המשתמש
-                        headers = {"Authorization": f"Bearer {self.access_token}"}
-                        async with session.get(self.userinfo_url, headers=headers) as user_response:
-                            if user_response.status == 200:
-                                self.user_info = await user_response.json()
-                                return {
-                                    "success": True, 
-                                    "user": self.user_info,
-                                    "message": "התחברות Google הצליחה"
-                                }
-                
-                return {"success": False, "error": "Failed to get access token"}
+    
+    async def close(self):
+        await self.tokens.close()
+
+class SessionExpiredError(Exception):
+    """האתר הפנה לדף הכניסה - הסשן כבר לא מחובר"""
+    
+    def __init__(self):
+        super().__init__("הסשן פג - נדרשת התחברות מחדש")
+
+class ResponseTooLargeError(Exception):
+    """גוף התשובה גדול מ-max_body_bytes - ההורדה נעצרה"""
+    
+    def __init__(self, url: str, limit: int):
+        super().__init__(f"התשובה מ-{url} גדולה מ-{limit} בתים")
 
 class Sport5FantasyClient:
     """קליינט להתחברות ועבודה עם אתר הפנטזי של ספורט 5"""
     
-    def __init__(self):
-        self.base_url = "https://fantasyleague.sport5.co.il"
+    # הדפים שמרכיבים את get_dashboard: שם מקטע -> (נתיב, פונקציית חילוץ או שמה ב-sport5_extract)
+    dashboard_pages = {
+        "my_team": ("/my-team", "parse_my_team"),
+        "league": ("/league", "parse_league_table"),
+    }
+    
+    def __init__(self, cache_ttl: Optional[float] = None, cache_stale_ttl: Optional[float] = None,
+                 connector: Optional[aiohttp.BaseConnector] = None,
+                 account: Optional[str] = None, session_store: Optional[SessionStore] = None,
+                 parser_pool: Optional[ParserPool] = None, snapshot_store: Optional[SnapshotStore] = None,
+                 player_catalog: Optional[PlayerCatalog] = None, history_store: Optional[HistoryStore] = None,
+                 outbound: Optional[OutboundPolicy] = None, on_update=None, transport: Optional[Transport] = None):
+        self.base_url = os.getenv("SPORT5_BASE_URL", "https://fantasyleague.sport5.co.il")
         self.session = None
+        self.transport = transport or default_transport()  # live, הקלטה לארכיון או השמעה ממנו
+        self.connector = connector  # connector משותף מבריכת הסשנים (אם יש)
+        self.parser_pool = parser_pool or default_parser_pool()  # הפענוח רץ מחוץ ל-event loop
+        self.max_body_bytes = int(os.getenv("SPORT5_MAX_BODY_BYTES", str(50 * 1024 * 1024)))
+        self.stream_chunk_size = 64 * 1024  # גודל החתיכה שמוזנת למפענח ההדרגתי
+        self.outbound = outbound or default_outbound_policy()  # קצב, ניסיונות חוזרים ו-breaker - משותפים לכל החשבונות
+        self._singleflight = SingleFlight()  # משיכות זהות במקביל חולקות בקשה אחת
         self.logged_in = False
         self.user_data = {}
         self.login_method = None  # "credentials" או "google"
+        self.email = None
+        
+        # שמירת הסשן לדיסק; הסיסמה נשמרת רק בזיכרון לצורך התחברות מחדש שקופה
+        self.account = account
+        self.session_store = session_store
+        self._credentials = None
+        self._login_generation = 0
+        self._relogin_lock = None
+        
+        # צילומי מצב של הליגה והקבוצה לחישוב שינויים (get_changes)
+        self.snapshot_store = snapshot_store
+        self._snapshotted = {}  # סוג -> התוצאה האחרונה שצולמה (תוצאה מהמטמון לא מצולמת שוב)
+        self.history_store = history_store  # היסטוריה עמודתית לכל סיבוב (get_history)
+        self.on_update = on_update  # on_update(חשבון, סוג, תוצאה) לכל תוצאה חדשה - הודעות למנויי המשאבים
+        
+        # קטלוג השחקנים המשותף וסריקת דפי רשימת השחקנים
+        self.player_catalog = player_catalog
+        self.crawl_concurrency = int(os.getenv("SPORT5_CRAWL_CONCURRENCY", "4"))
+        
+        # סגלי היריבים בליגה (analyze_league) - נשמרים למחזור הנוכחי בלבד
+        self.rival_concurrency = int(os.getenv("SPORT5_RIVAL_CONCURRENCY", "8"))
+        self.rival_cache_size = int(os.getenv("SPORT5_RIVAL_CACHE_SIZE", "5000"))
+        self._rival_squads = {"gameweek": None, "squads": OrderedDict()}
+        
+        # מטמון תוצאות מפוענחות לפי URL (לכל סשן בנפרד)
+        self.cache_ttl = cache_ttl if cache_ttl is not None else float(os.getenv("SPORT5_CACHE_TTL", "60"))
+        self.cache_stale_ttl = cache_stale_ttl if cache_stale_ttl is not None else float(os.getenv("SPORT5_CACHE_STALE_TTL", "300"))
+        # LRU: כל חלון של הטבלה (offset/limit, סביב הקבוצה) הוא רשומה נפרדת, ולכן יש תקרה
+        self.cache_max_entries = int(os.getenv("SPORT5_CACHE_MAX_ENTRIES", "256"))
+        self.cache: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self.cache_counters = {
+            "hits": 0,
+            "stale_hits": 0,
+            "misses": 0,
+            "bypassed": 0,
+            "not_modified": 0,
+            "refreshed": 0,
+            "stale_on_error": 0,
+            "evicted": 0,
+        }
+        self._revalidations = {}
         
     async def __aenter__(self):
-        self.session = aiohttp.ClientSession(
+        import aiohttp
+        self.session = self.transport.wrap(aiohttp.ClientSession(
+            connector=self.connector,
+            connector_owner=self.connector is None,
             timeout=aiohttp.ClientTimeout(total=30),
+            trace_configs=[http_trace_config(metrics)],
             headers={
                 'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
             }
-        )
+        ))
         return self
         
     async def __aexit__(self, exc_type, exc_val, exc_tb):
+        for task in self._revalidations.values():
+            task.cancel()
+        self._revalidations.clear()
+        self._singleflight.cancel_all()
         if self.session:
+            self.save_session()
             await self.session.close()
+            self.session = None
+    
+    def export_state(self) -> Dict[str, Any]:
+        """מצב הסשן לשמירה: עוגיות, שיטת התחברות ופרטי משתמש (ללא סיסמה)"""
+        return {
+            "base_url": self.base_url,
+            "login_method": self.login_method,
+            "email": self.email,
+            "user_data": self.user_data,
+            "cookies": export_cookies(self.session.cookie_jar),
+        }
+    
+    def import_state(self, state: Dict[str, Any]):
+        """שחזור סשן שנשמר - הסשן נחשב מחובר עד שהאתר יפנה לדף הכניסה"""
+        import_cookies(self.session.cookie_jar, state.get("cookies", []))
+        self.login_method = state.get("login_method")
+        self.email = state.get("email")
+        self.user_data = state.get("user_data") or {}
+        self.logged_in = self.login_method is not None
+    
+    def save_session(self):
+        if self.session_store is None or self.account is None or self.session is None:
+            return
+        if self.logged_in:
+            self.session_store.save(self.account, self.export_state())
+        else:
+            self.session_store.delete(self.account)
+    
+    async def probe_session(self) -> bool:
+        """בדיקה זולה (HEAD בלי הפניות) האם הסשן עדיין מחובר"""
+        import aiohttp
+        try:
+            async with self.session.head(urljoin(self.base_url, "/my-team"), allow_redirects=False) as response:
+                return response.status == 200
+        except aiohttp.ClientError:
+            return False
+    
+    async def ensure_login(self, email: str, password: str) -> Dict[str, Any]:
+        """שימוש בסשן הקיים אם הוא עדיין בתוקף, אחרת התחברות מלאה"""
+        if self.logged_in and self.email == email and await self.probe_session():
+            self._credentials = (email, password)
+            return {"success": True, "message": "הסשן השמור עדיין בתוקף - לא נדרשה התחברות מחדש"}
+        
+        self.logged_in = False
+        self.session.cookie_jar.clear()
+        return await self.login_with_credentials(email, password)
+    
+    @staticmethod
+    def _redirected_to_login(response: aiohttp.ClientResponse) -> bool:
+        return response.url.path.rstrip("/") == "/login"
+    
+    async def _relogin(self, generation: int) -> bool:
+        """התחברות מחדש שקופה אחרי שהסשן פג (פעם אחת גם כשכמה קריאות נכשלו במקביל)"""
+        if self._relogin_lock is None:
+            self._relogin_lock = asyncio.Lock()
+        async with self._relogin_lock:
+            if self._login_generation != generation:
+                return self.logged_in
+            
+            self.logged_in = False
+            self.clear_cache()
+            if not self._credentials:
+                self.save_session()
+                return False
+            
+            logger.info("הסשן פג - מתחבר מחדש")
+            self.session.cookie_jar.clear()
+            result = await self.login_with_credentials(*self._credentials)
+            return bool(result.get("success"))
+    
+    def clear_cache(self):
+        """ניקוי המטמון (למשל אחרי התחברות מחדש)"""
+        self.cache.clear()
+    
+    def cached(self, path: str) -> Optional[Dict[str, Any]]:
+        """התוצאה השמורה של דף (בלי קשר לגילה), או None"""
+        entry = self.cache.get(urljoin(self.base_url, path))
+        return entry["data"] if entry is not None else None
+    
+    def keep_fresh(self, path: str, seconds: float):
+        """הארכת הטריות של דף במטמון - המתזמן ברקע ירענן אותו שוב לפני שהזמן עובר"""
+        entry = self.cache.get(urljoin(self.base_url, path))
+        if entry is not None:
+            entry["ttl"] = max(seconds, self.cache_ttl)
+    
+    def cache_stats(self) -> Dict[str, Any]:
+        """מוני פגיעות/החטאות של המטמון לכוונון ה-TTL"""
+        lookups = self.cache_counters["hits"] + self.cache_counters["stale_hits"] + self.cache_counters["misses"]
+        return {
+            **self.cache_counters,
+            "hit_ratio": round((self.cache_counters["hits"] + self.cache_counters["stale_hits"]) / lookups, 3) if lookups else None,
+            "entries": len(self.cache),
+            "max_entries": self.cache_max_entries,
+            "ttl": self.cache_ttl,
+            "stale_ttl": self.cache_stale_ttl,
+            "coalesced": self._singleflight.coalesced,
+            "breakers": self.outbound.stats(),
+        }
+    
+    async def _get_parsed(self, path: str, parser, fresh: bool = False, variant: Optional[str] = None) -> Dict[str, Any]:
+        """קבלת דף מפוענח דרך המטמון: טרי מוחזר מיד, ישן מוחזר ומתרענן ברקע
+
+        variant מבדיל בין כמה תוצאות שונות של אותו URL (למשל חלונות שונים של הטבלה).
+        """
+        url = urljoin(self.base_url, path)
+        key = url if variant is None else f"{url}#{variant}"
+        entry = self.cache.get(key)
+        
+        if entry is not None:
+            self.cache.move_to_end(key)
+        if entry is not None and not fresh:
+            age = time.monotonic() - entry["fetched_at"]
+            ttl = entry.get("ttl", self.cache_ttl)
+            if age < ttl:
+                self.cache_counters["hits"] += 1
+                return entry["data"]
+            if age < ttl + self.cache_stale_ttl:
+                self.cache_counters["stale_hits"] += 1
+                if key not in self._revalidations:
+                    self._revalidations[key] = asyncio.create_task(self._background_revalidate(url, parser, key))
+                return entry["data"]
+        
+        self.cache_counters["bypassed" if fresh else "misses"] += 1
+        try:
+            return await self._singleflight.do(key, lambda: self._fetch(url, parser, key))
+        except Exception as e:
+            # האתר למטה או עמוס: עדיף נתון ישן מהמטמון (גם אחרי חלון ה-stale) על שגיאה
+            entry = self.cache.get(key)
+            if entry is None or not (isinstance(e, CircuitOpenError) or is_transient_error(e)):
+                raise
+            self.cache_counters["stale_on_error"] += 1
+            logger.warning(f"משיכת {url} נכשלה ({str(e)}) - מוחזר נתון מהמטמון")
+            return entry["data"]
+    
+    async def _fetch(self, url: str, parser, key: str, **options) -> Dict[str, Any]:
+        """משיכה עם התחברות מחדש אוטומטית אם האתר הפנה לדף הכניסה"""
+        generation = self._login_generation
+        try:
+            return await self._revalidate(url, parser, key, **options)
+        except SessionExpiredError:
+            if not await self._relogin(generation):
+                raise
+            return await self._revalidate(url, parser, key, **options)
+    
+    async def _background_revalidate(self, url: str, parser, key: str):
+        try:
+            await self._singleflight.do(key, lambda: self._fetch(url, parser, key))
+        except Exception as e:
+            logger.warning(f"רענון ברקע נכשל עבור {url}: {str(e)}")
+        finally:
+            self._revalidations.pop(key, None)
+    
+    async def _snapshot(self, kind: str, data: Dict[str, Any]):
+        """צילום תוצאה חדשה למאגר ולהיסטוריה (ב-thread - גיבוב ליגה גדולה לא חוסם את ה-loop)"""
+        if self.account is None or self._snapshotted.get(kind) is data:
+            return
+        self._snapshotted[kind] = data
+        if self.snapshot_store is not None:
+            try:
+                with metrics.timer("sport5_snapshot_seconds", kind=kind):
+                    await asyncio.to_thread(self.snapshot_store.record, self.account, kind, data)
+            except OSError as e:
+                logger.warning(f"לא ניתן לשמור צילום מצב ({kind}): {str(e)}")
+        await self._record_history(kind, data)
+        await self._notify(kind, data)
+    
+    async def _notify(self, kind: str, data: Dict[str, Any]):
+        if self.on_update is None or self.account is None:
+            return
+        try:
+            await self.on_update(self.account, kind, data)
+        except Exception as e:
+            logger.warning(f"הודעת עדכון ({kind}) נכשלה: {str(e)}")
+    
+    async def _record_history(self, kind: str, data: Dict[str, Any]):
+        if self.history_store is None or self.account is None:
+            return
+        try:
+            with metrics.timer("sport5_history_append_seconds", kind=kind):
+                await asyncio.to_thread(self.history_store.record, self.account, kind, data)
+        except (OSError, ValueError) as e:
+            logger.warning(f"לא ניתן להוסיף להיסטוריה ({kind}): {str(e)}")
+    
+    async def _revalidate(self, url: str, parser, key: str, store: bool = True,
+                          budget: Optional[str] = None) -> Dict[str, Any]:
+        """GET מותנה (ETag / If-Modified-Since) דרך שכבת הבקשות היוצאות ועדכון המטמון
+
+        store=False משאיר את התוצאה מחוץ למטמון (למי ששומר אותה במבנה משלו); budget הוא תקציב הקצב.
+        """
+        entry = self.cache.get(key) if store else None
+        headers = {}
+        if entry is not None:
+            if entry["etag"]:
+                headers["If-None-Match"] = entry["etag"]
+            if entry["last_modified"]:
+                headers["If-Modified-Since"] = entry["last_modified"]
+        parsed_url = urlparse(url)
+        path = route_template(parsed_url.path)  # תווית המדדים - תבנית, לא נתיב לכל יריב
+        
+        # במצב process אין הזרמה: הגוף כולו עובר לתהליך עובד במקום שהמפענח ההדרגתי ירוץ על ה-loop
+        stream_factory = self._stream_factory(parser) if self.parser_pool.streams else None
+        
+        async def attempt():
+            # ניסיון שלם (כולל קריאת הגוף), כדי שניתוק באמצע הגוף ינוסה שוב כמו סטטוס 503
+            async with self.session.get(url, headers=headers) as response:
+                if self._redirected_to_login(response):
+                    raise SessionExpiredError()
+                if response.status in RETRY_STATUSES:
+                    raise TransientHTTPError(response.status, retry_after_seconds(response.headers.get("Retry-After")))
+                if response.status == 304 and entry is not None:
+                    return response.status, None, response.headers
+                
+                response.raise_for_status()
+                if (response.content_length or 0) > self.max_body_bytes:
+                    raise ResponseTooLargeError(url, self.max_body_bytes)
+                # זמן ההורדה (phase="body") נמדד בתוך הפונקציות - בלי זמן הפענוח, שנספר ב-sport5_parse_seconds
+                if stream_factory is None:
+                    data = await self._read_parsed(response, url, path, parser)
+                else:
+                    data = await self._stream_parsed(response, url, path, stream_factory)
+                return response.status, data, response.headers
+        
+        status, data, response_headers = await self.outbound.send(parsed_url.netloc, attempt, path=path, budget=budget)
+        if status == 304:
+            self.cache_counters["not_modified"] += 1
+            entry["fetched_at"] = time.monotonic()
+            return entry["data"]
+        
+        if status == 200 and store:
+            if entry is not None:
+                self.cache_counters["refreshed"] += 1
+            self.cache[key] = {
+                "data": data,
+                "etag": response_headers.get("ETag"),
+                "last_modified": response_headers.get("Last-Modified"),
+                "fetched_at": time.monotonic(),
+            }
+            self.cache.move_to_end(key)
+            while len(self.cache) > max(self.cache_max_entries, 1):
+                self.cache.popitem(last=False)
+                self.cache_counters["evicted"] += 1
+        return data
+    
+    @staticmethod
+    def _stream_factory(parser):
+        """המפענח ההדרגתי של פונקציית החילוץ (לפי שמה ב-sport5_extract.STREAMS), או None"""
+        import sport5_extract
+        keywords = {}
+        if isinstance(parser, functools.partial):
+            keywords, parser = parser.keywords, parser.func
+        name = parser if isinstance(parser, str) else getattr(parser, "__name__", None)
+        stream = sport5_extract.STREAMS.get(name)
+        return functools.partial(stream, **keywords) if stream is not None else None
+    
+    async def _read_parsed(self, response: aiohttp.ClientResponse, url: str, path: str, parser) -> Dict[str, Any]:
+        """הורדת הגוף כולו (עד max_body_bytes) ופענוח על מאגר העובדים"""
+        chunks, size = [], 0
+        started = time.perf_counter()
+        async for chunk in response.content.iter_chunked(self.stream_chunk_size):
+            size += len(chunk)
+            if size > self.max_body_bytes:
+                raise ResponseTooLargeError(url, self.max_body_bytes)
+            chunks.append(chunk)
+        metrics.observe("sport5_http_phase_seconds", time.perf_counter() - started, phase="body", path=path)
+        body = b"".join(chunks)
+        metrics.observe("sport5_response_bytes", size, buckets=BYTES_BUCKETS, path=path)
+        if isinstance(parser, str):
+            parser = _extractor(parser)
+        with metrics.timer("sport5_parse_seconds", page=path):
+            return await self.parser_pool.run(parser, body, encoding=response.charset)
+    
+    async def _stream_parsed(self, response: aiohttp.ClientResponse, url: str, path: str, stream_factory) -> Dict[str, Any]:
+        """פענוח תוך כדי הורדה: כל חתיכה מוזנת למפענח ההדרגתי ונזרקת, כך שהזיכרון תלוי בגודל
+        החתיכה ולא בגודל הדף. כשהמפענח סיים (למשל החלון התמלא) שאר הדף לא מורד בכלל."""
+        stream = stream_factory(encoding=response.charset)
+        size = 0
+        parse_seconds = 0.0
+        download_started = time.perf_counter()
+        async for chunk in response.content.iter_chunked(self.stream_chunk_size):
+            size += len(chunk)
+            if size > self.max_body_bytes:
+                raise ResponseTooLargeError(url, self.max_body_bytes)
+            started = time.perf_counter()
+            await self.parser_pool.run_local(stream.feed, chunk)
+            parse_seconds += time.perf_counter() - started
+            if stream.done:
+                response.close()  # החיבור נסגר במקום לקרוא את שאר הגוף
+                metrics.inc("sport5_stream_early_stops_total", path=path)
+                break
+        # זמן הלולאה פחות זמן ההזנה למפענח = זמן קריאת החתיכות בלבד
+        metrics.observe("sport5_http_phase_seconds", time.perf_counter() - download_started - parse_seconds,
+                        phase="body", path=path)
+        started = time.perf_counter()
+        data = await self.parser_pool.run_local(stream.close)
+        metrics.observe("sport5_parse_seconds", parse_seconds + time.perf_counter() - started, page=path)
+        metrics.observe("sport5_response_bytes", size, buckets=BYTES_BUCKETS, path=path)
+        return data
     
     async def login_with_credentials(self, email: str, password: str) -> Dict[str, Any]:
         """התחברות רגילה עם אימייל וסיסמה"""
@@ -125,14 +526,10 @@ class Sport5FantasyClient:
             # שלב 1: קבלת דף הכניסה וטוקן CSRF
             login_url = urljoin(self.base_url, "/login")
             async with self.session.get(login_url) as response:
-                html = await response.text()
-                soup = BeautifulSoup(html, 'html.parser')
+                body = await response.read()
                 
                 # חיפוש טוקן CSRF
-                csrf_token = None
-                csrf_input = soup.find('input', {'name': '_token'})
-                if csrf_input:
-                    csrf_token = csrf_input.get('value')
+                csrf_token = await self.parser_pool.run(_extractor("parse_csrf_token"), body, encoding=response.charset)
             
             # שלב 2: שליחת פרטי ההתחברות
             login_data = {
@@ -150,6 +547,11 @@ class Sport5FantasyClient:
                     if "my-team" in str(response.url) or "dashboard" in html.lower():
                         self.logged_in = True
                         self.login_method = "credentials"
+                        self.email = email
+                        self._credentials = (email, password)
+                        self._login_generation += 1
+                        self.clear_cache()
+                        self.save_session()
                         logger.info("התחברות רגילה הצליחה!")
                         return {"success": True, "message": "התחברות הצליחה"}
                     else:
@@ -177,6 +579,10 @@ class Sport5FantasyClient:
                 self.logged_in = True
                 self.login_method = "google"
                 self.user_data = google_user_info
+                self.email = email
+                self._login_generation += 1
+                self.clear_cache()
+                self.save_session()
                 return {
                     "success": True, 
                     "message": f"התחברות Google הצליחה למשתמש {google_user_info.get('name', email)}"
@@ -188,101 +594,459 @@ class Sport5FantasyClient:
             logger.error(f"שגיאה בהתחברות Google: {str(e)}")
             return {"success": False, "message": f"שגיאה: {str(e)}"}
     
-    async def get_my_team(self) -> Dict[str, Any]:
+    async def get_my_team(self, fresh: bool = False) -> Dict[str, Any]:
         """קבלת פרטי הקבוצה שלי"""
         if not self.logged_in:
             return {"error": "לא מחובר למערכת"}
         
         try:
-            my_team_url = urljoin(self.base_url, "/my-team")
-            async with self.session.get(my_team_url) as response:
-                html = await response.text()
-                soup = BeautifulSoup(html, 'html.parser')
-                
-                # חילוץ נתוני הקבוצה
-                team_data = {
-                    "players": [],
-                    "budget": None,
-                    "points": None,
-                    "team_name": None,
-                    "login_method": self.login_method
-                }
-                
-                # חיפוש שם הקבוצה
-                team_name_elem = soup.find(['h1', 'h2'], class_=lambda x: x and 'team' in x.lower())
-                if team_name_elem:
-                    team_data["team_name"] = team_name_elem.text.strip()
-                
-                # חיפוש שחקנים
-                players_section = soup.find_all(['div', 'tr'], class_=lambda x: x and 'player' in x.lower())
-                for player_elem in players_section:
-                    player_name = player_elem.find(['span', 'td'], class_=lambda x: x and 'name' in x.lower())
-                    player_price = player_elem.find(['span', 'td'], class_=lambda x: x and ('price' in x.lower() or 'cost' in x.lower()))
-                    
-                    if player_name:
-                        player_data = {
-                            "name": player_name.text.strip(),
-                            "price": player_price.text.strip() if player_price else None
-                        }
-                        team_data["players"].append(player_data)
-                
-                # חיפוש תקציב ונקודות
-                budget_elem = soup.find(['span', 'div'], class_=lambda x: x and 'budget' in x.lower())
-                if budget_elem:
-                    team_data["budget"] = budget_elem.text.strip()
-                
-                points_elem = soup.find(['span', 'div'], class_=lambda x: x and 'point' in x.lower())
-                if points_elem:
-                    team_data["points"] = points_elem.text.strip()
-                
-                return team_data
+            # חילוץ נתוני הקבוצה במעבר אחד (דרך המטמון)
+            parsed = await self._get_parsed("/my-team", "parse_my_team", fresh)
+            await self._snapshot("my_team", parsed)
+            team_data = dict(parsed)
+            team_data["login_method"] = self.login_method
+            
+            return team_data
                 
         except Exception as e:
             logger.error(f"שגיאה בקבלת נתוני הקבוצה: {str(e)}")
             return {"error": f"שגיאה: {str(e)}"}
     
-    async def get_league_table(self) -> Dict[str, Any]:
-        """קבלת טבלת הליגה"""
+    async def get_league_table(self, fresh: bool = False, offset: int = 0, limit: Optional[int] = None,
+                               around_my_team: bool = False) -> Dict[str, Any]:
+        """קבלת טבלת הליגה (כולה, או חלון לפי offset/limit או סביב הקבוצה שלי)"""
         if not self.logged_in:
             return {"error": "לא מחובר למערכת"}
         
         try:
-            league_url = urljoin(self.base_url, "/league")
-            async with self.session.get(league_url) as response:
-                html = await response.text()
-                soup = BeautifulSoup(html, 'html.parser')
-                
-                # חילוץ טבלת הליגה
-                table_data = {"teams": [], "login_method": self.login_method}
-                
-                table = soup.find('table', class_=lambda x: x and 'league' in x.lower())
-                if table:
-                    rows = table.find_all('tr')[1:]  # דילוג על כותרת
-                    for row in rows:
-                        cells = row.find_all(['td', 'th'])
-                        if len(cells) >= 3:
-                            team_info = {
-                                "position": cells[0].text.strip(),
-                                "team_name": cells[1].text.strip(),
-                                "points": cells[2].text.strip() if len(cells) > 2 else None
-                            }
-                            table_data["teams"].append(team_info)
+            if not around_my_team and offset == 0 and limit is None:
+                # חילוץ טבלת הליגה (דרך המטמון)
+                parsed = await self._get_parsed("/league", "parse_league_table", fresh)
+                await self._snapshot("league", parsed)
+                table_data = dict(parsed)
+            else:
+                team_name = None
+                if around_my_team:
+                    my_team = await self.get_my_team()
+                    team_name = my_team.get("team_name")
+                    if not team_name:
+                        return {"error": "לא נמצא שם הקבוצה שלי"}
                 
-                return table_data
+                # פענוח זורם שנעצר כשהחלון התמלא
+                parser = functools.partial(_extractor("parse_league_window"), offset=offset, limit=limit, team_name=team_name)
+                variant = f"around:{team_name}:{limit}" if around_my_team else f"window:{offset}:{limit}"
+                table_data = dict(await self._get_parsed("/league", parser, fresh, variant))
+            
+            table_data["login_method"] = self.login_method
+            
+            return table_data
                 
         except Exception as e:
             logger.error(f"שגיאה בקבלת טבלת הליגה: {str(e)}")
             return {"error": f"שגיאה: {str(e)}"}
 
+    async def get_dashboard(self, sections: Optional[List[str]] = None, fresh: bool = False) -> Dict[str, Any]:
+        """משיכה מקבילית של כל דפי הדשבורד על אותו סשן ומיזוגם למסמך אחד"""
+        if not self.logged_in:
+            return {"error": "לא מחובר למערכת"}
+        
+        names = sections or list(self.dashboard_pages)
+        unknown = [name for name in names if name not in self.dashboard_pages]
+        if unknown:
+            return {"error": f"מקטעים לא מוכרים: {', '.join(unknown)}"}
+        
+        started = time.perf_counter()
+        results = await asyncio.gather(
+            *(self._get_parsed(*self.dashboard_pages[name], fresh) for name in names),
+            return_exceptions=True
+        )
+        
+        dashboard = {"login_method": self.login_method}
+        errors = {}
+        for name, result in zip(names, results):
+            if isinstance(result, Exception):
+                logger.error(f"שגיאה בקבלת המקטע {name}: {str(result)}")
+                dashboard[name] = None
+                errors[name] = f"שגיאה: {str(result)}"
+            else:
+                dashboard[name] = result
+                if name in SNAPSHOT_KINDS:
+                    await self._snapshot(name, result)
+        
+        if errors:
+            dashboard["errors"] = errors
+        dashboard["elapsed_ms"] = round((time.perf_counter() - started) * 1000, 1)
+        
+        return dashboard
+
+    async def get_changes(self, kinds: Optional[List[str]] = None, since: Optional[str] = None,
+                          since_time: Optional[Any] = None, fresh: bool = False, limit: int = 50) -> Dict[str, Any]:
+        """מה השתנה מאז צילום מצב או זמן מסוים: מושכים (ומצלמים) את המצב הנוכחי ומשווים לבסיס"""
+        if not self.logged_in:
+            return {"error": "לא מחובר למערכת"}
+        if self.snapshot_store is None or self.account is None:
+            return {"error": "מאגר צילומי המצב לא מוגדר"}
+        
+        if not kinds and since:
+            # מזהה צילום שייך לסוג אחד - משווים רק את הסוג שבו הוא נמצא
+            kinds = [
+                kind for kind in SNAPSHOT_KINDS
+                if any(entry["id"] == since for entry in self.snapshot_store.snapshots(self.account, kind))
+            ]
+            if not kinds:
+                return {"error": f"צילום המצב {since} לא נמצא"}
+        kinds = kinds or list(SNAPSHOT_KINDS)
+        unknown = [kind for kind in kinds if kind not in SNAPSHOT_KINDS]
+        if unknown:
+            return {"error": f"סוגים לא מוכרים: {', '.join(unknown)}"}
+        
+        fetchers = {"my_team": self.get_my_team, "league": self.get_league_table}
+        current = await asyncio.gather(*(fetchers[kind](fresh=fresh) for kind in kinds))
+        
+        changes = {"login_method": self.login_method}
+        for kind, result in zip(kinds, current):
+            if "error" in result:
+                changes[kind] = {"error": result["error"]}
+            else:
+                changes[kind] = await asyncio.to_thread(
+                    self.snapshot_store.changes, self.account, kind, since, since_time, limit
+                )
+        return changes
+
+    async def sync_players(self, max_pages: Optional[int] = None) -> Dict[str, Any]:
+        """סריקת דפי רשימת השחקנים (עד crawl_concurrency בקשות במקביל) ועדכון הקטלוג
+
+        הדפים עוברים דרך המטמון עם GET מותנה, כך שבסריקה חוזרת דף שלא השתנה עולה רק 304,
+        והקטלוג כותב רק שחקנים שהנתונים שלהם השתנו.
+        """
+        if not self.logged_in:
+            return {"error": "לא מחובר למערכת"}
+        if self.player_catalog is None:
+            return {"error": "קטלוג השחקנים לא מוגדר"}
+        
+        started = time.perf_counter()
+        try:
+            first = await self._get_parsed("/players?page=1", "parse_player_list", fresh=True)
+            pages = first["pages"] if max_pages is None else min(first["pages"], max_pages)
+            
+            semaphore = asyncio.Semaphore(max(self.crawl_concurrency, 1))
+            
+            async def fetch_page(page: int) -> Dict[str, Any]:
+                async with semaphore:
+                    return await self._get_parsed(f"/players?page={page}", "parse_player_list", fresh=True)
+            
+            rest = await asyncio.gather(*(fetch_page(page) for page in range(2, pages + 1)))
+        except Exception as e:
+            logger.error(f"שגיאה בסריקת רשימת השחקנים: {str(e)}")
+            return {"error": f"שגיאה: {str(e)}"}
+        
+        players = [player for result in [first, *rest] for player in result["players"]]
+        result = await asyncio.to_thread(self.player_catalog.sync, players, complete=pages == first["pages"])
+        if pages == first["pages"]:
+            await self._record_history("players", {"players": players})
+        if result["added"] or result["updated"] or result["removed"]:
+            await self._notify("players", {"players": players})
+        result["pages"] = pages
+        result["elapsed_ms"] = round((time.perf_counter() - started) * 1000, 1)
+        return result
+
+    async def analyze_league(self, limit: Optional[int] = None, top: int = 20, fresh: bool = False,
+                             gameweek: Optional[str] = None, progress=None) -> Dict[str, Any]:
+        """אחזקה, קפטנות ומבדלים בליגה מתוך הסגלים של כל היריבים
+
+        דפי היריבים נמשכים עד rival_concurrency במקביל דרך שכבת הבקשות היוצאות, בתקציב הקצב
+        "rivals" - חלק מהקצב של האתר (ברירת מחדל 80% מ-5 בקשות לשנייה, כלומר כ-2 דקות לליגה של
+        500 קבוצות, כשהשאר נשמר לכלים האחרים), ומפוענחים עם parse_my_team. הסגלים לא נכנסים
+        למטמון הדפים: הם נשמרים רק ב-_rival_squads, עד rival_cache_size סגלים ועד שהמחזור
+        מתחלף, כך שניתוח חוזר באותו מחזור לא פונה לאתר. progress(done, total) נקרא כל 5%
+        מהדפים שנמשכו.
+        """
+        if not self.logged_in:
+            return {"error": "לא מחובר למערכת"}
+        
+        started = time.perf_counter()
+        league, my_team = await asyncio.gather(self.get_league_table(fresh=fresh), self.get_my_team(fresh=fresh))
+        for result in (league, my_team):
+            if "error" in result:
+                return {"error": result["error"]}
+        
+        rivals = [team for team in league["teams"]
+                  if team.get("team_url") and team.get("team_name") != my_team.get("team_name")]
+        if not rivals:
+            return {"error": "בטבלת הליגה אין קישורים לדפי הקבוצות של היריבים"}
+        if limit is not None:
+            rivals = rivals[:limit]
+        
+        gameweek = gameweek or GameweekCalendar().gameweek(time.time())
+        if self._rival_squads["gameweek"] != gameweek:
+            self._rival_squads = {"gameweek": gameweek, "squads": OrderedDict()}
+        squads = self._rival_squads["squads"]
+        missing = [team["team_url"] for team in rivals if fresh or team["team_url"] not in squads]
+        
+        semaphore = asyncio.Semaphore(max(self.rival_concurrency, 1))
+        step = max(len(missing) // 20, 1)
+        done = 0
+        errors = {}
+        fetched: Dict[str, Dict[str, Any]] = {}  # הסגלים של הקריאה הזו, גם אם נדחקו מהמטמון
+        
+        async def fetch_squad(url: str):
+            nonlocal done
+            async with semaphore:
+                try:
+                    full_url = urljoin(self.base_url, url)
+                    squads[url] = fetched[url] = await self._singleflight.do(full_url, lambda: self._fetch(
+                        full_url, "parse_my_team", full_url, store=False, budget="rivals"))
+                    squads.move_to_end(url)
+                    while len(squads) > self.rival_cache_size:
+                        squads.popitem(last=False)
+                except Exception as e:
+                    errors[url] = str(e)
+            done += 1
+            if progress is not None and (done % step == 0 or done == len(missing)):
+                await progress(done, len(missing))
+        
+        with metrics.timer("sport5_rival_fetch_seconds"):
+            await asyncio.gather(*(fetch_squad(url) for url in missing))
+        if errors:
+            logger.warning(f"{len(errors)} דפי יריבים לא נמשכו, למשל {next(iter(errors.values()))}")
+        
+        # numpy נטען רק בקריאה הראשונה לכלי
+        from sport5_rivals import analyze_squads
+        
+        analyzed = [fetched.get(team["team_url"]) or squads.get(team["team_url"]) for team in rivals]
+        analyzed = [squad for squad in analyzed if squad is not None]
+        result = await asyncio.to_thread(analyze_squads, analyzed, my_team, top)
+        result["gameweek"] = gameweek
+        result["fetched"] = len(missing) - len(errors)
+        result["from_cache"] = len(analyzed) - result["fetched"]
+        if errors:
+            result["failed"] = len(errors)
+            result["errors"] = dict(list(errors.items())[:5])
+        result["elapsed_ms"] = round((time.perf_counter() - started) * 1000, 1)
+        result["login_method"] = self.login_method
+        return result
+
+    async def optimize_team(self, mode: str = "squad", max_transfers: int = 1, budget: Optional[float] = None,
+                            time_limit: float = 1.0, fresh: bool = False) -> Dict[str, Any]:
+        """הסגל הטוב ביותר מקטלוג השחקנים, או סט ההעברות הטוב ביותר לסגל הנוכחי
+
+        התקציב (אם לא הועבר) הוא התקציב שנשאר בדף הקבוצה ועוד שווי השחקנים בסגל.
+        הפתרון רץ ב-thread, כך שהלולאה ממשיכה לשרת כלים אחרים בזמן החישוב.
+        """
+        if not self.logged_in:
+            return {"error": "לא מחובר למערכת"}
+        if self.player_catalog is None:
+            return {"error": "קטלוג השחקנים לא מוגדר"}
+        if mode not in OPTIMIZE_MODES:
+            return {"error": f"מצב לא מוכר: {mode} (אפשרויות: {', '.join(OPTIMIZE_MODES)})"}
+
+        players = await asyncio.to_thread(self.player_catalog.all_players)
+        if not players:
+            return {"error": "קטלוג השחקנים ריק - יש להריץ sync_players"}
+
+        owned_ids = None
+        if mode == "transfers" or budget is None:
+            team = await self.get_my_team(fresh=fresh)
+            if "error" in team:
+                return team
+            if budget is None:
+                left = parse_price(team.get("budget"))
+                prices = [parse_price(player.get("price")) for player in team.get("players", [])]
+                if left is None or None in prices:
+                    return {"error": "לא ניתן לחשב את התקציב מדף הקבוצה - יש להעביר budget"}
+                budget = left + sum(prices)
+            if mode == "transfers":
+                by_name = {player["name"]: player["id"] for player in players}
+                missing = [player.get("name") for player in team.get("players", []) if player.get("name") not in by_name]
+                if missing:
+                    return {"error": f"שחקני הסגל לא נמצאו בקטלוג: {', '.join(map(str, missing))} - יש להריץ sync_players"}
+                owned_ids = [by_name[player["name"]] for player in team.get("players", [])]
+
+        # numpy נטען רק בקריאה הראשונה לכלי
+        from sport5_optimizer import SquadOptimizer
+
+        def solve() -> Dict[str, Any]:
+            optimizer = SquadOptimizer(players, budget, owned_ids=owned_ids,
+                                       max_transfers=max_transfers if mode == "transfers" else None)
+            return optimizer.solve(time_limit=time_limit)
+
+        with metrics.timer("sport5_optimize_seconds", mode=mode):
+            result = await asyncio.to_thread(solve)
+        result["mode"] = mode
+        result["login_method"] = self.login_method
+        return result
+
+class Sport5SessionPool:
+    """בריכת סשנים לפי חשבון - כמה חשבונות פנטזי בתהליך אחד
+
+    כל החשבונות חולקים TCPConnector אחד (מגבלת חיבורים לכל host, keep-alive ומטמון DNS),
+    אבל לכל חשבון יש ClientSession ועוגיות משלו. סשנים שלא היו בשימוש נסגרים לפי LRU
+    או אחרי idle_timeout, והסגירה נעשית מיד ולא נשארת ל-garbage collector.
+    """
+    
+    def __init__(self, max_sessions: Optional[int] = None, idle_timeout: Optional[float] = None,
+                 limit_per_host: int = 8, session_store: Optional[SessionStore] = None,
+                 snapshot_store: Optional[SnapshotStore] = None, player_catalog: Optional[PlayerCatalog] = None,
+                 history_store: Optional[HistoryStore] = None, on_update=None):
+        self.max_sessions = max_sessions if max_sessions is not None else int(os.getenv("SPORT5_MAX_SESSIONS", "8"))
+        self.idle_timeout = idle_timeout if idle_timeout is not None else float(os.getenv("SPORT5_SESSION_IDLE_TIMEOUT", "1800"))
+        self.limit_per_host = limit_per_host
+        self.session_store = session_store
+        self.snapshot_store = snapshot_store
+        self.player_catalog = player_catalog
+        self.history_store = history_store
+        self.on_update = on_update
+        self._connector = None
+        self._clients = OrderedDict()  # חשבון -> (קליינט, זמן שימוש אחרון)
+        self._lock_obj = None
+    
+    @property
+    def _lock(self) -> asyncio.Lock:
+        # נוצר בתוך ה-event loop (הבריכה עצמה נוצרת בזמן import)
+        if self._lock_obj is None:
+            self._lock_obj = asyncio.Lock()
+        return self._lock_obj
+    
+    @property
+    def connector(self) -> aiohttp.TCPConnector:
+        if self._connector is None or self._connector.closed:
+            import aiohttp
+            self._connector = aiohttp.TCPConnector(
+                limit=self.limit_per_host * max(self.max_sessions, 1),
+                limit_per_host=self.limit_per_host,
+                ttl_dns_cache=300,
+                use_dns_cache=True,
+                keepalive_timeout=60,
+            )
+        return self._connector
+    
+    def accounts(self) -> List[str]:
+        return list(self._clients)
+    
+    def clients(self) -> List[Tuple[str, Sport5FantasyClient]]:
+        """הקליינטים הפתוחים, בלי לסמן אותם כשימוש - משימות רקע לא משאירות סשן פעיל"""
+        return [(account, client) for account, (client, _) in self._clients.items()]
+    
+    async def get(self, account: str) -> Optional[Sport5FantasyClient]:
+        """הקליינט של החשבון (או None), וסימונו כשימוש אחרון
+
+        אם לחשבון אין קליינט פתוח אבל יש סשן שמור בדיסק, הסשן משוחזר בלי פנייה לאתר.
+        """
+        async with self._lock:
+            await self._evict_idle()
+            item = self._clients.get(account)
+            if item is None:
+                state = self.session_store.load(account) if self.session_store else None
+                if state is None:
+                    return None
+                client = await self._open(account)
+                client.import_state(state)
+                logger.info(f"הסשן של {account} שוחזר מהדיסק")
+                await self._evict_over_capacity()
+                return client
+            self._clients[account] = (item[0], time.monotonic())
+            self._clients.move_to_end(account)
+            return item[0]
+    
+    async def create(self, account: str, **client_kwargs) -> Sport5FantasyClient:
+        """יצירת קליינט חדש לחשבון; הקליינט הקודם של אותו חשבון נסגר"""
+        async with self._lock:
+            previous = self._clients.pop(account, None)
+            if previous is not None:
+                await previous[0].__aexit__(None, None, None)
+            
+            client = await self._open(account, **client_kwargs)
+            await self._evict_idle()
+            await self._evict_over_capacity()
+            return client
+    
+    async def _open(self, account: str, **client_kwargs) -> Sport5FantasyClient:
+        client = Sport5FantasyClient(
+            connector=self.connector, account=account, session_store=self.session_store,
+            snapshot_store=self.snapshot_store, player_catalog=self.player_catalog,
+            history_store=self.history_store, on_update=self.on_update, **client_kwargs
+        )
+        await client.__aenter__()
+        self._clients[account] = (client, time.monotonic())
+        return client
+    
+    async def _evict_over_capacity(self):
+        while len(self._clients) > self.max_sessions:
+            evicted, (old_client, _) = self._clients.popitem(last=False)
+            logger.info(f"סגירת הסשן של {evicted} (LRU)")
+            await old_client.__aexit__(None, None, None)
+    
+    async def close(self, account: str):
+        async with self._lock:
+            item = self._clients.pop(account, None)
+            if item is not None:
+                await item[0].__aexit__(None, None, None)
+    
+    async def close_all(self):
+        async with self._lock:
+            while self._clients:
+                _, (client, _) = self._clients.popitem(last=False)
+                await client.__aexit__(None, None, None)
+            if self._connector is not None:
+                await self._connector.close()
+                self._connector = None
+    
+    async def _evict_idle(self):
+        now = time.monotonic()
+        idle = [account for account, (_, last_used) in self._clients.items() if now - last_used > self.idle_timeout]
+        for account in idle:
+            client, _ = self._clients.pop(account)
+            logger.info(f"סגירת הסשן של {account} (לא פעיל)")
+            await client.__aexit__(None, None, None)
+
 # משתנים גלובליים
 app = Server("sport5-fantasy-oauth")
-fantasy_client = None
+DEFAULT_ACCOUNT = "default"
+player_catalog = PlayerCatalog()
+history_store = HistoryStore()
+session_store = SessionStore()  # סשנים של האתר וטוקנים של Google, מוצפנים
+resource_hub = ResourceHub()  # מנויים למשאבי MCP (sport5://...) והודעות עדכון
+
+async def publish_resources(account: str, kind: str, data: Dict[str, Any]):
+    """תוצאה חדשה מקליינט (גם ממשיכה ברקע) -> הודעה למנויים של המשאבים שהתוכן שלהם השתנה"""
+    if kind == "players":
+        # משאבי השחקנים מגיעים מהקטלוג - נבדקים רק שחקנים שמישהו רשום אליהם
+        for uri in resource_hub.subscribed(player_uri("")):
+            _, player_id, _ = parse_resource_uri(uri, DEFAULT_ACCOUNT)
+            await resource_hub.publish(uri, await asyncio.to_thread(player_catalog.get, player_id))
+        return
+    for name, resource_kind in RESOURCE_KINDS.items():
+        if resource_kind == kind:
+            await resource_hub.publish(resource_uri(name, account, DEFAULT_ACCOUNT), data)
+
+session_pool = Sport5SessionPool(
+    session_store=session_store, snapshot_store=SnapshotStore(), player_catalog=player_catalog,
+    history_store=history_store, on_update=publish_resources
+)
+prefetcher = PrefetchScheduler(session_pool, history_store=history_store)
 google_oauth = None
 oauth_server_task = None
+oauth_server_ready = None  # asyncio.Event שמסומן כששרת ה-callback מאזין
 
-async def start_oauth_server():
-    """הפעלת שרת OAuth קטן לקבלת callback"""
-    global google_oauth
+async def ensure_oauth_server() -> Optional[str]:
+    """הפעלת שרת ה-callback (פעם אחת) והמתנה עד שהוא מאזין; מחזיר הודעת שגיאה אם ההפעלה נכשלה"""
+    global oauth_server_task, oauth_server_ready
+    if oauth_server_task is None or (oauth_server_task.done() and not oauth_server_ready.is_set()):
+        oauth_server_ready = asyncio.Event()
+        oauth_server_task = asyncio.create_task(start_oauth_server(oauth_server_ready))
+    if not oauth_server_ready.is_set():
+        ready = asyncio.create_task(oauth_server_ready.wait())
+        await asyncio.wait({ready, oauth_server_task}, return_when=asyncio.FIRST_COMPLETED)
+        ready.cancel()
+    if not oauth_server_ready.is_set():
+        error = oauth_server_task.exception()
+        logger.error(f"שרת ה-OAuth לא עלה: {error}")
+        return f"לא ניתן להפעיל את שרת ה-OAuth על localhost:8000: {error}"
+    return None
+
+async def start_oauth_server(ready: Optional[asyncio.Event] = None):
+    """הפעלת שרת OAuth קטן לקבלת callback; ready מסומן כשהשרת מאזין"""
+    from aiohttp import web
     oauth_app = web.Application()
     
     async def handle_callback(request):
@@ -293,6 +1057,11 @@ async def start_oauth_server():
         if code and state and google_oauth:
             result = await google_oauth.handle_callback(code, state)
             if result.get("success"):
+                # התחברות החשבון שביקש login_google
+                account = google_oauth.account or DEFAULT_ACCOUNT
+                client = await session_pool.create(account)
+                await client.login_with_google(result["user"])
+                prefetcher.wake()
                 return web.Response(
                     text="""
                     <html>
@@ -320,7 +1089,11 @@ async def start_oauth_server():
         
         return web.Response(text="Missing parameters", status=400)
     
+    async def handle_metrics(request):
+        return web.Response(text=metrics.render_prometheus(), content_type='text/plain', charset='utf-8')
+    
     oauth_app.router.add_get('/oauth/callback', handle_callback)
+    oauth_app.router.add_get('/metrics', handle_metrics)
     
     runner = web.AppRunner(oauth_app)
     await runner.setup()
@@ -328,9 +1101,96 @@ async def start_oauth_server():
     await site.start()
     
     logger.info("OAuth server started on http://localhost:8000")
+    if ready is not None:
+        ready.set()
     
     return runner
 
+# ארגומנט משותף לכל הכלים - בחירת החשבון בבריכת הסשנים
+ACCOUNT_ARGUMENT = {
+    "type": "string",
+    "description": "שם החשבון (ברירת מחדל: default) - לניהול כמה חשבונות פנטזי במקביל"
+}
+
+# פורמט הפלט של כלי הנתונים
+OUTPUT_FORMAT = os.getenv("SPORT5_OUTPUT_FORMAT", "pretty")
+FORMAT_ARGUMENT = {
+    "type": "string",
+    "enum": list(FORMATS),
+    "description": "פורמט הפלט: pretty (JSON מוזח), compact (JSON צפוף) או columnar (עמודות פעם אחת ושורות כמערכים, מספרים כמספרים)"
+}
+
+RESOURCE_TITLES = {"my-team": "הקבוצה שלי", "league": "טבלת הליגה"}
+
+@app.list_resources()
+async def handle_list_resources() -> List[Resource]:
+    """הקבוצה והליגה של חשבון ברירת המחדל ושל כל חשבון מחובר; שחקנים לפי התבנית"""
+    accounts = [DEFAULT_ACCOUNT] + [account for account in session_pool.accounts() if account != DEFAULT_ACCOUNT]
+    return [
+        Resource(
+            uri=resource_uri(name, account, DEFAULT_ACCOUNT),
+            name=title if account == DEFAULT_ACCOUNT else f"{title} ({account})",
+            description=f"{title} מהמטמון - אפשר להירשם ולקבל הודעה רק כשהתוכן משתנה",
+            mimeType="application/json",
+        )
+        for account in accounts
+        for name, title in RESOURCE_TITLES.items()
+    ]
+
+async def handle_list_resource_templates(_) -> ServerResult:
+    # ל-Server של mcp 1.0 אין decorator לתבניות - ה-handler נרשם ישירות
+    return ServerResult(ListResourceTemplatesResult(resourceTemplates=[
+        ResourceTemplate(
+            uriTemplate=PLAYER_TEMPLATE,
+            name="שחקן מהקטלוג",
+            description="שחקן לפי המזהה שלו בקטלוג (מתעדכן ב-sync_players)",
+            mimeType="application/json",
+        )
+    ]))
+
+app.request_handlers[ListResourceTemplatesRequest] = handle_list_resource_templates
+
+async def _resource_content(uri: str) -> Optional[Dict[str, Any]]:
+    """התוכן הנוכחי של משאב, דרך המטמון של הקליינט (ValueError אם אין)"""
+    kind, player_id, account = parse_resource_uri(uri, DEFAULT_ACCOUNT)
+    if kind == "player":
+        player = await asyncio.to_thread(player_catalog.get, player_id)
+        if player is None:
+            raise ValueError(f"השחקן {player_id} לא נמצא בקטלוג - יש להריץ sync_players")
+        return player
+    client = await session_pool.get(account)
+    if client is None or not client.logged_in:
+        raise ValueError("נדרשת התחברות קודם")
+    result = await (client.get_my_team() if kind == "my_team" else client.get_league_table())
+    if "error" in result:
+        raise ValueError(result["error"])
+    # אותו תוכן שמגיע ל-publish_resources, כדי שה-hash יהיה בר השוואה
+    return {key: value for key, value in result.items() if key != "login_method"}
+
+@app.read_resource()
+async def handle_read_resource(uri) -> str:
+    uri = str(uri)
+    kind = parse_resource_uri(uri, DEFAULT_ACCOUNT)[0]
+    with metrics.timer("sport5_resource_read_seconds", kind=kind):
+        data = await _resource_content(uri)
+        resource_hub.served(uri, data)
+        return serialize(data, OUTPUT_FORMAT)
+
+@app.subscribe_resource()
+async def handle_subscribe_resource(uri):
+    uri = str(uri)
+    parse_resource_uri(uri, DEFAULT_ACCOUNT)  # ValueError לכתובת לא מוכרת
+    resource_hub.subscribe(uri, app.request_context.session)
+    try:
+        resource_hub.baseline(uri, await _resource_content(uri))
+    except ValueError:
+        pass  # עוד אין תוכן (לא מחובר / קטלוג ריק) - התוכן הראשון יהיה הבסיס
+    prefetcher.wake()  # שינויים נמשכים ברקע ונדחפים למנוי
+
+@app.unsubscribe_resource()
+async def handle_unsubscribe_resource(uri):
+    resource_hub.unsubscribe(str(uri), app.request_context.session)
+
 @app.list_tools()
 async def handle_list_tools() -> List[Tool]:
     """רשימת הכלים הזמינים"""
@@ -358,7 +1218,9 @@ async def handle_list_tools() -> List[Tool]:
             description="התחברות דרך Google OAuth - פותח דפדפן לאישור",
             inputSchema={
                 "type": "object",
-                "properties": {}
+                "properties": {
+                    "account": ACCOUNT_ARGUMENT
+                }
             }
         ),
         Tool(
@@ -367,6 +1229,7 @@ async def handle_list_tools() -> List[Tool]:
             inputSchema={
                 "type": "object",
                 "properties": {
+                    "account": ACCOUNT_ARGUMENT,
                     "email": {
                         "type": "string",
                         "description": "כתובת אימייל"
@@ -384,23 +1247,317 @@ async def handle_list_tools() -> List[Tool]:
             description="קבלת פרטי הקבוצה שלי",
             inputSchema={
                 "type": "object",
-                "properties": {}
+                "properties": {
+                    "account": ACCOUNT_ARGUMENT,
+                    "format": FORMAT_ARGUMENT,
+                    "fresh": {
+                        "type": "boolean",
+                        "description": "עקיפת המטמון ומשיכת נתונים עדכניים מהאתר"
+                    }
+                }
             }
         ),
         Tool(
             name="get_league_table",
-            description="קבלת טבלת הליגה",
+            description="קבלת טבלת הליגה (אפשר לבקש רק חלון של שורות)",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "account": ACCOUNT_ARGUMENT,
+                    "format": FORMAT_ARGUMENT,
+                    "fresh": {
+                        "type": "boolean",
+                        "description": "עקיפת המטמון ומשיכת נתונים עדכניים מהאתר"
+                    },
+                    "offset": {
+                        "type": "integer",
+                        "minimum": 0,
+                        "description": "מספר השורות לדלג מתחילת הטבלה"
+                    },
+                    "limit": {
+                        "type": "integer",
+                        "minimum": 1,
+                        "description": "מספר השורות המקסימלי להחזיר"
+                    },
+                    "around_my_team": {
+                        "type": "boolean",
+                        "description": "חלון של limit שורות (ברירת מחדל 10) סביב הקבוצה שלי"
+                    }
+                }
+            },
+        ),
+        Tool(
+            name="analyze_league",
+            description="ניתוח הסגלים של כל היריבים בליגה: אחוזי אחזקה וקפטנות, אחזקה אפקטיבית, המבדלים שלי והאיומים (סגלים נשמרים לכל מחזור)",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "account": ACCOUNT_ARGUMENT,
+                    "format": FORMAT_ARGUMENT,
+                    "limit": {
+                        "type": "integer",
+                        "minimum": 1,
+                        "description": "ניתוח רק של היריבים הראשונים בטבלה (ברירת מחדל: כולם)"
+                    },
+                    "top": {
+                        "type": "integer",
+                        "minimum": 1,
+                        "description": "מספר השחקנים בכל רשימה (ברירת מחדל: 20)"
+                    },
+                    "fresh": {
+                        "type": "boolean",
+                        "description": "משיכת כל הסגלים מחדש במקום מהמטמון של המחזור"
+                    }
+                }
+            }
+        ),
+        Tool(
+            name="get_dashboard",
+            description="תמונת מצב מלאה בקריאה אחת: הקבוצה שלי וטבלת הליגה נמשכות במקביל",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "account": ACCOUNT_ARGUMENT,
+                    "format": FORMAT_ARGUMENT,
+                    "sections": {
+                        "type": "array",
+                        "items": {
+                            "type": "string",
+                            "enum": list(Sport5FantasyClient.dashboard_pages)
+                        },
+                        "description": "המקטעים לכלול (ברירת מחדל: כולם)"
+                    },
+                    "fresh": {
+                        "type": "boolean",
+                        "description": "עקיפת המטמון ומשיכת נתונים עדכניים מהאתר"
+                    }
+                }
+            }
+        ),
+        Tool(
+            name="get_changes",
+            description="מה השתנה מאז הפעם הקודמת שהכלי נקרא (או מאז צילום/זמן מסוים): שינויי דירוג ונקודות בליגה, העברות ושינויי מחיר בקבוצה. קריאה חוזרת בלי נתונים חדשים מחזירה רשימה ריקה",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "account": ACCOUNT_ARGUMENT,
+                    "format": FORMAT_ARGUMENT,
+                    "kinds": {
+                        "type": "array",
+                        "items": {
+                            "type": "string",
+                            "enum": list(SNAPSHOT_KINDS)
+                        },
+                        "description": "מה להשוות (ברירת מחדל: הכל)"
+                    },
+                    "since": {
+                        "type": "string",
+                        "description": "מזהה צילום מצב להשוואה (מופיע ב-from/to של תשובה קודמת)"
+                    },
+                    "since_time": {
+                        "type": "string",
+                        "description": "זמן ISO (למשל 2024-03-01T20:00) - השוואה לצילום האחרון שנלקח עד אז"
+                    },
+                    "fresh": {
+                        "type": "boolean",
+                        "description": "עקיפת המטמון ומשיכת נתונים עדכניים מהאתר"
+                    },
+                    "limit": {
+                        "type": "integer",
+                        "description": "מספר מקסימלי של פריטים בכל רשימת שינויים (ברירת מחדל: 50)"
+                    }
+                }
+            }
+        ),
+        Tool(
+            name="sync_players",
+            description="סריקת רשימת השחקנים באתר ועדכון קטלוג השחקנים המקומי (רק שחקנים שהשתנו נכתבים)",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "account": ACCOUNT_ARGUMENT,
+                    "max_pages": {
+                        "type": "integer",
+                        "description": "מספר מקסימלי של דפים לסרוק (ברירת מחדל: כולם)"
+                    }
+                }
+            }
+        ),
+        Tool(
+            name="search_players",
+            description="חיפוש שחקנים בקטלוג המקומי לפי עמדה, קבוצה, מחיר ונקודות, עם מיון ו-top-K (בלי פנייה לאתר)",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "account": ACCOUNT_ARGUMENT,
+                    "format": FORMAT_ARGUMENT,
+                    "position": {
+                        "type": "string",
+                        "description": "עמדה (למשל GK, DEF, MID, FWD)"
+                    },
+                    "club": {
+                        "type": "string",
+                        "description": "קבוצה בליגה האמיתית"
+                    },
+                    "name": {
+                        "type": "string",
+                        "description": "חלק משם השחקן"
+                    },
+                    "min_price": {"type": "number", "description": "מחיר מינימלי (במיליונים)"},
+                    "max_price": {"type": "number", "description": "מחיר מקסימלי (במיליונים)"},
+                    "min_points": {"type": "number", "description": "מינימום נקודות"},
+                    "sort_by": {
+                        "type": "string",
+                        "enum": list(PLAYER_SORT_COLUMNS),
+                        "description": "מיון לפי (ברירת מחדל: points; value = נקודות למיליון)"
+                    },
+                    "ascending": {
+                        "type": "boolean",
+                        "description": "מיון עולה במקום יורד"
+                    },
+                    "limit": {
+                        "type": "integer",
+                        "description": "כמה שחקנים להחזיר (ברירת מחדל: 20)"
+                    },
+                    "offset": {
+                        "type": "integer",
+                        "description": "דילוג על התוצאות הראשונות (לדפדוף)"
+                    }
+                }
+            }
+        ),
+        Tool(
+            name="get_history",
+            description="מגמות לאורך העונה מההיסטוריה המקומית: סדרה לפי סיבוב (למשל הדירוג שלי או הנקודות של שחקן), או צבירה לכל הקבוצות/השחקנים",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "account": ACCOUNT_ARGUMENT,
+                    "format": FORMAT_ARGUMENT,
+                    "table": {
+                        "type": "string",
+                        "enum": list(HISTORY_TABLES),
+                        "description": "league = טבלת הליגה, team = סיכום הקבוצה שלי, squad = שחקני הסגל, players = קטלוג השחקנים"
+                    },
+                    "key": {
+                        "type": "string",
+                        "description": "שם קבוצה (league/team), שם שחקן (squad) או מזהה שחקן (players) - מחזיר את הסדרה שלו"
+                    },
+                    "field": {
+                        "type": "string",
+                        "description": "השדה המספרי (points, position, price, budget; ברירת מחדל: points)"
+                    },
+                    "aggregate": {
+                        "type": "string",
+                        "enum": list(HISTORY_AGGREGATES),
+                        "description": "צבירה על הטווח; בלי key - לכל קבוצה/שחקן וממוין (למשל change = הכי הרבה נקודות בטווח)"
+                    },
+                    "from_round": {"type": "integer", "description": "מהסיבוב (כולל)"},
+                    "to_round": {"type": "integer", "description": "עד הסיבוב (כולל)"},
+                    "since_time": {"type": "string", "description": "מזמן ISO (כולל)"},
+                    "until_time": {"type": "string", "description": "עד זמן ISO (כולל)"},
+                    "ascending": {"type": "boolean", "description": "מיון עולה של הצבירה במקום יורד"},
+                    "limit": {
+                        "type": "integer",
+                        "description": "מספר מקסימלי של שורות בתוצאה (ברירת מחדל: 50)"
+                    }
+                },
+                "required": ["table"]
+            }
+        ),
+        Tool(
+            name="optimize_team",
+            description="הסגל הטוב ביותר (או ההעברות הטובות ביותר) לפי נקודות צפויות, תחת התקציב, מכסות העמדות ומגבלת 3 שחקנים לקבוצה",
             inputSchema={
                 "type": "object",
-                "properties": {}
+                "properties": {
+                    "account": ACCOUNT_ARGUMENT,
+                    "format": FORMAT_ARGUMENT,
+                    "mode": {
+                        "type": "string",
+                        "enum": list(OPTIMIZE_MODES),
+                        "description": "squad = סגל חדש מאפס, transfers = העברות מהסגל הנוכחי (ברירת מחדל: squad)"
+                    },
+                    "max_transfers": {
+                        "type": "integer",
+                        "description": "מספר העברות מקסימלי במצב transfers (ברירת מחדל: 1)"
+                    },
+                    "budget": {
+                        "type": "number",
+                        "description": "תקציב כולל במיליונים (ברירת מחדל: התקציב שנשאר + שווי הסגל הנוכחי)"
+                    },
+                    "time_limit": {
+                        "type": "number",
+                        "description": "מגבלת זמן לפותר בשניות; כשהיא נגמרת מוחזר הפתרון הטוב ביותר שנמצא (ברירת מחדל: 1)"
+                    },
+                    "fresh": {
+                        "type": "boolean",
+                        "description": "משיכת דף הקבוצה מחדש במקום מהמטמון"
+                    }
+                }
+            }
+        ),
+        Tool(
+            name="get_metrics",
+            description="מדדי ביצועים: זמני רשת/פענוח/סריאליזציה לכל שלב, גדלי תשובות ושגיאות לכל כלי",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "profile_tool": {
+                        "type": "string",
+                        "description": "הפעלת cProfile על הקריאה הבאה לכלי הזה; התוצאה מופיעה ב-last_profile"
+                    },
+                    "reset": {
+                        "type": "boolean",
+                        "description": "איפוס המדדים אחרי הקריאה"
+                    }
+                }
+            }
+        ),
+        Tool(
+            name="get_cache_stats",
+            description="סטטיסטיקות מטמון הדפים (פגיעות, החטאות, רענונים)",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "account": ACCOUNT_ARGUMENT
+                }
             }
         )
     ]
 
+def _json_content(name: str, result: Any, fmt: str = "pretty") -> List[TextContent]:
+    """סריאליזציה של תוצאת כלי (pretty / compact / columnar) עם מדידת זמן וגודל"""
+    if isinstance(result, dict) and ("error" in result or result.get("success") is False):
+        metrics.inc("sport5_tool_errors_total", tool=name)
+    with metrics.timer("sport5_serialize_seconds", tool=name, format=fmt):
+        text = serialize(result, fmt)
+    metrics.observe("sport5_tool_output_bytes", len(text.encode("utf-8")), buckets=BYTES_BUCKETS, tool=name)
+    return [TextContent(type="text", text=text)]
+
+def _login_required(name: str) -> List[TextContent]:
+    metrics.inc("sport5_tool_errors_total", tool=name)
+    return [TextContent(type="text", text="נדרשת התחברות קודם")]
+
 @app.call_tool()
 async def handle_call_tool(name: str, arguments: Dict[str, Any]) -> List[TextContent]:
+    """טיפול בקריאות לכלים (עם מדידת זמנים ו-cProfile לפי דרישה)"""
+    metrics.inc("sport5_tool_calls_total", tool=name)
+    profiler = metrics.start_profile(name)
+    try:
+        with metrics.timer("sport5_tool_seconds", tool=name):
+            return await _dispatch_tool(name, arguments or {})
+    except Exception:
+        metrics.inc("sport5_tool_errors_total", tool=name)
+        raise
+    finally:
+        metrics.finish_profile(name, profiler)
+
+async def _dispatch_tool(name: str, arguments: Dict[str, Any]) -> List[TextContent]:
     """טיפול בקריאות לכלים"""
-    global fantasy_client, google_oauth, oauth_server_task
+    global google_oauth
+    
+    account = arguments.get("account") or DEFAULT_ACCOUNT
     
     if name == "setup_google_oauth":
         client_id = arguments.get("client_id")
@@ -409,13 +1566,16 @@ async def handle_call_tool(name: str, arguments: Dict[str, Any]) -> List[TextCon
         if not client_id or not client_secret:
             return [TextContent(type="text", text="חסרים פרטי Google OAuth")]
         
-        # יצירת Google OAuth handler
-        google_oauth = GoogleOAuthHandler(client_id, client_secret)
+        # יצירת Google OAuth handler (אותם פרטים - נשארים הטוקנים ומשימות הרענון הקיימים)
+        if google_oauth is None or (google_oauth.client_id, google_oauth.client_secret) != (client_id, client_secret):
+            if google_oauth is not None:
+                await google_oauth.close()
+            google_oauth = GoogleOAuthHandler(client_id, client_secret, token_store=session_store)
         
-        # הפעלת OAuth server
-        if not oauth_server_task:
-            oauth_server_task = asyncio.create_task(start_oauth_server())
-            await asyncio.sleep(1)  # המתנה קצרה להפעלת השרת
+        # הפעלת OAuth server - ממתינים בדיוק עד שהוא מאזין
+        error = await ensure_oauth_server()
+        if error:
+            return [TextContent(type="text", text=error)]
         
         return [TextContent(type="text", text="Google OAuth הוגדר בהצלחה! עכשיו תוכל להשתמש ב-login_google")]
     
@@ -423,11 +1583,30 @@ async def handle_call_tool(name: str, arguments: Dict[str, Any]) -> List[TextCon
         if not google_oauth:
             return [TextContent(type="text", text="צריך להגדיר Google OAuth קודם עם setup_google_oauth")]
         
-        # יצירת URL להתחברות
+        # חשבון שכבר אישר: טוקן בתוקף (או refresh token) ו-userinfo שמור - בלי דפדפן
+        user = await google_oauth.cached_user(account)
+        if user is not None:
+            fantasy_client = await session_pool.get(account)
+            if fantasy_client is None or fantasy_client.email != user.get("email"):
+                fantasy_client = await session_pool.create(account)
+            if fantasy_client.logged_in and fantasy_client.login_method == "google":
+                result = {"success": True, "message": "הטוקן של Google עדיין בתוקף - לא נדרשה התחברות מחדש"}
+            else:
+                result = await fantasy_client.login_with_google(user)
+                prefetcher.wake()
+            return _json_content(name, result)
+        
+        error = await ensure_oauth_server()
+        if error:
+            return [TextContent(type="text", text=error)]
+        
+        # יצירת URL להתחברות (החשבון יתחבר כשיגיע ה-callback)
+        google_oauth.account = account
         auth_url = google_oauth.generate_auth_url()
         
         # פתיחת דפדפן
         try:
+            import webbrowser
             webbrowser.open(auth_url)
             return [TextContent(
                 type="text", 
@@ -446,45 +1625,223 @@ async def handle_call_tool(name: str, arguments: Dict[str, Any]) -> List[TextCon
         if not email or not password:
             return [TextContent(type="text", text="חסרים פרטי התחברות")]
         
-        # יצירת קליינט חדש
-        fantasy_client = Sport5FantasyClient()
-        await fantasy_client.__aenter__()
+        # סשן קיים/שמור של אותו משתמש נבדק קודם; אחרת קליינט חדש לחשבון (הקודם נסגר)
+        fantasy_client = await session_pool.get(account)
+        if fantasy_client is None or fantasy_client.email != email:
+            fantasy_client = await session_pool.create(account)
         
-        result = await fantasy_client.login_with_credentials(email, password)
-        return [TextContent(type="text", text=json.dumps(result, ensure_ascii=False, indent=2))]
+        result = await fantasy_client.ensure_login(email, password)
+        if result.get("success"):
+            prefetcher.wake()  # המשיכה המוקדמת מתחילה מיד לחשבון שהתחבר
+        return _json_content(name, result)
     
-    elif name == "get_my_team":
+    elif name == "get_metrics":
+        profile_tool = arguments.get("profile_tool")
+        if profile_tool:
+            metrics.profile_tool = profile_tool
+        
+        result = metrics.snapshot()
+        result["last_profile"] = metrics.last_profile
+        result["profile_armed_for"] = metrics.profile_tool
+        result["prefetch"] = prefetcher.stats()
+        result["resources"] = resource_hub.stats()
+        result["transport"] = default_transport().stats()
+        if arguments.get("reset"):
+            metrics.reset()
+        return _json_content(name, result)
+    
+    fantasy_client = await session_pool.get(account)
+    
+    if name == "get_my_team":
         if not fantasy_client or not fantasy_client.logged_in:
-            return [TextContent(type="text", text="נדרשת התחברות קודם")]
+            return _login_required(name)
         
-        result = await fantasy_client.get_my_team()
-        return [TextContent(type="text", text=json.dumps(result, ensure_ascii=False, indent=2))]
+        result = await fantasy_client.get_my_team(fresh=bool(arguments.get("fresh", False)))
+        return _json_content(name, result, format_argument(arguments, OUTPUT_FORMAT))
     
     elif name == "get_league_table":
         if not fantasy_client or not fantasy_client.logged_in:
-            return [TextContent(type="text", text="נדרשת התחברות קודם")]
+            return _login_required(name)
+        
+        limit = arguments.get("limit")
+        result = await fantasy_client.get_league_table(
+            fresh=bool(arguments.get("fresh", False)),
+            offset=max(int(arguments.get("offset", 0)), 0),
+            limit=max(int(limit), 1) if limit is not None else None,
+            around_my_team=bool(arguments.get("around_my_team", False))
+        )
+        return _json_content(name, result, format_argument(arguments, OUTPUT_FORMAT))
+    
+    elif name == "analyze_league":
+        if not fantasy_client or not fantasy_client.logged_in:
+            return _login_required(name)
+        
+        # התקדמות נשלחת רק אם הלקוח ביקש (progressToken בבקשה)
+        try:
+            context = app.request_context
+        except LookupError:
+            context = None  # קריאה ישירה, לא מתוך בקשת MCP
+        token = context.meta.progressToken if context is not None and context.meta is not None else None
+        
+        async def progress(done: int, total: int):
+            await context.session.send_progress_notification(token, done, total)
+        
+        limit = arguments.get("limit")
+        result = await fantasy_client.analyze_league(
+            limit=max(int(limit), 1) if limit is not None else None,
+            top=min(max(int(arguments.get("top", 20)), 1), 200),
+            fresh=bool(arguments.get("fresh", False)),
+            gameweek=prefetcher.calendar.gameweek(time.time()),
+            progress=progress if token is not None else None
+        )
+        return _json_content(name, result, format_argument(arguments, OUTPUT_FORMAT))
+    
+    elif name == "get_dashboard":
+        if not fantasy_client or not fantasy_client.logged_in:
+            return _login_required(name)
+        
+        result = await fantasy_client.get_dashboard(
+            sections=arguments.get("sections"),
+            fresh=bool(arguments.get("fresh", False))
+        )
+        return _json_content(name, result, format_argument(arguments, OUTPUT_FORMAT))
+    
+    elif name == "get_changes":
+        if not fantasy_client or not fantasy_client.logged_in:
+            return _login_required(name)
+        
+        result = await fantasy_client.get_changes(
+            kinds=arguments.get("kinds"),
+            since=arguments.get("since"),
+            since_time=arguments.get("since_time"),
+            fresh=bool(arguments.get("fresh", False)),
+            limit=max(int(arguments.get("limit", 50)), 1)
+        )
+        return _json_content(name, result, format_argument(arguments, OUTPUT_FORMAT))
+    
+    elif name == "sync_players":
+        if not fantasy_client or not fantasy_client.logged_in:
+            return _login_required(name)
         
-        result = await fantasy_client.get_league_table()
-        return [TextContent(type="text", text=json.dumps(result, ensure_ascii=False, indent=2))]
+        max_pages = arguments.get("max_pages")
+        result = await fantasy_client.sync_players(max_pages=max(int(max_pages), 1) if max_pages is not None else None)
+        return _json_content(name, result)
     
-    else:
-        return [TextContent(type="text", text=f"כלי לא מוכר: {name}")]
+    elif name == "search_players":
+        stats = await asyncio.to_thread(player_catalog.stats)
+        if not stats["players"]:
+            # קטלוג ריק - סריקה ראשונה אם יש חשבון מחובר
+            if not fantasy_client or not fantasy_client.logged_in:
+                return [TextContent(type="text", text="קטלוג השחקנים ריק - יש להתחבר ולהריץ sync_players")]
+            synced = await fantasy_client.sync_players()
+            if "error" in synced:
+                return _json_content(name, synced)
+        
+        def number(key):
+            value = arguments.get(key)
+            return float(value) if value is not None else None
+        
+        result = await asyncio.to_thread(
+            player_catalog.search,
+            position=arguments.get("position"),
+            club=arguments.get("club"),
+            name=arguments.get("name"),
+            min_price=number("min_price"),
+            max_price=number("max_price"),
+            min_points=number("min_points"),
+            sort_by=arguments.get("sort_by") or "points",
+            descending=not arguments.get("ascending", False),
+            limit=min(max(int(arguments.get("limit", 20)), 1), 500),
+            offset=max(int(arguments.get("offset", 0)), 0)
+        )
+        if "error" not in result:
+            result["synced_at"] = datetime.fromtimestamp(stats["synced_at"]).isoformat(timespec="seconds") \
+                if stats["synced_at"] else None
+        return _json_content(name, result, format_argument(arguments, OUTPUT_FORMAT))
+    
+    elif name == "get_history":
+        # ההיסטוריה מקומית - לא צריך להיות מחובר
+        def integer(key):
+            value = arguments.get(key)
+            return int(value) if value is not None else None
+        
+        result = await asyncio.to_thread(
+            history_store.query,
+            account,
+            arguments.get("table") or "league",
+            key=arguments.get("key"),
+            field=arguments.get("field"),
+            from_round=integer("from_round"),
+            to_round=integer("to_round"),
+            since_time=arguments.get("since_time"),
+            until_time=arguments.get("until_time"),
+            aggregate=arguments.get("aggregate"),
+            ascending=bool(arguments.get("ascending", False)),
+            limit=min(max(int(arguments.get("limit", 50)), 1), 1000)
+        )
+        return _json_content(name, result, format_argument(arguments, OUTPUT_FORMAT))
+    
+    elif name == "optimize_team":
+        if not fantasy_client or not fantasy_client.logged_in:
+            return _login_required(name)
+        
+        stats = await asyncio.to_thread(player_catalog.stats)
+        if not stats["players"]:
+            synced = await fantasy_client.sync_players()
+            if "error" in synced:
+                return _json_content(name, synced)
+        
+        budget = arguments.get("budget")
+        result = await fantasy_client.optimize_team(
+            mode=arguments.get("mode") or "squad",
+            max_transfers=min(max(int(arguments.get("max_transfers", 1)), 0), 15),
+            budget=float(budget) if budget is not None else None,
+            time_limit=min(max(float(arguments.get("time_limit", 1.0)), 0.05), 30.0),
+            fresh=bool(arguments.get("fresh", False))
+        )
+        return _json_content(name, result, format_argument(arguments, OUTPUT_FORMAT))
+    
+    elif name == "get_cache_stats":
+        if not fantasy_client:
+            return _login_required(name)
+        
+        result = fantasy_client.cache_stats()
+        return _json_content(name, result)
+    
+    return [TextContent(type="text", text=f"כלי לא מוכר: {name}")]
 
 async def main():
     """הפעלת השרת"""
-    async with stdio_server() as (read_stream, write_stream):
-        await app.run(
-            read_stream, 
-            write_stream,
-            InitializationOptions(
-                server_name="sport5-fantasy-oauth",
-                server_version="0.2.0",
-                capabilities=app.get_capabilities(
-                    notification_options=None,
-                    experimental_capabilities=None,
+    lag_monitor = LoopLagMonitor(metrics)
+    lag_monitor.start()
+    prefetcher.start()
+    capabilities = app.get_capabilities(
+        notification_options=NotificationOptions(),
+        experimental_capabilities={},
+    )
+    # mcp 1.0 מפרסם subscribe=False גם כשיש handler למנויים
+    capabilities.resources.subscribe = True
+    try:
+        async with stdio_server() as (read_stream, write_stream):
+            await app.run(
+                read_stream, 
+                write_stream,
+                InitializationOptions(
+                    server_name="sport5-fantasy-oauth",
+                    server_version="0.2.0",
+                    capabilities=capabilities
                 )
             )
-        )
+    finally:
+        await lag_monitor.stop()
+        await prefetcher.stop()
+        if google_oauth is not None:
+            await google_oauth.close()
+        if oauth_server_task is not None and oauth_server_ready.is_set():
+            await oauth_server_task.result().cleanup()
+        await session_pool.close_all()
+        player_catalog.close()
+        default_parser_pool().shutdown()
 
 if __name__ == "__main__":
     asyncio.run(main())
\ No newline at end of file
@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+"""
+מדדי ביצועים לשרת: היסטוגרמות לכל שלב, מונים, פלט Prometheus ו-cProfile לפי דרישה
+"""
+
+from __future__ import annotations
+
+import asyncio
+import bisect
+import cProfile
+import io
+import pstats
+import re
+import threading
+import time
+from types import SimpleNamespace
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    import aiohttp
+
+# גבולות דליים בשניות (שלבי רשת, פענוח וסריאליזציה) ובבתים (גודל תשובות)
+SECONDS_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+BYTES_BUCKETS = (1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216, 67108864)
+
+# מקטע נתיב שהוא מזהה (מספר, hex ארוך או uuid) - הופך ל-{id} כדי שלא תיווצר סדרה לכל קבוצה
+_ID_SEGMENT = re.compile(r"^(\d+|[0-9a-fA-F]{16,}|[0-9a-fA-F]{8}(-[0-9a-fA-F]{4}){3}-[0-9a-fA-F]{12})$")
+
+
+def route_template(path: str) -> str:
+    """תבנית הנתיב לתווית של מדד: /team/123 -> /team/{id}, בלי query string"""
+    path = path.split("?", 1)[0] or "/"
+    return "/".join("{id}" if _ID_SEGMENT.match(segment) else segment for segment in path.split("/"))
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+class Histogram:
+    """היסטוגרמה מצטברת בסגנון Prometheus"""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        if value > self.max:
+            self.max = value
+
+    def quantile(self, q: float) -> Optional[float]:
+        """הערכת אחוזון באינטרפולציה בתוך הדלי"""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for index, bucket_count in enumerate(self.counts):
+            if seen + bucket_count >= rank and bucket_count:
+                lower = self.buckets[index - 1] if index > 0 else 0.0
+                upper = self.buckets[index] if index < len(self.buckets) else self.max
+                return min(lower + (upper - lower) * (rank - seen) / bucket_count, self.max)
+            seen += bucket_count
+        return self.max
+
+
+class MetricsRegistry:
+    """אוסף היסטוגרמות ומונים לפי שם ותוויות"""
+
+    def __init__(self):
+        self._histograms: Dict[str, Dict[LabelKey, Histogram]] = {}
+        self._bucket_sets: Dict[str, tuple] = {}
+        self._counters: Dict[str, Dict[LabelKey, float]] = {}
+        self._lock = threading.Lock()
+        self.profile_tool: Optional[str] = None
+        self.last_profile: Optional[Dict[str, Any]] = None
+
+    @staticmethod
+    def _key(labels: Dict[str, Any]) -> LabelKey:
+        return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+    def observe(self, name: str, value: float, buckets=SECONDS_BUCKETS, **labels):
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            self._bucket_sets.setdefault(name, buckets)
+            key = self._key(labels)
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = Histogram(self._bucket_sets[name])
+            histogram.observe(value)
+
+    def inc(self, name: str, amount: float = 1, **labels):
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            key = self._key(labels)
+            series[key] = series.get(key, 0) + amount
+
+    def timer(self, name: str, **labels) -> "_Timer":
+        return _Timer(self, name, labels)
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+
+    def snapshot(self) -> Dict[str, Any]:
+        """סיכום קריא (JSON) של כל המדדים"""
+        with self._lock:
+            histograms = {}
+            for name, series in self._histograms.items():
+                seconds = self._bucket_sets[name] is SECONDS_BUCKETS
+                scale, unit = (1000, "ms") if seconds else (1, "bytes")
+                histograms[name] = [
+                    {
+                        "labels": dict(key),
+                        "count": h.count,
+                        f"avg_{unit}": round(h.sum / h.count * scale, 3),
+                        f"p50_{unit}": round(h.quantile(0.5) * scale, 3),
+                        f"p99_{unit}": round(h.quantile(0.99) * scale, 3),
+                        f"max_{unit}": round(h.max * scale, 3),
+                    }
+                    for key, h in series.items()
+                ]
+            counters = {
+                name: [{"labels": dict(key), "value": value} for key, value in series.items()]
+                for name, series in self._counters.items()
+            }
+        return {"histograms": histograms, "counters": counters}
+
+    def render_prometheus(self) -> str:
+        """פלט בפורמט הטקסט של Prometheus"""
+        def fmt(key: LabelKey, extra: Optional[Tuple[str, str]] = None) -> str:
+            pairs = list(key) + ([extra] if extra else [])
+            if not pairs:
+                return ""
+            return "{" + ",".join(f'{k}="{v}"' for k, v in pairs) + "}"
+
+        lines = []
+        with self._lock:
+            for name, series in sorted(self._histograms.items()):
+                lines.append(f"# TYPE {name} histogram")
+                for key, h in series.items():
+                    cumulative = 0
+                    for bound, bucket_count in zip(h.buckets, h.counts):
+                        cumulative += bucket_count
+                        lines.append(f"{name}_bucket{fmt(key, ('le', repr(float(bound))))} {cumulative}")
+                    lines.append(f"{name}_bucket{fmt(key, ('le', '+Inf'))} {h.count}")
+                    lines.append(f"{name}_sum{fmt(key)} {h.sum}")
+                    lines.append(f"{name}_count{fmt(key)} {h.count}")
+            for name, series in sorted(self._counters.items()):
+                lines.append(f"# TYPE {name} counter")
+                for key, value in series.items():
+                    lines.append(f"{name}{fmt(key)} {value}")
+        return "\n".join(lines) + "\n"
+
+    def start_profile(self, tool: str) -> Optional[cProfile.Profile]:
+        """הפעלת cProfile אם ביקשו לפרופל את הקריאה הבאה לכלי הזה"""
+        if self.profile_tool != tool:
+            return None
+        self.profile_tool = None
+        profiler = cProfile.Profile()
+        profiler.enable()
+        return profiler
+
+    def finish_profile(self, tool: str, profiler: Optional[cProfile.Profile], top: int = 30):
+        if profiler is None:
+            return
+        profiler.disable()
+        out = io.StringIO()
+        pstats.Stats(profiler, stream=out).sort_stats("cumulative").print_stats(top)
+        self.last_profile = {"tool": tool, "captured_at": time.time(), "stats": out.getvalue()}
+
+
+class _Timer:
+    def __init__(self, registry: MetricsRegistry, name: str, labels: Dict[str, Any]):
+        self.registry = registry
+        self.name = name
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.elapsed = time.perf_counter() - self.start
+        self.registry.observe(self.name, self.elapsed, **self.labels)
+
+
+def http_trace_config(registry: MetricsRegistry) -> aiohttp.TraceConfig:
+    """TraceConfig שמודד DNS, התחברות וזמן עד הבית הראשון לכל בקשה"""
+    import aiohttp
+    trace = aiohttp.TraceConfig(trace_config_ctx_factory=lambda trace_request_ctx: SimpleNamespace())
+
+    async def on_request_start(session, ctx, params):
+        ctx.start = time.perf_counter()
+        ctx.path = route_template(params.url.path)
+
+    async def on_dns_start(session, ctx, params):
+        ctx.dns_start = time.perf_counter()
+
+    async def on_dns_end(session, ctx, params):
+        registry.observe("sport5_http_phase_seconds", time.perf_counter() - ctx.dns_start, phase="dns", path=ctx.path)
+
+    async def on_connect_start(session, ctx, params):
+        ctx.connect_start = time.perf_counter()
+
+    async def on_connect_end(session, ctx, params):
+        registry.observe("sport5_http_phase_seconds", time.perf_counter() - ctx.connect_start, phase="connect", path=ctx.path)
+
+    async def on_request_end(session, ctx, params):
+        # הכותרות התקבלו: זה הזמן עד הבית הראשון (כולל המתנה לחיבור)
+        registry.observe("sport5_http_phase_seconds", time.perf_counter() - ctx.start, phase="ttfb", path=ctx.path)
+        registry.inc("sport5_http_requests_total", path=ctx.path, status=params.response.status)
+
+    async def on_request_exception(session, ctx, params):
+        registry.inc("sport5_http_errors_total", path=ctx.path, error=type(params.exception).__name__)
+
+    trace.on_request_start.append(on_request_start)
+    trace.on_dns_resolvehost_start.append(on_dns_start)
+    trace.on_dns_resolvehost_end.append(on_dns_end)
+    trace.on_connection_create_start.append(on_connect_start)
+    trace.on_connection_create_end.append(on_connect_end)
+    trace.on_request_end.append(on_request_end)
+    trace.on_request_exception.append(on_request_exception)
+    return trace
+
+
+class LoopLagMonitor:
+    """מדידת עיכוב ה-event loop: כמה מאוחר מתעורר sleep קצר מעבר למתוכנן"""
+
+    def __init__(self, registry: Optional[MetricsRegistry] = None, interval: float = 0.05):
+        self.registry = registry
+        self.interval = interval
+        self.samples: List[float] = []
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            lag = max(loop.time() - expected, 0.0)
+            self.samples.append(lag)
+            if len(self.samples) > 10000:
+                del self.samples[:5000]
+            if self.registry is not None:
+                self.registry.observe("sport5_event_loop_lag_seconds", lag)
+
+
+# מופע משותף לכל השרת
+metrics = MetricsRegistry()
@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+"""
+ניהול טוקנים של Google OAuth: החלפת קוד, רענון ברקע לפני שהטוקן פג ומטמון userinfo
+כל הקריאות ל-Google עוברות בסשן HTTP אחד, והטוקנים נשמרים מוצפנים לכל חשבון
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from typing import TYPE_CHECKING, Any, Dict, Optional
+
+from sport5_metrics import metrics
+
+if TYPE_CHECKING:
+    import aiohttp
+    from sport5_session_store import SessionStore
+
+logger = logging.getLogger(__name__)
+
+TOKEN_URL = "https://oauth2.googleapis.com/token"
+USERINFO_URL = "https://www.googleapis.com/oauth2/v2/userinfo"
+
+# כמה שניות לפני התפוגה הטוקן מתרענן, וההמתנה המקסימלית בין ניסיונות רענון שנכשלו
+REFRESH_MARGIN = 300.0
+MAX_RETRY_DELAY = 60.0
+
+
+class OAuthError(Exception):
+    """תשובת שגיאה מ-Google; permanent כשהטוקן בוטל או פג (invalid_grant) ואין טעם לנסות שוב"""
+
+    def __init__(self, message: str, permanent: bool = False):
+        super().__init__(message)
+        self.permanent = permanent
+
+
+class GoogleTokenManager:
+    """טוקנים של Google לכל חשבון: access token בתוקף, refresh token ו-userinfo שמור
+
+    access_token() מחזיר טוקן בלי פנייה לרשת כל עוד הוא בתוקף; רענון שנדרש במקביל
+    מכמה קריאות נעשה פעם אחת. משימת רקע לכל חשבון מרעננת את הטוקן refresh_margin
+    שניות לפני התפוגה, כך שקריאה רגילה כמעט אף פעם לא מחכה לרענון.
+    """
+
+    def __init__(self, client_id: str, client_secret: str, store: Optional[SessionStore] = None,
+                 refresh_margin: float = REFRESH_MARGIN, token_url: str = TOKEN_URL,
+                 userinfo_url: str = USERINFO_URL):
+        self.client_id = client_id
+        self.client_secret = client_secret
+        self.store = store
+        self.refresh_margin = refresh_margin
+        self.token_url = token_url
+        self.userinfo_url = userinfo_url
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._tokens: Dict[str, Dict[str, Any]] = {}  # חשבון -> טוקנים ו-userinfo
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._refreshers: Dict[str, asyncio.Task] = {}
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        # סשן אחד לכל הקריאות ל-Google - חיבורי TLS נשמרים בין החלפת קוד, רענון ו-userinfo
+        if self._session is None or self._session.closed:
+            import aiohttp
+            self._session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=15))
+        return self._session
+
+    def _lock(self, account: str) -> asyncio.Lock:
+        if account not in self._locks:
+            self._locks[account] = asyncio.Lock()
+        return self._locks[account]
+
+    @staticmethod
+    def _store_key(account: str) -> str:
+        return f"google-oauth:{account}"
+
+    def tokens(self, account: str) -> Optional[Dict[str, Any]]:
+        """הטוקנים של החשבון מהזיכרון או מהאחסון המוצפן (None אם אין)"""
+        if account not in self._tokens and self.store is not None:
+            state = self.store.load(self._store_key(account))
+            if state and state.get("client_id") == self.client_id and state.get("refresh_token"):
+                self._tokens[account] = state
+                self._schedule(account)
+        return self._tokens.get(account)
+
+    def _save(self, account: str):
+        tokens = self._tokens.get(account)
+        if self.store is None:
+            return
+        if tokens is None:
+            self.store.delete(self._store_key(account))
+        else:
+            self.store.save(self._store_key(account), tokens)
+
+    def _valid(self, tokens: Dict[str, Any]) -> bool:
+        return bool(tokens.get("access_token")) and tokens.get("expires_at", 0) - self.refresh_margin > time.time()
+
+    async def _post_token(self, data: Dict[str, str], grant: str) -> Dict[str, Any]:
+        import aiohttp
+        data = dict(data, client_id=self.client_id, client_secret=self.client_secret)
+        try:
+            with metrics.timer("sport5_oauth_seconds", call=grant):
+                async with self.session.post(self.token_url, data=data) as response:
+                    payload = await response.json(content_type=None)
+                    status = response.status
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+            raise OAuthError(f"Google לא זמין: {str(e)}") from e
+        if status != 200 or not payload.get("access_token"):
+            error = payload.get("error", status) if isinstance(payload, dict) else status
+            raise OAuthError(f"Google דחה את הבקשה ({error})", permanent=error in ("invalid_grant", "invalid_client"))
+        return payload
+
+    def _apply(self, account: str, payload: Dict[str, Any]):
+        tokens = self._tokens.setdefault(account, {"client_id": self.client_id})
+        tokens["access_token"] = payload["access_token"]
+        tokens["expires_at"] = time.time() + float(payload.get("expires_in", 3600))
+        # Google מחזיר refresh token רק בהחלפת הקוד - ברענון שומרים את הקיים
+        if payload.get("refresh_token"):
+            tokens["refresh_token"] = payload["refresh_token"]
+        self._save(account)
+        self._schedule(account)
+
+    async def exchange_code(self, account: str, code: str, redirect_uri: str) -> Dict[str, Any]:
+        """החלפת קוד ה-callback בטוקנים ומשיכת userinfo (פעם אחת - נשמר עם הטוקנים)"""
+        async with self._lock(account):
+            payload = await self._post_token(
+                {"code": code, "grant_type": "authorization_code", "redirect_uri": redirect_uri},
+                "authorization_code"
+            )
+            self._tokens.pop(account, None)
+            self._apply(account, payload)
+        return await self.user_info(account)
+
+    async def refresh(self, account: str, force: bool = False) -> str:
+        """access token בתוקף - מרענן רק אם צריך (או force), ורק קריאה אחת לכל חשבון בו זמנית"""
+        async with self._lock(account):
+            tokens = self.tokens(account)
+            if tokens is None or not tokens.get("refresh_token"):
+                raise OAuthError("אין refresh token לחשבון - נדרשת התחברות Google מחדש", permanent=True)
+            if not force and self._valid(tokens):
+                return tokens["access_token"]
+            try:
+                payload = await self._post_token(
+                    {"refresh_token": tokens["refresh_token"], "grant_type": "refresh_token"}, "refresh_token"
+                )
+            except OAuthError as e:
+                if e.permanent:
+                    logger.warning(f"ה-refresh token של {account} לא בתוקף - הטוקנים נמחקים")
+                    self.forget(account)
+                raise
+            self._apply(account, payload)
+            metrics.inc("sport5_oauth_refreshes_total")
+            return tokens["access_token"]
+
+    async def access_token(self, account: str) -> str:
+        tokens = self.tokens(account)
+        if tokens is not None and self._valid(tokens):
+            return tokens["access_token"]
+        return await self.refresh(account)
+
+    async def user_info(self, account: str) -> Dict[str, Any]:
+        """userinfo מהמטמון; פנייה ל-Google רק אם עוד לא נמשך לחשבון הזה"""
+        tokens = self.tokens(account)
+        if tokens is not None and tokens.get("user_info"):
+            return tokens["user_info"]
+
+        import aiohttp
+        headers = {"Authorization": f"Bearer {await self.access_token(account)}"}
+        try:
+            with metrics.timer("sport5_oauth_seconds", call="userinfo"):
+                async with self.session.get(self.userinfo_url, headers=headers) as response:
+                    if response.status != 200:
+                        raise OAuthError(f"Google החזיר {response.status} עבור userinfo")
+                    info = await response.json(content_type=None)
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+            raise OAuthError(f"Google לא זמין: {str(e)}") from e
+        self._tokens[account]["user_info"] = info
+        self._save(account)
+        return info
+
+    def _schedule(self, account: str):
+        task = self._refreshers.get(account)
+        if task is not None and not task.done():
+            return  # המשימה הקיימת קוראת את זמן התפוגה המעודכן בכל סיבוב
+        try:
+            self._refreshers[account] = asyncio.get_running_loop().create_task(self._refresh_loop(account))
+        except RuntimeError:
+            pass  # אין event loop (טעינה מסינכרוני) - הרענון יקרה בקריאה הבאה ל-access_token
+
+    async def _refresh_loop(self, account: str):
+        failures = 0
+        while True:
+            tokens = self._tokens.get(account)
+            if tokens is None or not tokens.get("refresh_token"):
+                return
+            delay = tokens.get("expires_at", 0) - self.refresh_margin - time.time()
+            if failures:
+                delay = max(delay, min(MAX_RETRY_DELAY, 2.0 ** failures))
+            if delay > 0:
+                await asyncio.sleep(delay)
+            try:
+                await self.refresh(account)
+                failures = 0
+            except OAuthError as e:
+                if e.permanent:
+                    return
+                failures += 1
+                logger.warning(f"רענון הטוקן של {account} נכשל ({str(e)}) - ניסיון נוסף בקרוב")
+
+    def forget(self, account: str):
+        """מחיקת הטוקנים של החשבון מהזיכרון ומהדיסק"""
+        self._tokens.pop(account, None)
+        self._save(account)
+        task = self._refreshers.pop(account, None)
+        if task is not None and task is not asyncio.current_task():
+            task.cancel()
+
+    async def close(self):
+        for task in self._refreshers.values():
+            task.cancel()
+        self._refreshers.clear()
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
@@ -0,0 +1,368 @@
+#!/usr/bin/env python3
+"""
+אופטימיזציית סגל והעברות מעל קטלוג השחקנים
+הניקוד והסינון רצים וקטורית ב-NumPy על כל המועמדים, והפותר מדויק: תכנון דינמי על התקציב לכל עמדה,
+מיזוג העמדות בקונבולוציית max-plus, ו-branch and bound על מגבלת השחקנים מכל קבוצה - עם מגבלת זמן
+"""
+
+import heapq
+import itertools
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+# מכסות העמדות בסגל ומגבלת שחקנים מאותה קבוצה
+POSITION_QUOTAS = {"GK": 2, "DEF": 5, "MID": 5, "FWD": 3}
+MAX_PER_CLUB = 3
+
+# מחירים באתר הם במכפלות של 100 אלף - התקציב נספר ביחידות האלה
+PRICE_UNIT = 0.1
+
+# משקל ההחזרה לממוצע בתחזית: נקודות העונה מתקרבות לצפוי לפי המחיר בעמדה
+PROJECTION_SHRINKAGE = 0.25
+
+
+def project_points(points: np.ndarray, price: np.ndarray, position: np.ndarray,
+                   shrinkage: float = PROJECTION_SHRINKAGE) -> np.ndarray:
+    """נקודות צפויות לכל המועמדים בבת אחת
+
+    לכל עמדה מותאם קו ישר של נקודות לפי מחיר, והתחזית היא ממוצע משוקלל של נקודות העונה
+    והערך הצפוי לפי המחיר - כך שעונה טובה במקרה של שחקן זול לא מוערכת יתר על המידה.
+    """
+    projected = points.astype(float)
+    if shrinkage <= 0:
+        return projected
+    for code in np.unique(position):
+        mask = position == code
+        if mask.sum() < 3 or np.ptp(price[mask]) == 0:
+            continue
+        slope, intercept = np.polyfit(price[mask], points[mask], 1)
+        expected = slope * price[mask] + intercept
+        projected[mask] = (1 - shrinkage) * points[mask] + shrinkage * expected
+    return projected
+
+
+def _maxplus(a: np.ndarray, b: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """h[c] = max_j a[j] + b[c - j] לכל c, וה-j שנבחר - בפעולת מטריצה אחת
+
+    a ו-b לא יורדים (עלות של "עד c"), אז מספיק לבדוק j מהתא הסופי הראשון של a עד התא שבו a מגיע
+    למקסימום שלו - זה מצמצם את המטריצה מ-C×C לרוחב הטווח הזה בלבד.
+    """
+    size = len(a)
+    finite = np.flatnonzero(np.isfinite(a))
+    if not len(finite):
+        return np.full(size, -np.inf), np.zeros(size, dtype=np.int64)
+    lo = int(finite[0])
+    hi = lo + int(np.argmax(a[lo:] == a[-1]))
+    width = hi - lo + 1
+    padded = np.concatenate([np.full(hi, -np.inf), b])
+    # שורה c היא b[c - j] עבור j = lo..hi (ו--inf כש-j > c)
+    matrix = sliding_window_view(padded, width)[:size, ::-1] + a[None, lo:hi + 1]
+    split = matrix.argmax(axis=1)
+    return matrix[np.arange(size), split], split + lo
+
+
+class _PositionTable:
+    """טבלת knapsack לעמדה אחת: f[k, t, c] = ניקוד מרבי ל-k שחקנים, t העברות ועלות של עד c"""
+
+    def __init__(self, members: np.ndarray, cost: np.ndarray, value: np.ndarray, transfer: np.ndarray,
+                 quota: int, transfers: int, capacity: int):
+        self.members = members
+        self.f = np.full((quota + 1, transfers, capacity + 1), -np.inf)
+        self.f[0, 0, :] = 0.0
+        self.take = np.zeros((len(members), quota + 1, transfers, capacity + 1), dtype=bool)
+
+        for i, player in enumerate(members):
+            w, v, u = int(cost[player]), float(value[player]), int(transfer[player])
+            if w > capacity:
+                continue
+            for k in range(min(quota, i + 1), 0, -1):
+                for t in range(transfers - 1, u - 1, -1):
+                    candidate = self.f[k - 1, t - u, :capacity + 1 - w] + v
+                    current = self.f[k, t, w:]
+                    better = candidate > current
+                    if better.any():
+                        current[better] = candidate[better]
+                        self.take[i, k, t, w:] |= better
+
+    def pick(self, k: int, t: int, c: int, cost: np.ndarray, transfer: np.ndarray) -> List[int]:
+        chosen = []
+        for i in range(len(self.members) - 1, -1, -1):
+            if k == 0:
+                break
+            if self.take[i, k, t, c]:
+                player = self.members[i]
+                chosen.append(int(player))
+                k -= 1
+                t -= int(transfer[player])
+                c -= int(cost[player])
+        return chosen
+
+
+class SquadOptimizer:
+    """בחירת סגל (או סט העברות) שממקסם נקודות צפויות תחת תקציב, מכסות עמדה ומגבלת קבוצה
+
+    mode="squad" בונה סגל מאפס; כשמועברים owned_ids ו-max_transfers, רק עד max_transfers
+    שחקנים מחוץ לסגל הנוכחי יכולים להיכנס.
+    """
+
+    def __init__(self, players: Iterable[Dict[str, Any]], budget: float,
+                 quotas: Optional[Dict[str, int]] = None, max_per_club: int = MAX_PER_CLUB,
+                 owned_ids: Optional[Iterable[str]] = None, max_transfers: Optional[int] = None,
+                 shrinkage: float = PROJECTION_SHRINKAGE):
+        self.quotas = dict(quotas or POSITION_QUOTAS)
+        self.max_per_club = max_per_club
+        self.squad_size = sum(self.quotas.values())
+        owned = {str(player_id) for player_id in owned_ids or ()}
+        self.max_transfers = max_transfers if owned_ids is not None else None
+
+        self.players = [
+            player for player in players
+            if player.get("position") in self.quotas and player.get("price") is not None
+            and player.get("points") is not None
+        ]
+        positions = list(self.quotas)
+        clubs = sorted({str(player.get("club")) for player in self.players})
+        self.position = np.array([positions.index(p["position"]) for p in self.players], dtype=np.int64)
+        self.club = np.array([clubs.index(str(p.get("club"))) for p in self.players], dtype=np.int64)
+        self.price = np.array([float(p["price"]) for p in self.players])
+        self.points = np.array([float(p["points"]) for p in self.players])
+        self.owned = np.array([str(p["id"]) in owned for p in self.players], dtype=bool)
+        self.cost = np.rint(self.price / PRICE_UNIT).astype(np.int64)
+        self.capacity = int(round(budget / PRICE_UNIT))
+        self.club_count = len(clubs)
+
+        # ניקוד וסינון וקטוריים על כל המועמדים
+        self.value = project_points(self.points, self.price, self.position, shrinkage)
+        self.transfer = (~self.owned).astype(np.int64) if self.max_transfers is not None else np.zeros(len(self.players), dtype=np.int64)
+        self.active = self._prune_dominated()
+
+        self._tables: Dict[Tuple[int, frozenset], _PositionTable] = {}
+        self.nodes = 0
+
+    @property
+    def _transfer_slots(self) -> int:
+        return 1 if self.max_transfers is None else self.max_transfers + 1
+
+    def _prune_dominated(self) -> np.ndarray:
+        """הוצאת שחקנים שתמיד אפשר להחליף בזול וטוב מהם, בלי לפגוע באופטימליות
+
+        שחקן נשלט על ידי שחקן באותה עמדה שלא יקר ממנו ולא פחות טוב ממנו. בפתרון כלשהו לכל היותר
+        quota-1 מהשולטים כבר בסגל, ולכל היותר (גודל סגל - 1) / מגבלת קבוצה קבוצות מלאות חוסמות אותם -
+        אז אם נשארים מספיק שולטים גם אחרי שמורידים את הקבוצות הגדולות, אפשר תמיד להחליף.
+        """
+        keep = np.ones(len(self.players), dtype=bool)
+        blocked_clubs = (self.squad_size - 1) // max(self.max_per_club, 1)
+        for code, quota in enumerate(self.quotas.values()):
+            members = np.flatnonzero(self.position == code)
+            if len(members) <= quota:
+                continue
+            c, v = self.cost[members], self.value[members]
+            order = np.arange(len(members))
+            # dominated_by[i, j]: j לא יקר מ-i, לא פחות טוב ממנו, ועדיף בלפחות משהו (או שובר שוויון)
+            dominated_by = (c[None, :] <= c[:, None]) & (v[None, :] >= v[:, None]) & (
+                (c[None, :] < c[:, None]) | (v[None, :] > v[:, None]) | (order[None, :] < order[:, None])
+            )
+            one_hot = np.zeros((len(members), self.club_count), dtype=np.float32)
+            one_hot[order, self.club[members]] = 1
+            # מכפלת float32 רצה ב-BLAS; הספירות קטנות מספיק כדי להישאר מדויקות
+            per_club = dominated_by.astype(np.float32) @ one_hot
+            same_club = per_club[order, self.club[members]].copy()
+            per_club[order, self.club[members]] = 0
+            per_club.sort(axis=1)
+            others = per_club[:, :per_club.shape[1] - blocked_clubs].sum(axis=1) if blocked_clubs else per_club.sum(axis=1)
+            prunable = (same_club + others >= quota) & ~self.owned[members]
+            keep[members[prunable]] = False
+        return keep
+
+    def _table(self, code: int, removed: frozenset) -> _PositionTable:
+        key = (code, removed)
+        table = self._tables.get(key)
+        if table is None:
+            members = np.array([
+                i for i in np.flatnonzero((self.position == code) & self.active) if int(i) not in removed
+            ], dtype=np.int64)
+            table = _PositionTable(members, self.cost, self.value, self.transfer,
+                                   list(self.quotas.values())[code], self._transfer_slots, self.capacity)
+            self._tables[key] = table
+        return table
+
+    def _relax(self, excluded: frozenset, forced: frozenset) -> Optional[Tuple[float, List[int]]]:
+        """הפתרון הטוב ביותר בלי מגבלת הקבוצה (חסם עליון), כשחלק מהשחקנים מוחרגים וחלק מחויבים"""
+        self.nodes += 1
+        forced_list = list(forced)
+        capacity = self.capacity - int(self.cost[forced_list].sum())
+        transfers_left = self._transfer_slots - 1 - int(self.transfer[forced_list].sum())
+        if capacity < 0 or transfers_left < 0:
+            return None
+
+        tables, quotas = [], []
+        for code, quota in enumerate(self.quotas.values()):
+            need = quota - int((self.position[forced_list] == code).sum())
+            if need < 0:
+                return None
+            removed = frozenset(i for i in excluded | forced if self.position[i] == code)
+            tables.append(self._table(code, removed))
+            quotas.append(need)
+
+        # מיזוג העמדות: acc[t, c] = הניקוד המרבי לעמדות שמוזגו עם t העברות ועלות של עד c.
+        # מהעמדה האחרונה צריך רק את התא של התקציב המלא, אז היא ממוזגת בפעולה וקטורית אחת לכל t
+        slots = self._transfer_slots
+        acc = tables[0].f[quotas[0], :, :capacity + 1]
+        splits = []
+        for position, (table, need) in enumerate(zip(tables[1:], quotas[1:]), start=1):
+            last = position == len(tables) - 1
+            merged = np.full((slots, 1 if last else capacity + 1), -np.inf)
+            split_t = np.zeros(merged.shape, dtype=np.int64)
+            split_c = np.zeros(merged.shape, dtype=np.int64)
+            for t1 in range(slots):
+                if not np.isfinite(acc[t1, -1]):
+                    continue
+                for t2 in range(slots - t1):
+                    if last:
+                        totals = acc[t1] + table.f[need, t2, capacity::-1]
+                        split = np.array([int(np.argmax(totals))])
+                        values = totals[split]
+                    else:
+                        values, split = _maxplus(acc[t1], table.f[need, t2, :capacity + 1])
+                    better = values > merged[t1 + t2]
+                    merged[t1 + t2][better] = values[better]
+                    split_t[t1 + t2][better] = t1
+                    split_c[t1 + t2][better] = split[better]
+            splits.append((split_t, split_c))
+            acc = merged
+
+        best_t = int(np.argmax(acc[:transfers_left + 1, -1]))
+        best = acc[best_t, -1]
+        if not np.isfinite(best):
+            return None
+
+        # שחזור: חלוקת התקציב וההעברות בין העמדות ואז השחקנים בכל עמדה
+        selection = list(forced_list)
+        t, c = best_t, capacity
+        for index in range(len(tables) - 1, 0, -1):
+            split_t, split_c = splits[index - 1]
+            cell = 0 if index == len(tables) - 1 else c
+            t1, c1 = int(split_t[t, cell]), int(split_c[t, cell])
+            selection += tables[index].pick(quotas[index], t - t1, c - c1, self.cost, self.transfer)
+            t, c = t1, c1
+        selection += tables[0].pick(quotas[0], t, c, self.cost, self.transfer)
+        return float(best + self.value[forced_list].sum()), selection
+
+    def _over_limit(self, selection: List[int]) -> Optional[int]:
+        counts = np.bincount(self.club[selection], minlength=self.club_count)
+        club = int(np.argmax(counts))
+        return club if counts[club] > self.max_per_club else None
+
+    def _repair(self, selection: List[int]) -> Optional[Tuple[float, List[int]]]:
+        """פתרון חוקי מהיר (לשימוש כשמגבלת הזמן נגמרת): החלפת שחקנים מקבוצות עמוסות במחליף הזול ביותר בהפסד"""
+        selection = list(selection)
+        while True:
+            club = self._over_limit(selection)
+            if club is None:
+                return float(self.value[selection].sum()), selection
+            counts = np.bincount(self.club[selection], minlength=self.club_count)
+            spare = self.capacity - int(self.cost[selection].sum())
+            transfers_left = self._transfer_slots - 1 - int(self.transfer[selection].sum())
+            available = self.active.copy()
+            available[selection] = False
+            available &= counts[self.club] < self.max_per_club
+
+            best = None
+            for out in (i for i in selection if self.club[i] == club):
+                fits = available & (self.position == self.position[out]) & \
+                    (self.cost <= spare + self.cost[out]) & \
+                    (self.transfer - self.transfer[out] <= transfers_left)
+                if not fits.any():
+                    continue
+                candidate = int(np.flatnonzero(fits)[np.argmax(self.value[fits])])
+                loss = self.value[out] - self.value[candidate]
+                if best is None or loss < best[0]:
+                    best = (loss, out, candidate)
+            if best is None:
+                return None
+            selection[selection.index(best[1])] = best[2]
+
+    def solve(self, time_limit: float = 1.0) -> Dict[str, Any]:
+        """branch and bound מהחסם הגבוה ביותר: הפתרון החוקי הראשון שיוצא מהתור הוא האופטימלי"""
+        started = time.perf_counter()
+        root = self._relax(frozenset(), frozenset())
+        if root is None:
+            return {"error": "אין סגל שעומד בתקציב ובמכסות העמדות"}
+
+        incumbent = self._repair(root[1])
+        counter = itertools.count()
+        queue = [(-root[0], next(counter), frozenset(), frozenset(), root[1])]
+        optimal = False
+
+        while queue:
+            if time.perf_counter() - started > time_limit:
+                break
+            bound, _, excluded, forced, selection = heapq.heappop(queue)
+            if incumbent is not None and -bound <= incumbent[0] + 1e-9:
+                optimal = True
+                queue.clear()
+                break
+            club = self._over_limit(selection)
+            if club is None:
+                incumbent, optimal = (-bound, selection), True
+                queue.clear()
+                break
+
+            # לפחות אחד מהשחקנים מהקבוצה העמוסה יוצא: ילד i מחריג את השחקן ה-i ומחייב את אלה שלפניו
+            members = sorted((i for i in selection if self.club[i] == club and i not in forced),
+                             key=lambda i: self.value[i])
+            forced_from_club = sum(1 for i in forced if self.club[i] == club)
+            for index, player in enumerate(members):
+                if forced_from_club + index > self.max_per_club:
+                    break
+                child = self._relax(excluded | {player}, forced | set(members[:index]))
+                if child is not None and (incumbent is None or child[0] > incumbent[0] + 1e-9):
+                    heapq.heappush(queue, (-child[0], next(counter), excluded | {player},
+                                           forced | frozenset(members[:index]), child[1]))
+        else:
+            optimal = True
+
+        elapsed_ms = round((time.perf_counter() - started) * 1000, 1)
+        if incumbent is None:
+            return {"error": "לא נמצא סגל חוקי בזמן שהוקצב", "elapsed_ms": elapsed_ms}
+        upper_bound = max(incumbent[0], -queue[0][0]) if queue else incumbent[0]
+        return self._result(incumbent[1], optimal, upper_bound, elapsed_ms)
+
+    def _result(self, selection: List[int], optimal: bool, upper_bound: float, elapsed_ms: float) -> Dict[str, Any]:
+        positions = list(self.quotas)
+        order = sorted(selection, key=lambda i: (self.position[i], -self.value[i]))
+        squad = [
+            {
+                "id": self.players[i]["id"],
+                "name": self.players[i]["name"],
+                "position": positions[self.position[i]],
+                "club": self.players[i].get("club"),
+                "price": float(self.price[i]),
+                "points": float(self.points[i]),
+                "projected": round(float(self.value[i]), 2),
+            }
+            for i in order
+        ]
+        result = {
+            "squad": squad,
+            "projected_points": round(float(self.value[selection].sum()), 2),
+            "total_cost": round(float(self.cost[selection].sum()) * PRICE_UNIT, 1),
+            "budget": round(self.capacity * PRICE_UNIT, 1),
+            "optimal": optimal,
+            "upper_bound": round(float(upper_bound), 2),
+            "candidates": int(self.active.sum()),
+            "pruned": int((~self.active).sum()),
+            "nodes": self.nodes,
+            "elapsed_ms": elapsed_ms,
+        }
+        if self.max_transfers is not None:
+            chosen = set(selection)
+            result["transfers_in"] = [p for p, i in zip(squad, order) if not self.owned[i]]
+            result["transfers_out"] = [
+                {"id": self.players[i]["id"], "name": self.players[i]["name"], "price": float(self.price[i])}
+                for i in np.flatnonzero(self.owned) if int(i) not in chosen
+            ]
+        return result
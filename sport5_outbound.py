@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+"""
+שכבת הבקשות היוצאות לאתר: איחוד בקשות זהות (single-flight), הגבלת קצב לכל host (token bucket),
+ניסיון חוזר עם backoff אקראי לבקשות GET, ו-circuit breaker שנכשל מהר כשהאתר למטה
+"""
+
+import asyncio
+import logging
+import os
+import random
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from sport5_metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# סטטוסים שמעידים על עומס או תקלה זמנית באתר - שווה לנסות שוב
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+
+class TransientHTTPError(Exception):
+    """תשובה עם סטטוס זמני (עומס / תקלת שרת); retry_after בשניות אם האתר ביקש"""
+
+    def __init__(self, status: int, retry_after: Optional[float] = None):
+        super().__init__(f"האתר החזיר {status}")
+        self.status = status
+        self.retry_after = retry_after
+
+
+class CircuitOpenError(Exception):
+    """האתר נכשל שוב ושוב - בקשות נחסמות עד שיעבור זמן ההמתנה"""
+
+    def __init__(self, host: str, retry_in: float):
+        super().__init__(f"האתר {host} לא זמין - ניסיון הבא בעוד {retry_in:.0f} שניות")
+        self.host = host
+        self.retry_in = retry_in
+
+
+def retry_after_seconds(value: Optional[str]) -> Optional[float]:
+    """כותרת Retry-After בשניות (רק הצורה המספרית)"""
+    try:
+        return max(float(value), 0.0) if value is not None else None
+    except ValueError:
+        return None
+
+
+def is_transient_error(error: BaseException) -> bool:
+    """שגיאה זמנית (סטטוס עומס, timeout, ניתוק) - שווה לנסות שוב או להגיש מהמטמון"""
+    import aiohttp
+    return isinstance(error, (TransientHTTPError, asyncio.TimeoutError, aiohttp.ClientConnectionError,
+                              aiohttp.ClientPayloadError))
+
+
+class TokenBucket:
+    """rate בקשות לשנייה בממוצע, עם פרץ של עד burst בקשות"""
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = max(burst, 1.0)
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+        self._lock: Optional[asyncio.Lock] = None
+
+    async def acquire(self) -> float:
+        """המתנה לאסימון; מחזיר כמה שניות חיכינו"""
+        if self.rate <= 0:
+            return 0.0
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        waited = 0.0
+        # הנעילה שומרת על סדר הגעה - מי שחיכה ראשון מקבל את האסימון הבא
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return waited
+                delay = (1 - self.tokens) / self.rate
+                waited += delay
+                await asyncio.sleep(delay)
+
+
+class CircuitBreaker:
+    """closed -> open אחרי threshold כשלונות רצופים; אחרי reset_timeout בקשה אחת עוברת לבדיקה (half-open)"""
+
+    def __init__(self, threshold: int, reset_timeout: float):
+        self.threshold = max(threshold, 1)
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._probe_started: Optional[float] = None
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def check(self, host: str):
+        """CircuitOpenError אם אסור לשלוח עכשיו"""
+        state = self.state
+        now = time.monotonic()
+        # בדיקה שנתקעה (למשל בוטלה) לא חוסמת לתמיד - אחרי reset_timeout מותרת בדיקה חדשה
+        probing = self._probe_started is not None and now - self._probe_started < self.reset_timeout
+        if state == "open" or (state == "half_open" and probing):
+            retry_in = max(self.reset_timeout - (now - (self._probe_started if probing else self.opened_at)), 0.0)
+            raise CircuitOpenError(host, retry_in)
+        if state == "half_open":
+            self._probe_started = now
+
+    def success(self):
+        self.failures = 0
+        self.opened_at = None
+        self._probe_started = None
+
+    def failure(self) -> bool:
+        """רישום כשלון; מחזיר True אם ה-breaker נפתח עכשיו"""
+        self.failures += 1
+        self._probe_started = None
+        was_closed = self.opened_at is None
+        if not was_closed or self.failures >= self.threshold:
+            self.opened_at = time.monotonic()
+        return was_closed and self.opened_at is not None
+
+
+class OutboundPolicy:
+    """מדיניות משותפת לכל הקליינטים בתהליך - הקצב וה-breaker הם לכל host, לא לכל חשבון"""
+
+    def __init__(self, rate: Optional[float] = None, burst: Optional[float] = None,
+                 attempts: Optional[int] = None, backoff: Optional[float] = None, max_backoff: float = 10.0,
+                 breaker_threshold: Optional[int] = None, breaker_reset: Optional[float] = None):
+        self.rate = rate if rate is not None else float(os.getenv("SPORT5_RATE_LIMIT", "5"))
+        self.burst = burst if burst is not None else float(os.getenv("SPORT5_RATE_BURST", "10"))
+        self.attempts = max(attempts if attempts is not None else int(os.getenv("SPORT5_RETRY_ATTEMPTS", "3")), 1)
+        self.backoff = backoff if backoff is not None else float(os.getenv("SPORT5_RETRY_BACKOFF", "0.5"))
+        self.max_backoff = max_backoff
+        self.breaker_threshold = breaker_threshold if breaker_threshold is not None else int(os.getenv("SPORT5_BREAKER_THRESHOLD", "5"))
+        self.breaker_reset = breaker_reset if breaker_reset is not None else float(os.getenv("SPORT5_BREAKER_RESET", "30"))
+        # תקציבים לסריקות המוניות (למשל דפי היריבים): חלק מהקצב של ה-host, לא קצב נוסף עליו -
+        # בקשה כזו לוקחת אסימון גם מהדלי שלה וגם מהדלי של ה-host, כך שהאתר לא רואה יותר מ-rate
+        # בסך הכל, ושאר הכלים תמיד נשארים עם החלק שהסריקה לא יכולה לקחת
+        self.budgets: Dict[str, float] = {
+            "rivals": float(os.getenv("SPORT5_RIVAL_RATE_SHARE", "0.8")),
+        }
+        self._buckets: Dict[Tuple[str, Optional[str]], TokenBucket] = {}
+        self._breakers: Dict[str, CircuitBreaker] = {}
+
+    def bucket(self, host: str, budget: Optional[str] = None) -> TokenBucket:
+        key = (host, budget)
+        if key not in self._buckets:
+            share = min(max(self.budgets.get(budget, 1.0), 0.1), 1.0)
+            # SPORT5_RATE_LIMIT=0 מבטל את כל הגבלות הקצב, גם של התקציבים
+            self._buckets[key] = TokenBucket(self.rate * share, self.burst * share)
+        return self._buckets[key]
+
+    async def _acquire(self, host: str, budget: Optional[str]) -> float:
+        waited = await self.bucket(host, budget).acquire() if budget is not None else 0.0
+        return waited + await self.bucket(host).acquire()
+
+    def breaker(self, host: str) -> CircuitBreaker:
+        if host not in self._breakers:
+            self._breakers[host] = CircuitBreaker(self.breaker_threshold, self.breaker_reset)
+        return self._breakers[host]
+
+    def _delay(self, attempt: int, error: BaseException) -> float:
+        # full jitter: אקראי בין 0 לתקרה שמוכפלת בכל ניסיון, כדי שבקשות שנכשלו יחד לא יחזרו יחד
+        delay = random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+        if isinstance(error, TransientHTTPError) and error.retry_after is not None:
+            delay = max(delay, min(error.retry_after, self.max_backoff))
+        return delay
+
+    async def send(self, host: str, request: Callable[[], Awaitable[Any]], path: str = "", retry: bool = True,
+                   budget: Optional[str] = None) -> Any:
+        """שליחת בקשה דרך ה-breaker וה-rate limiter, עם ניסיונות חוזרים לתקלות זמניות
+
+        request נקרא מחדש בכל ניסיון, ולכן צריך לבצע את כל הבקשה (כולל קריאת הגוף).
+        retry=False לבקשות שאינן idempotent. budget מגביל את הבקשה לחלק מהקצב של ה-host מתוך budgets.
+        """
+        breaker = self.breaker(host)
+        attempts = self.attempts if retry else 1
+        for attempt in range(attempts):
+            breaker.check(host)
+            waited = await self._acquire(host, budget)
+            if waited:
+                metrics.observe("sport5_rate_limit_wait_seconds", waited, host=host)
+            try:
+                result = await request()
+            except Exception as e:
+                if not is_transient_error(e):
+                    breaker.success()  # האתר ענה (למשל 404 או הפניה לכניסה) - הוא לא למטה
+                    raise
+                if breaker.failure():
+                    metrics.inc("sport5_circuit_opened_total", host=host)
+                    logger.warning(f"האתר {host} נכשל {breaker.failures} פעמים ברצף - בקשות נחסמות ל-{breaker.reset_timeout:.0f} שניות")
+                if attempt + 1 >= attempts:
+                    raise
+                delay = self._delay(attempt, e)
+                metrics.inc("sport5_http_retries_total", path=path)
+                logger.info(f"תקלה זמנית ב-{path or host} ({e}) - ניסיון נוסף בעוד {delay:.2f} שניות")
+                await asyncio.sleep(delay)
+            else:
+                breaker.success()
+                return result
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            host: {"state": breaker.state, "consecutive_failures": breaker.failures}
+            for host, breaker in self._breakers.items()
+        }
+
+
+class SingleFlight:
+    """בקשות זהות שרצות במקביל חולקות משיכה אחת: הראשונה מושכת והשאר מחכות לתוצאה שלה"""
+
+    def __init__(self):
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self.coalesced = 0
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        future = self._inflight.get(key)
+        if future is not None:
+            self.coalesced += 1
+            metrics.inc("sport5_coalesced_requests_total")
+            # shield: ביטול של אחד הממתינים לא מבטל את המשיכה עבור האחרים
+            return await asyncio.shield(future)
+
+        future = asyncio.ensure_future(fn())
+        self._inflight[key] = future
+        future.add_done_callback(lambda done: self._done(key, done))
+        return await asyncio.shield(future)
+
+    def _done(self, key: str, future: asyncio.Future):
+        if self._inflight.get(key) is future:
+            del self._inflight[key]
+        if not future.cancelled():
+            future.exception()  # כולם בוטלו - לא להשאיר שגיאה שלא נקראה
+
+    def cancel_all(self):
+        for future in self._inflight.values():
+            future.cancel()
+        self._inflight.clear()
+
+
+_default_policy: Optional[OutboundPolicy] = None
+
+
+def default_outbound_policy() -> OutboundPolicy:
+    """המדיניות המשותפת לכל הקליינטים בתהליך"""
+    global _default_policy
+    if _default_policy is None:
+        _default_policy = OutboundPolicy()
+    return _default_policy
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+הרצת פענוח HTML מחוץ ל-event loop
+הפונקציות מקבלות bytes גולמיים ומחזירות dict רגילים, כך שאין צורך להעביר עצי lxml בין תהליכים
+"""
+
+import asyncio
+import functools
+import logging
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+MODES = ("thread", "process", "inline")
+
+
+class ParserPool:
+    """מאגר עובדים לפענוח: thread (ברירת מחדל), process (מנצל כמה ליבות) או inline"""
+
+    def __init__(self, mode: Optional[str] = None, workers: Optional[int] = None):
+        self.mode = (mode or os.getenv("SPORT5_PARSER_POOL", "thread")).lower()
+        if self.mode not in MODES:
+            logger.warning(f"מצב מאגר פענוח לא מוכר '{self.mode}' - משתמשים ב-thread")
+            self.mode = "thread"
+        env_workers = os.getenv("SPORT5_PARSER_WORKERS")
+        self.workers = workers or (int(env_workers) if env_workers else min(4, os.cpu_count() or 1))
+        # מפענח הדרגתי מחזיק מצב ולכן רץ בתהליך הנוכחי; במצב process הוא היה חוסם את ה-loop,
+        # ולכן הדף מורד במלואו ומפוענח כולו על תהליך עובד
+        self.streams = self.mode != "process"
+        self._executor: Optional[Executor] = None
+
+    def _get_executor(self) -> Optional[Executor]:
+        if self.mode == "inline":
+            return None
+        if self._executor is None:
+            if self.mode == "process":
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="sport5-parse")
+        return self._executor
+
+    async def run(self, func: Callable[..., Any], *args, **kwargs) -> Any:
+        """הרצת פונקציית חילוץ על עובד והמתנה לתוצאה בלי לחסום את ה-loop"""
+        executor = self._get_executor()
+        if executor is None:
+            return func(*args, **kwargs)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(executor, functools.partial(func, *args, **kwargs))
+
+    async def run_local(self, func: Callable[..., Any], *args) -> Any:
+        """כמו run, אבל תמיד בתהליך הנוכחי - לפונקציות עם מצב (מפענח הדרגתי) שאי אפשר להעביר לתהליך אחר.
+        במצב process זה רץ על ה-loop עצמו, ולכן הקליינט לא מזרים במצב הזה (ראו streams)"""
+        if self.mode != "thread":
+            return func(*args)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._get_executor(), functools.partial(func, *args))
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+
+_default_pool: Optional[ParserPool] = None
+
+
+def default_parser_pool() -> ParserPool:
+    """המאגר המשותף לכל הקליינטים בתהליך"""
+    global _default_pool
+    if _default_pool is None:
+        _default_pool = ParserPool()
+    return _default_pool
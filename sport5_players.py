@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""
+קטלוג שחקנים מקומי ב-SQLite
+השחקנים נאספים מדפי רשימת השחקנים באתר, נשמרים עם אינדקסים לפי עמדה, קבוצה, מחיר ונקודות,
+וחיפושים נענים מהאינדקס בלי לפנות לאתר
+"""
+
+import hashlib
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional
+
+from sport5_format import parse_amount
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PLAYER_DB = os.path.join(os.path.expanduser("~"), ".sport5_fantasy", "players.sqlite3")
+
+# עמודות שאפשר למיין לפיהן; value = נקודות למיליון
+SORT_COLUMNS = {
+    "points": "points",
+    "price": "price",
+    "name": "name",
+    "value": "points / NULLIF(price, 0)",
+}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS players (
+    id TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    club TEXT,
+    position TEXT,
+    price REAL,
+    points REAL,
+    price_text TEXT,
+    points_text TEXT,
+    row_hash TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS players_position_points ON players (position, points DESC);
+CREATE INDEX IF NOT EXISTS players_club ON players (club);
+CREATE INDEX IF NOT EXISTS players_price ON players (price);
+CREATE INDEX IF NOT EXISTS players_points ON players (points DESC);
+CREATE TABLE IF NOT EXISTS sync_state (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+_COLUMNS = ("id", "name", "club", "position", "price", "points")
+
+
+def _row_hash(player: Dict[str, Any]) -> str:
+    text = "\x1f".join(str(player.get(field) or "") for field in _COLUMNS)
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=8).hexdigest()
+
+
+class PlayerCatalog:
+    """מאגר השחקנים (קובץ SQLite אחד לכל השרת, בנתיב SPORT5_PLAYER_DB)"""
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = os.path.expanduser(path or os.getenv("SPORT5_PLAYER_DB") or DEFAULT_PLAYER_DB)
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        # sqlite3 נטען רק בשימוש הראשון בקטלוג
+        if self._conn is None:
+            import sqlite3
+            if self.path != ":memory:":
+                os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.row_factory = sqlite3.Row
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(_SCHEMA)
+        return self._conn
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def sync(self, players: Iterable[Dict[str, Any]], complete: bool = True) -> Dict[str, int]:
+        """עדכון הקטלוג מתוצאות הסריקה - נכתבים רק שחקנים חדשים או שהנתונים שלהם השתנו
+
+        complete=True אומר שהסריקה כיסתה את כל הדפים, ולכן שחקנים שלא הופיעו בה נמחקים.
+        """
+        now = time.time()
+        incoming: Dict[str, Dict[str, Any]] = {}
+        for player in players:
+            incoming[str(player["id"])] = player
+
+        with self._lock:
+            conn = self._connect()
+            existing = dict(conn.execute("SELECT id, row_hash FROM players"))
+            changed = []
+            added = updated = 0
+            for player_id, player in incoming.items():
+                digest = _row_hash(player)
+                old = existing.get(player_id)
+                if old == digest:
+                    continue
+                if old is None:
+                    added += 1
+                else:
+                    updated += 1
+                changed.append((
+                    player_id, player.get("name"), player.get("club"), player.get("position"),
+                    parse_amount(player.get("price")), parse_amount(player.get("points")),
+                    player.get("price"), player.get("points"), digest, now,
+                ))
+            removed = [(player_id,) for player_id in existing if player_id not in incoming] if complete else []
+
+            with conn:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO players (id, name, club, position, price, points,"
+                    " price_text, points_text, row_hash, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    changed,
+                )
+                conn.executemany("DELETE FROM players WHERE id = ?", removed)
+                conn.execute("INSERT OR REPLACE INTO sync_state (key, value) VALUES ('synced_at', ?)", (str(now),))
+
+        return {
+            "added": added,
+            "updated": updated,
+            "removed": len(removed),
+            "unchanged": len(incoming) - added - updated,
+            "total": len(incoming) if complete else len(existing) + added - len(removed),
+        }
+
+    def search(self, position: Optional[str] = None, club: Optional[str] = None, name: Optional[str] = None,
+               min_price: Optional[float] = None, max_price: Optional[float] = None,
+               min_points: Optional[float] = None, sort_by: str = "points", descending: bool = True,
+               limit: int = 20, offset: int = 0) -> Dict[str, Any]:
+        """חיפוש מסונן עם מיון ו-top-K, מהאינדקס המקומי"""
+        if sort_by not in SORT_COLUMNS:
+            return {"error": f"מיון לא מוכר: {sort_by} (אפשרויות: {', '.join(SORT_COLUMNS)})"}
+
+        clauses, params = [], []
+        if position:
+            clauses.append("position = ?")
+            params.append(position.upper())
+        if club:
+            clauses.append("club = ?")
+            params.append(club)
+        if name:
+            clauses.append("name LIKE ?")
+            params.append(f"%{name}%")
+        if min_price is not None:
+            clauses.append("price >= ?")
+            params.append(min_price)
+        if max_price is not None:
+            clauses.append("price <= ?")
+            params.append(max_price)
+        if min_points is not None:
+            clauses.append("points >= ?")
+            params.append(min_points)
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        order = f"{SORT_COLUMNS[sort_by]} {'DESC' if descending else 'ASC'}, id"
+
+        started = time.perf_counter()
+        with self._lock:
+            conn = self._connect()
+            total = conn.execute(f"SELECT COUNT(*) FROM players{where}", params).fetchone()[0]
+            rows = conn.execute(
+                f"SELECT id, name, club, position, price, points FROM players{where}"
+                f" ORDER BY {order} LIMIT ? OFFSET ?",
+                params + [limit, offset],
+            ).fetchall()
+
+        return {
+            "players": [dict(row) for row in rows],
+            "total_matches": total,
+            "query_ms": round((time.perf_counter() - started) * 1000, 3),
+        }
+
+    def get(self, player_id: str) -> Optional[Dict[str, Any]]:
+        """שחקן אחד לפי מזהה (None אם אינו בקטלוג)"""
+        with self._lock:
+            conn = self._connect()
+            row = conn.execute(
+                "SELECT id, name, club, position, price, points, updated_at FROM players WHERE id = ?",
+                (str(player_id),),
+            ).fetchone()
+        return dict(row) if row is not None else None
+
+    def all_players(self) -> List[Dict[str, Any]]:
+        """כל השחקנים שיש להם מחיר ונקודות - קלט לאופטימיזציית הסגל"""
+        with self._lock:
+            conn = self._connect()
+            rows = conn.execute(
+                "SELECT id, name, club, position, price, points FROM players"
+                " WHERE price IS NOT NULL AND points IS NOT NULL ORDER BY id"
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            conn = self._connect()
+            count = conn.execute("SELECT COUNT(*) FROM players").fetchone()[0]
+            synced = conn.execute("SELECT value FROM sync_state WHERE key = 'synced_at'").fetchone()
+        return {"players": count, "synced_at": float(synced[0]) if synced else None}
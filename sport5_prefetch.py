@@ -0,0 +1,327 @@
+#!/usr/bin/env python3
+"""
+משיכה מוקדמת ברקע לפי לוח המחזורים: הקבוצה, הליגה ודפי השחקנים מתרעננים במטמון לפני שמבקשים אותם
+בזמן משחקים חיים - לעתים קרובות, לפני הדדליין - בתדירות בינונית, ובשאר הזמן - לעתים רחוקות
+"""
+
+from __future__ import annotations
+
+import asyncio
+import bisect
+import json
+import logging
+import os
+import time
+from collections import deque
+from datetime import datetime
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Optional, Tuple
+
+from sport5_metrics import metrics
+from sport5_resources import content_digest
+
+if TYPE_CHECKING:
+    from sport5_history import HistoryStore
+
+logger = logging.getLogger(__name__)
+
+PHASES = ("live", "deadline", "idle")
+
+# מרווח בסיסי בשניות לכל שלב ולכל סוג נתון; דף שלא השתנה מוכפל עד פי MAX_BACKOFF
+INTERVALS = {
+    "live": {"my_team": 120, "league": 120, "players": 900},
+    "deadline": {"my_team": 600, "league": 1800, "players": 1800},
+    "idle": {"my_team": 3600, "league": 3600, "players": 21600},
+}
+KINDS = ("my_team", "league", "players")
+PATHS = {"my_team": "/my-team", "league": "/league"}
+MAX_BACKOFF = 4
+
+# כמה זמן משחק נחשב "חי" אחרי שריקת הפתיחה, וכמה לפני הדדליין מתחיל חלון ההעברות
+MATCH_SECONDS = 2 * 3600
+DEADLINE_WINDOW = 24 * 3600
+HOUR = 3600
+WEEK_HOURS = 7 * 24
+
+
+def _timestamp(value: Any) -> float:
+    if isinstance(value, (int, float)):
+        return float(value)
+    return datetime.fromisoformat(value).timestamp()
+
+
+def _week_hour(timestamp: float) -> int:
+    moment = datetime.fromtimestamp(timestamp)
+    return moment.weekday() * 24 + moment.hour
+
+
+class GameweekCalendar:
+    """לוח המחזורים: דדליין ושעות פתיחה לכל מחזור, ושעות בשבוע שבהן נלמד שהנתונים משתנים
+
+    בלי לוח מוגדר, learn() מסיק את שעות המשחקים מהזמנים שבהם טבלת הליגה השתנתה:
+    שעה בשבוע שבה נראו שינויים בלפחות min_weeks שבועות שונים נחשבת "חיה".
+    """
+
+    def __init__(self, gameweeks: Optional[List[Dict[str, Any]]] = None, match_seconds: float = MATCH_SECONDS,
+                 deadline_window: float = DEADLINE_WINDOW):
+        self.match_seconds = match_seconds
+        self.deadline_window = deadline_window
+        self.deadlines: List[float] = []
+        self.live: List[Tuple[float, float]] = []
+        for gameweek in gameweeks or []:
+            if gameweek.get("deadline"):
+                self.deadlines.append(_timestamp(gameweek["deadline"]))
+            for kickoff in gameweek.get("kickoffs", []):
+                start = _timestamp(kickoff)
+                self.live.append((start, start + match_seconds))
+        self.deadlines.sort()
+        self.live.sort()
+        self.learned_hours: set = set()
+        self._observed: List[float] = []
+
+    @classmethod
+    def from_file(cls, path: str) -> "GameweekCalendar":
+        """לוח מקובץ JSON: {"gameweeks": [{"deadline": ISO, "kickoffs": [ISO, ...]}], "match_minutes": 120, "deadline_hours": 24}"""
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        return cls(
+            data.get("gameweeks", []),
+            match_seconds=float(data.get("match_minutes", MATCH_SECONDS / 60)) * 60,
+            deadline_window=float(data.get("deadline_hours", DEADLINE_WINDOW / HOUR)) * HOUR,
+        )
+
+    @classmethod
+    def from_env(cls) -> "GameweekCalendar":
+        path = os.getenv("SPORT5_CALENDAR")
+        if path:
+            try:
+                return cls.from_file(os.path.expanduser(path))
+            except (OSError, ValueError) as e:
+                logger.warning(f"לא ניתן לקרוא את לוח המחזורים {path}: {str(e)} - הלוח יילמד מההיסטוריה")
+        return cls()
+
+    @property
+    def configured(self) -> bool:
+        return bool(self.deadlines or self.live)
+
+    def observe(self, timestamp: float):
+        """שינוי שנראה בנתונים (למשל במשיכה ברקע) - נכנס ללמידה הבאה"""
+        self._observed.append(timestamp)
+
+    def learn(self, change_times: Iterable[float] = (), min_weeks: int = 2):
+        weeks_by_hour: Dict[int, set] = {}
+        for timestamp in [*change_times, *self._observed]:
+            week = datetime.fromtimestamp(timestamp).isocalendar()[:2]
+            weeks_by_hour.setdefault(_week_hour(timestamp), set()).add(week)
+        self.learned_hours = {hour for hour, weeks in weeks_by_hour.items() if len(weeks) >= min_weeks}
+
+    def gameweek(self, now: float) -> str:
+        """מזהה המחזור הנוכחי - מספר הדדליינים שכבר עברו, או שבוע ISO כשאין לוח דדליינים"""
+        if self.deadlines:
+            return f"gw{bisect.bisect_right(self.deadlines, now)}"
+        year, week, _ = datetime.fromtimestamp(now).isocalendar()
+        return f"{year}-W{week:02d}"
+
+    def phase(self, now: float) -> str:
+        if any(start <= now < end for start, end in self.live) or _week_hour(now) in self.learned_hours:
+            return "live"
+        if any(deadline - self.deadline_window <= now < deadline for deadline in self.deadlines):
+            return "deadline"
+        return "idle"
+
+    def next_change(self, now: float) -> Optional[float]:
+        """הזמן הבא שבו השלב עשוי להתחלף (פתיחה/סיום משחק, תחילת חלון דדליין או הדדליין)"""
+        candidates = [edge for window in self.live for edge in window if edge > now]
+        candidates += [edge for deadline in self.deadlines
+                       for edge in (deadline - self.deadline_window, deadline) if edge > now]
+        if self.learned_hours:
+            current = _week_hour(now) in self.learned_hours
+            boundary = (now // HOUR + 1) * HOUR
+            for step in range(WEEK_HOURS):
+                edge = boundary + step * HOUR
+                if (_week_hour(edge) in self.learned_hours) != current:
+                    candidates.append(edge)
+                    break
+        return min(candidates, default=None)
+
+
+class PrefetchScheduler:
+    """מתזמן ברקע שמרענן את המטמון של כל החשבונות המחוברים בבריכה
+
+    כל משימה (חשבון, סוג נתון) רצה לפי המרווח של השלב הנוכחי; דף שלא השתנה מכפיל את המרווח
+    (עד MAX_BACKOFF), ושינוי מחזיר אותו לבסיס. לפני מעבר לשלב עמוס יותר כל המשימות מתרעננות,
+    ואחרי כל משיכה הדף נשאר טרי במטמון עד המשיכה הבאה - כך קריאות לכלים הן פגיעות במטמון.
+    budget מגביל את מספר הבקשות לאתר בשעה (0 מבטל את המתזמן).
+    """
+
+    def __init__(self, pool, calendar: Optional[GameweekCalendar] = None, budget: Optional[int] = None,
+                 history_store: Optional[HistoryStore] = None, lead: float = 30.0,
+                 intervals: Optional[Dict[str, Dict[str, float]]] = None):
+        self.pool = pool
+        self.calendar = calendar or GameweekCalendar.from_env()
+        self.budget = budget if budget is not None else int(os.getenv("SPORT5_PREFETCH_BUDGET", "60"))
+        self.history_store = history_store
+        self.lead = lead
+        self.intervals = intervals or INTERVALS
+        self._jobs: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        self._spent: deque = deque()  # (זמן, בקשות) בשעה האחרונה
+        self._learned_at = 0.0
+        self._task: Optional[asyncio.Task] = None
+        self._wake: Optional[asyncio.Event] = None
+        self.counters = {"runs": 0, "requests": 0, "changed": 0, "unchanged": 0, "deferred": 0, "errors": 0}
+
+    def _spent_in_window(self, now: float) -> int:
+        while self._spent and self._spent[0][0] <= now - HOUR:
+            self._spent.popleft()
+        return sum(cost for _, cost in self._spent)
+
+    def _kinds(self, client) -> List[str]:
+        return [kind for kind in KINDS if kind != "players" or client.player_catalog is not None]
+
+    async def _learn(self, now: float):
+        # הלמידה רצה רק בלי לוח מוגדר, ולכל היותר פעם בשעה
+        if self.calendar.configured or now - self._learned_at < HOUR:
+            return
+        self._learned_at = now
+        times: List[float] = []
+        if self.history_store is not None:
+            for account, _ in self.pool.clients():
+                try:
+                    times += await asyncio.to_thread(self.history_store.round_times, account, "league")
+                except (OSError, ValueError) as e:
+                    logger.warning(f"לא ניתן לקרוא את היסטוריית הליגה של {account}: {str(e)}")
+        self.calendar.learn(times)
+
+    def _next_run(self, job: Dict[str, Any], kind: str, now: float) -> float:
+        phase = self.calendar.phase(now)
+        interval = self.intervals[phase][kind] * job["backoff"]
+        interval = min(interval, self.intervals["idle"][kind])
+        change = self.calendar.next_change(now)
+        if change is not None and now < change - self.lead < now + interval:
+            return change - self.lead  # רענון לפני שהחלון נפתח
+        return now + interval
+
+    async def _run_job(self, client, kind: str, job: Dict[str, Any]) -> Tuple[bool, int]:
+        """(האם הנתונים השתנו, כמה בקשות נשלחו)"""
+        if kind == "players":
+            result = await client.sync_players()
+            if "error" in result:
+                raise RuntimeError(result["error"])
+            return bool(result["added"] or result["updated"] or result["removed"]), result["pages"]
+        fetch = client.get_my_team if kind == "my_team" else client.get_league_table
+        result = await fetch(fresh=True)
+        if "error" in result:
+            raise RuntimeError(result["error"])
+        data = client.cached(PATHS[kind])
+        if data is job.get("data"):
+            return False, 1  # 304 - אותו אובייקט מהמטמון
+        # תשובת 200 היא תמיד dict חדש, גם בלי שינוי - משווים את התוכן (ב-thread, ליגה גדולה)
+        digest = await asyncio.to_thread(content_digest, data)
+        changed = digest != job.get("digest")
+        job["data"], job["digest"] = data, digest
+        return changed, 1
+
+    async def run_once(self, now: Optional[float] = None) -> List[Tuple[str, str]]:
+        """הרצת המשימות שהגיע זמנן (בגבולות התקציב); מחזיר את המשימות שרצו"""
+        now = time.time() if now is None else now
+        await self._learn(now)
+        clients = dict(self.pool.clients())
+        for key in [key for key in self._jobs if key[0] not in clients]:
+            del self._jobs[key]
+
+        due = []
+        for account, client in clients.items():
+            if not client.logged_in:
+                continue
+            for kind in self._kinds(client):
+                job = self._jobs.setdefault((account, kind), {"next": now, "backoff": 1, "cost": 1})
+                if job["next"] <= now:
+                    due.append((job["next"], account, kind))
+
+        ran = []
+        for _, account, kind in sorted(due):
+            job = self._jobs[(account, kind)]
+            if self._spent_in_window(now) + job["cost"] > self.budget:
+                self.counters["deferred"] += 1
+                job["next"] = self._spent[0][0] + HOUR if self._spent else now + HOUR
+                continue
+            client = clients[account]
+            baseline = "digest" in job
+            try:
+                with metrics.timer("sport5_prefetch_seconds", kind=kind):
+                    changed, cost = await self._run_job(client, kind, job)
+            except Exception as e:
+                self.counters["errors"] += 1
+                logger.warning(f"משיכה מוקדמת של {kind} ל-{account} נכשלה: {str(e)}")
+                job["next"] = now + self.intervals["live"][kind]
+                continue
+            job["cost"] = cost
+            self._spent.append((now, cost))
+            self.counters["requests"] += cost
+            self.counters["changed" if changed else "unchanged"] += 1
+            metrics.inc("sport5_prefetch_requests_total", cost, kind=kind)
+            if changed:
+                job["backoff"] = 1
+                if kind == "league" and baseline:
+                    # המשיכה הראשונה רק קובעת בסיס - שינוי אמיתי בטבלה מסמן שעת משחק
+                    self.calendar.observe(now)
+            else:
+                job["backoff"] = min(job["backoff"] * 2, MAX_BACKOFF)
+            job["next"] = self._next_run(job, kind, now)
+            if kind in PATHS:
+                # הדף נשאר טרי עד המשיכה הבאה (ועוד מרווח קטן למקרה שהיא מתעכבת)
+                client.keep_fresh(PATHS[kind], job["next"] - now + self.lead)
+            ran.append((account, kind))
+        self.counters["runs"] += 1
+        return ran
+
+    def _sleep_time(self, now: float) -> float:
+        upcoming = [job["next"] for job in self._jobs.values()]
+        # מתעוררים לפחות כל 5 דקות כדי לגלות חשבונות שהתחברו בינתיים
+        return min(max(min(upcoming, default=now + 300) - now, 1.0), 300.0)
+
+    def start(self):
+        if self.budget <= 0 or (self._task is not None and not self._task.done()):
+            return
+        self._wake = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    def wake(self):
+        """הרצה מיידית (למשל אחרי התחברות חדשה)"""
+        if self._wake is not None:
+            self._wake.set()
+
+    async def _run(self):
+        while True:
+            try:
+                await self.run_once()
+            except Exception as e:
+                logger.error(f"שגיאה במתזמן המשיכה המוקדמת: {str(e)}")
+            self._wake.clear()
+            try:
+                await asyncio.wait_for(self._wake.wait(), self._sleep_time(time.time()))
+            except asyncio.TimeoutError:
+                pass
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self, now: Optional[float] = None) -> Dict[str, Any]:
+        now = time.time() if now is None else now
+        return {
+            **self.counters,
+            "running": self._task is not None and not self._task.done(),
+            "phase": self.calendar.phase(now),
+            "calendar": "configured" if self.calendar.configured else f"learned ({len(self.calendar.learned_hours)} live hours)",
+            "budget_per_hour": self.budget,
+            "spent_last_hour": self._spent_in_window(now),
+            "jobs": {
+                f"{account}/{kind}": {"next_in": round(job["next"] - now, 1), "backoff": job["backoff"]}
+                for (account, kind), job in sorted(self._jobs.items())
+            },
+        }
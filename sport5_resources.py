@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+משאבי MCP של הקבוצה, הליגה והשחקנים: כתובות, מנויים והודעות עדכון
+הודעה נשלחת למנויים רק כשה-hash של התוכן השתנה - רענון שהחזיר אותו תוכן לא מעיר אף לקוח
+"""
+
+import hashlib
+import json
+import logging
+from typing import Any, Dict, List, Optional, Set, Tuple
+from urllib.parse import parse_qs, quote, unquote, urlencode, urlparse
+
+from sport5_metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+SCHEME = "sport5"
+
+# שם המשאב בכתובת -> סוג הנתון (כמו בצילומי המצב)
+RESOURCE_KINDS = {"my-team": "my_team", "league": "league"}
+PLAYER_TEMPLATE = f"{SCHEME}://players/{{player_id}}"
+
+
+def resource_uri(name: str, account: Optional[str] = None, default_account: str = "default") -> str:
+    """sport5://my-team לחשבון ברירת המחדל, sport5://my-team?account=x לאחרים"""
+    uri = f"{SCHEME}://{name}"
+    if account and account != default_account:
+        uri += "?" + urlencode({"account": account})
+    return uri
+
+
+def player_uri(player_id: str) -> str:
+    # מזהה בלי data-player-id הוא "שם|קבוצה" - מקודד כדי שהכתובת תישאר יציבה
+    return f"{SCHEME}://players/{quote(str(player_id), safe='')}"
+
+
+def parse_resource_uri(uri: str, default_account: str = "default") -> Tuple[str, Optional[str], str]:
+    """(סוג, מזהה שחקן או None, חשבון); ValueError לכתובת לא מוכרת"""
+    parsed = urlparse(str(uri))
+    account = parse_qs(parsed.query).get("account", [default_account])[0]
+    if parsed.scheme == SCHEME:
+        if parsed.netloc in RESOURCE_KINDS and parsed.path in ("", "/"):
+            return RESOURCE_KINDS[parsed.netloc], None, account
+        if parsed.netloc == "players" and len(parsed.path) > 1:
+            return "player", unquote(parsed.path[1:]), account
+    raise ValueError(f"משאב לא מוכר: {uri}")
+
+
+def content_digest(data: Any) -> str:
+    text = json.dumps(data, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest()
+
+
+class ResourceHub:
+    """מנויים לפי כתובת משאב, וה-hash האחרון שכל כתובת פורסמה או הוגשה איתו
+
+    publish() משווה את התוכן החדש ל-hash האחרון: תוכן זהה לא שולח כלום, ותוכן שונה
+    שולח notifications/resources/updated לכל סשן שנרשם לכתובת. הלקוח קורא את המשאב
+    מחדש רק אחרי הודעה, כך שאין צורך לתשאל את הכלים שוב ושוב.
+    """
+
+    def __init__(self):
+        self._subscribers: Dict[str, Set[Any]] = {}
+        self._digests: Dict[str, str] = {}
+        self.notified = 0
+        self.unchanged = 0
+
+    def subscribe(self, uri: str, session: Any):
+        self._subscribers.setdefault(str(uri), set()).add(session)
+
+    def unsubscribe(self, uri: str, session: Any):
+        sessions = self._subscribers.get(str(uri))
+        if sessions is not None:
+            sessions.discard(session)
+            if not sessions:
+                del self._subscribers[str(uri)]
+
+    def subscribed(self, prefix: str = "") -> List[str]:
+        return [uri for uri in self._subscribers if uri.startswith(prefix)]
+
+    def served(self, uri: str, data: Any):
+        """התוכן שהוגש ללקוח הוא הבסיס להשוואה הבאה"""
+        self._digests[str(uri)] = content_digest(data)
+
+    def baseline(self, uri: str, data: Any):
+        """בסיס להשוואה רק אם עוד אין (למשל מנוי לפני קריאה ראשונה)"""
+        if str(uri) not in self._digests and data is not None:
+            self.served(uri, data)
+
+    async def publish(self, uri: str, data: Any) -> bool:
+        """תוכן חדש לכתובת; True אם השתנה ונשלחו הודעות"""
+        uri = str(uri)
+        digest = content_digest(data)
+        previous = self._digests.get(uri)
+        self._digests[uri] = digest
+        if previous is None or previous == digest:
+            # בלי בסיס אין למי לדווח על שינוי - הלקוח עוד לא קרא את המשאב
+            if previous is not None:
+                self.unchanged += 1
+            return False
+
+        from pydantic import AnyUrl
+        for session in list(self._subscribers.get(uri, ())):
+            try:
+                await session.send_resource_updated(AnyUrl(uri))
+            except Exception as e:
+                # הסשן נסגר - המנוי שלו נמחק
+                logger.info(f"הודעת עדכון ל-{uri} נכשלה ({str(e)}) - המנוי הוסר")
+                self.unsubscribe(uri, session)
+                continue
+            self.notified += 1
+            metrics.inc("sport5_resource_updates_total", kind=parse_resource_uri(uri)[0])
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "subscriptions": {uri: len(sessions) for uri, sessions in self._subscribers.items()},
+            "notified": self.notified,
+            "unchanged": self.unchanged,
+        }
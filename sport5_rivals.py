@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+ניתוח הסגלים של היריבים בליגה: אחזקה, קפטנות ואחזקה אפקטיבית לכל שחקן
+השחקנים מקודדים למספרים והספירה נעשית עם numpy.bincount במעבר אחד על כל הסגלים
+"""
+
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+
+def _percent(counts: np.ndarray, teams: int) -> np.ndarray:
+    return np.round(counts * 100.0 / teams, 1)
+
+
+def analyze_squads(squads: List[Dict[str, Any]], my_squad: Optional[Dict[str, Any]] = None,
+                   top: int = 20) -> Dict[str, Any]:
+    """סטטיסטיקות אחזקה וקפטנות לסגלים בפורמט של parse_my_team
+
+    אחזקה אפקטיבית = אחוז הסגלים שמחזיקים בשחקן + אחוז הסגלים שבחרו בו לקפטן (הקפטן נספר פעמיים),
+    כלומר כמה נקודות של השחקן הליגה מקבלת בממוצע. שחקן בסגל שלי עם אחזקה אפקטיבית נמוכה
+    הוא מבדל (differential); שחקן פופולרי שאין לי הוא איום.
+    """
+    teams = len(squads)
+    codes: Dict[str, int] = {}
+    prices: List[Optional[str]] = []
+    team_index: List[int] = []
+    player_codes: List[int] = []
+    captain_codes: List[int] = []
+
+    def code(name: str, price: Optional[str]) -> int:
+        if name not in codes:
+            codes[name] = len(prices)
+            prices.append(price)
+        return codes[name]
+
+    for index, squad in enumerate(squads):
+        for player in squad.get("players", []):
+            team_index.append(index)
+            player_codes.append(code(player["name"], player.get("price")))
+        if squad.get("captain"):
+            captain_codes.append(code(squad["captain"], None))
+
+    result: Dict[str, Any] = {"teams_analyzed": teams, "players_seen": len(prices)}
+    if not teams or not prices:
+        return result
+
+    size = len(prices)
+    # שחקן שמופיע פעמיים באותו סגל (שני שחקנים באותו שם) נספר פעם אחת לקבוצה
+    pairs = np.unique(np.asarray(team_index, dtype=np.int64) * size + np.asarray(player_codes, dtype=np.int64))
+    owned = np.bincount(pairs % size, minlength=size)
+    captained = np.bincount(np.asarray(captain_codes, dtype=np.int64), minlength=size)
+    ownership = _percent(owned, teams)
+    captaincy = _percent(captained, teams)
+    effective = _percent(owned + captained, teams)
+    names = list(codes)
+
+    def player(i: int) -> Dict[str, Any]:
+        return {
+            "name": names[i],
+            "price": prices[i],
+            "owned_by": int(owned[i]),
+            "ownership_pct": float(ownership[i]),
+            "captained_by": int(captained[i]),
+            "captaincy_pct": float(captaincy[i]),
+            "effective_ownership_pct": float(effective[i]),
+        }
+
+    # מיון יציב לפי אחזקה אפקטיבית יורדת - בשוויון נשמר סדר ההופעה בליגה
+    by_effective = np.argsort(-(owned + captained), kind="stable")
+    result["most_owned"] = [player(i) for i in by_effective[:top]]
+
+    captains = np.flatnonzero(captained)
+    captains = captains[np.argsort(-captained[captains], kind="stable")]
+    result["captaincy"] = {
+        "distinct_captains": int(captains.size),
+        "teams_without_captain": teams - len(captain_codes),
+        "top": [player(i) for i in captains[:top]],
+    }
+
+    if my_squad is not None:
+        my_players = my_squad.get("players", [])
+        mine = np.zeros(size, dtype=bool)
+        mine[[codes[p["name"]] for p in my_players if p.get("name") in codes]] = True
+        # שחקנים שלי שאף יריב לא מחזיק - אחזקה אפסית, הכי מבדלים
+        unseen = [{"name": p.get("name"), "price": p.get("price"), "owned_by": 0, "ownership_pct": 0.0,
+                   "captained_by": 0, "captaincy_pct": 0.0, "effective_ownership_pct": 0.0}
+                  for p in my_players if p.get("name") not in codes]
+        seen = np.flatnonzero(mine)
+        seen = seen[np.argsort(owned[seen] + captained[seen], kind="stable")]
+        result["my_differentials"] = unseen + [player(i) for i in seen]
+        result["threats"] = [player(i) for i in by_effective[~mine[by_effective]][:top]]
+        result["my_captain"] = my_squad.get("captain")
+
+    return result
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+שמירת סשנים מוצפנת לדיסק
+עוגיות ה-aiohttp ושיטת ההתחברות נשמרים לכל חשבון, כך שהפעלה מחדש של השרת לא מחייבת התחברות מחדש
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import time
+from http.cookies import SimpleCookie
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
+
+if TYPE_CHECKING:
+    import aiohttp
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SESSION_DIR = os.path.join(os.path.expanduser("~"), ".sport5_fantasy", "sessions")
+
+
+def _fernet_module():
+    """מודול fernet של cryptography (נטען בשימוש הראשון), או None אם החבילה לא מותקנת"""
+    try:
+        from cryptography import fernet
+    except ImportError:  # ההצפנה היא תלות אופציונלית - בלעדיה הסשנים לא נשמרים
+        return None
+    return fernet
+
+
+def export_cookies(jar: aiohttp.CookieJar) -> List[Dict[str, Any]]:
+    """המרת עוגיות ה-jar לרשימה שניתנת לשמירה ב-JSON"""
+    cookies = []
+    for morsel in jar:
+        cookies.append({
+            "key": morsel.key,
+            "value": morsel.value,
+            "domain": morsel["domain"],
+            "path": morsel["path"] or "/",
+            "expires": morsel["expires"],
+            "secure": bool(morsel["secure"]),
+            "httponly": bool(morsel["httponly"]),
+        })
+    return cookies
+
+
+def import_cookies(jar: aiohttp.CookieJar, cookies: List[Dict[str, Any]]):
+    """טעינת עוגיות שנשמרו עם export_cookies חזרה ל-jar"""
+    from yarl import URL
+    for cookie in cookies:
+        if not cookie.get("domain"):
+            continue
+        simple = SimpleCookie()
+        simple[cookie["key"]] = cookie["value"]
+        morsel = simple[cookie["key"]]
+        morsel["path"] = cookie.get("path") or "/"
+        if cookie.get("expires"):
+            morsel["expires"] = cookie["expires"]
+        if cookie.get("secure"):
+            morsel["secure"] = True
+        if cookie.get("httponly"):
+            morsel["httponly"] = True
+        jar.update_cookies(simple, URL.build(scheme="https", host=cookie["domain"]))
+
+
+class SessionStore:
+    """אחסון מוצפן (Fernet) של מצב הסשן לכל חשבון"""
+
+    def __init__(self, directory: Optional[str] = None, key: Optional[str] = None):
+        self.directory = os.path.expanduser(directory or os.getenv("SPORT5_SESSION_DIR") or DEFAULT_SESSION_DIR)
+        self._key = key or os.getenv("SPORT5_SESSION_KEY")
+        self._fernet = None
+
+    @property
+    def enabled(self) -> bool:
+        return _fernet_module() is not None
+
+    def _cipher(self):
+        if self._fernet is None:
+            os.makedirs(self.directory, mode=0o700, exist_ok=True)
+            key = self._key
+            if not key:
+                key_path = os.path.join(self.directory, ".key")
+                if os.path.exists(key_path):
+                    with open(key_path, "rb") as f:
+                        key = f.read().strip()
+                else:
+                    key = _fernet_module().Fernet.generate_key()
+                    self._write_private(key_path, key)
+            self._fernet = _fernet_module().Fernet(key)
+        return self._fernet
+
+    def _path(self, account: str) -> str:
+        name = hashlib.sha256(account.encode("utf-8")).hexdigest()[:24]
+        return os.path.join(self.directory, f"{name}.session")
+
+    @staticmethod
+    def _write_private(path: str, data: bytes):
+        """כתיבה אטומית של קובץ שרק המשתמש הנוכחי יכול לקרוא"""
+        tmp_path = f"{path}.tmp"
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def save(self, account: str, state: Dict[str, Any]):
+        if not self.enabled:
+            return
+        try:
+            payload = json.dumps(dict(state, saved_at=time.time()), ensure_ascii=False).encode("utf-8")
+            self._write_private(self._path(account), self._cipher().encrypt(payload))
+        except OSError as e:
+            logger.warning(f"לא ניתן לשמור את הסשן של {account}: {str(e)}")
+
+    def load(self, account: str) -> Optional[Dict[str, Any]]:
+        if not self.enabled:
+            return None
+        path = self._path(account)
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, "rb") as f:
+                return json.loads(self._cipher().decrypt(f.read()))
+        except (OSError, ValueError, _fernet_module().InvalidToken) as e:
+            logger.warning(f"הסשן השמור של {account} לא קריא - מתעלמים ממנו: {str(e)}")
+            self.delete(account)
+            return None
+
+    def delete(self, account: str):
+        try:
+            os.remove(self._path(account))
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,288 @@
+#!/usr/bin/env python3
+"""
+מאגר צילומי מצב של תוצאות get_league_table ו-get_my_team וחישוב השינויים ביניהם
+כל צילום נשמר לפי hash של התוכן, וההשוואה נעשית על hash לכל שורה כך שגם ליגות ענק מושוות מהר
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Union
+
+from sport5_format import parse_amount
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SNAPSHOT_DIR = os.path.join(os.path.expanduser("~"), ".sport5_fantasy", "snapshots")
+
+# סוג צילום -> (רשימת השורות בתוצאה, שדה הזיהוי של שורה)
+KINDS = {
+    "league": ("teams", "team_name"),
+    "my_team": ("players", "name"),
+}
+
+# שדות שהקליינט מוסיף לתוצאה ואינם חלק מהתוכן
+_VOLATILE_FIELDS = ("login_method",)
+
+
+def _digest(data: bytes) -> str:
+    return hashlib.blake2b(data, digest_size=8).hexdigest()
+
+
+def _canonical(value: Any) -> bytes:
+    return json.dumps(value, sort_keys=True, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def keyed_rows(kind: str, data: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    """השורות לפי מפתח הזיהוי שלהן; שמות כפולים מקבלים סיומת #2, #3..."""
+    list_key, id_key = KINDS[kind]
+    rows: Dict[str, Dict[str, Any]] = {}
+    repeats: Dict[str, int] = {}
+    for row in data.get(list_key) or []:
+        key = str(row.get(id_key))
+        if key in rows:
+            repeats[key] = repeats.get(key, 1) + 1
+            key = f"{key}#{repeats[key]}"
+        rows[key] = row
+    return rows
+
+
+def _row_digest(row: Dict[str, Any]) -> str:
+    # זול בהרבה מ-json.dumps לכל שורה, ולא תלוי בסדר השדות
+    return _digest("\x1f".join(f"{k}\x1e{v}" for k, v in sorted(row.items())).encode("utf-8"))
+
+
+def row_hashes(kind: str, data: Dict[str, Any]) -> Dict[str, str]:
+    """hash לכל שורה - שורות עם אותו hash לא נבדקות שדה-שדה בהשוואה"""
+    return {key: _row_digest(row) for key, row in keyed_rows(kind, data).items()}
+
+
+def _summary_fields(kind: str, data: Dict[str, Any]) -> Dict[str, Any]:
+    list_key, _ = KINDS[kind]
+    return {k: v for k, v in data.items() if k != list_key and k not in _VOLATILE_FIELDS}
+
+
+def _change(old: Any, new: Any) -> Dict[str, Any]:
+    change = {"from": old, "to": new}
+    old_number, new_number = parse_amount(old), parse_amount(new)
+    if old_number is not None and new_number is not None:
+        change["change"] = round(new_number - old_number, 3)
+    return change
+
+
+def _parse_time(value: Union[str, float, int]) -> float:
+    if isinstance(value, (int, float)):
+        return float(value)
+    return datetime.fromisoformat(value).timestamp()
+
+
+def _format_time(timestamp: float) -> str:
+    return datetime.fromtimestamp(timestamp).isoformat(timespec="seconds")
+
+
+class SnapshotStore:
+    """צילומי מצב לכל חשבון וסוג, בתיקייה SPORT5_SNAPSHOT_DIR
+
+    לכל חשבון וסוג יש index.json (רשימת צילומים לפי זמן) וקובץ לכל תוכן שונה בשם ה-hash שלו,
+    כך שתוכן שחוזר על עצמו לא נשמר פעמיים. served.json זוכר את הצילום האחרון שהוחזר ב-changes.
+    """
+
+    def __init__(self, directory: Optional[str] = None, keep: Optional[int] = None):
+        self.directory = os.path.expanduser(directory or os.getenv("SPORT5_SNAPSHOT_DIR") or DEFAULT_SNAPSHOT_DIR)
+        self.keep = max(keep if keep is not None else int(os.getenv("SPORT5_SNAPSHOT_KEEP", "50")), 1)
+        self._lock = threading.Lock()
+        self._loaded: Dict[str, Dict[str, Any]] = {}  # הצילום האחרון שנקרא/נכתב לכל תיקייה
+
+    def _dir(self, account: str, kind: str) -> str:
+        name = hashlib.sha256(account.encode("utf-8")).hexdigest()[:24]
+        return os.path.join(self.directory, name, kind)
+
+    @staticmethod
+    def _write_atomic(path: str, data: bytes):
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def _read_index(self, directory: str) -> List[Dict[str, Any]]:
+        try:
+            with open(os.path.join(directory, "index.json"), encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return []
+        except (OSError, ValueError) as e:
+            logger.warning(f"אינדקס צילומי המצב ב-{directory} לא קריא - מתחילים מחדש: {str(e)}")
+            return []
+
+    def _read_snapshot(self, directory: str, snapshot_id: str) -> Dict[str, Any]:
+        cached = self._loaded.get(directory)
+        if cached is not None and cached["id"] == snapshot_id:
+            return cached
+        with open(os.path.join(directory, f"{snapshot_id}.json"), encoding="utf-8") as f:
+            return json.load(f)
+
+    def _read_served(self, directory: str) -> Optional[str]:
+        try:
+            with open(os.path.join(directory, "served.json"), encoding="utf-8") as f:
+                return json.load(f).get("id")
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, AttributeError) as e:
+            logger.warning(f"served.json ב-{directory} לא קריא - משווים לצילום הקודם: {str(e)}")
+            return None
+
+    def record(self, account: str, kind: str, data: Dict[str, Any], taken_at: Optional[float] = None) -> Dict[str, Any]:
+        """שמירת צילום של תוצאה; מחזיר את רשומת האינדקס (id לפי hash התוכן)"""
+        hashes = row_hashes(kind, data)
+        summary = _summary_fields(kind, data)
+        snapshot_id = _digest(_canonical(summary) + "".join(hashes.values()).encode("ascii"))
+        taken_at = taken_at if taken_at is not None else time.time()
+        directory = self._dir(account, kind)
+
+        with self._lock:
+            os.makedirs(directory, exist_ok=True)
+            index = self._read_index(directory)
+            if index and index[-1]["id"] == snapshot_id:
+                return index[-1]  # אין שינוי מאז הצילום האחרון
+
+            path = os.path.join(directory, f"{snapshot_id}.json")
+            snapshot = {
+                "id": snapshot_id,
+                "kind": kind,
+                "data": dict(summary, **{KINDS[kind][0]: data.get(KINDS[kind][0]) or []}),
+                "row_hashes": hashes,
+            }
+            if not os.path.exists(path):
+                self._write_atomic(path, json.dumps(snapshot, ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
+            self._loaded[directory] = snapshot
+
+            entry = {"id": snapshot_id, "taken_at": taken_at, "rows": len(hashes)}
+            index.append(entry)
+            dropped, index = index[:-self.keep], index[-self.keep:]
+            self._write_atomic(os.path.join(directory, "index.json"), _canonical(index))
+
+            kept = {item["id"] for item in index}
+            for old in {item["id"] for item in dropped} - kept:
+                try:
+                    os.remove(os.path.join(directory, f"{old}.json"))
+                except FileNotFoundError:
+                    pass
+            return entry
+
+    def snapshots(self, account: str, kind: str) -> List[Dict[str, Any]]:
+        """רשימת הצילומים של חשבון וסוג, מהישן לחדש"""
+        with self._lock:
+            return self._read_index(self._dir(account, kind))
+
+    def changes(self, account: str, kind: str, since: Optional[str] = None,
+                since_time: Optional[Union[str, float]] = None, limit: int = 50) -> Dict[str, Any]:
+        """השינויים בין צילום בסיס לצילום האחרון
+
+        הבסיס הוא הצילום since, או האחרון שצולם עד since_time, ובלי שניהם - הצילום האחרון שהוחזר
+        בקריאה קודמת ל-changes (ואם אין כזה, התוכן הקודם שנצפה). כך קריאה חוזרת בלי נתונים
+        חדשים מחזירה רשימה ריקה ולא את אותו שינוי שוב. הצילום האחרון נרשם כמי שהוחזר.
+        """
+        directory = self._dir(account, kind)
+        with self._lock:
+            index = self._read_index(directory)
+            if not index:
+                return {"error": "אין עדיין צילומי מצב - צריך למשוך את הנתונים לפחות פעם אחת"}
+            latest = index[-1]
+
+            if since:
+                matches = [entry for entry in index if entry["id"] == since]
+                if not matches:
+                    return {"error": f"צילום המצב {since} לא נמצא"}
+                base = matches[-1]
+            elif since_time is not None:
+                try:
+                    cutoff = _parse_time(since_time)
+                except ValueError:
+                    return {"error": f"זמן לא תקין: {since_time}"}
+                earlier = [entry for entry in index if entry["taken_at"] <= cutoff]
+                base = earlier[-1] if earlier else index[0]
+            else:
+                served = self._read_served(directory)
+                matches = [entry for entry in index if entry["id"] == served]
+                previous = [entry for entry in index if entry["id"] != latest["id"]]
+                base = matches[-1] if matches else previous[-1] if previous else latest
+
+            try:
+                old = self._read_snapshot(directory, base["id"])
+                new = self._read_snapshot(directory, latest["id"])
+            except (OSError, ValueError) as e:
+                return {"error": f"לא ניתן לקרוא את צילומי המצב: {str(e)}"}
+            self._write_atomic(os.path.join(directory, "served.json"), _canonical({"id": latest["id"]}))
+
+        result = {
+            "kind": kind,
+            "from": {"snapshot": base["id"], "taken_at": _format_time(base["taken_at"])},
+            "to": {"snapshot": latest["id"], "taken_at": _format_time(latest["taken_at"])},
+        }
+        result.update(diff_snapshots(kind, old, new, limit))
+        return result
+
+
+def diff_snapshots(kind: str, old: Dict[str, Any], new: Dict[str, Any], limit: int = 50) -> Dict[str, Any]:
+    """השוואת שני צילומים: רק שורות שה-hash שלהן השתנה נבדקות שדה-שדה"""
+    old_hashes, new_hashes = old["row_hashes"], new["row_hashes"]
+    added = [key for key in new_hashes if key not in old_hashes]
+    removed = [key for key in old_hashes if key not in new_hashes]
+    changed = [key for key, digest in new_hashes.items() if key in old_hashes and old_hashes[key] != digest]
+
+    old_rows = keyed_rows(kind, old["data"]) if (changed or removed) else {}
+    new_rows = keyed_rows(kind, new["data"]) if (changed or added) else {}
+    _, id_key = KINDS[kind]
+
+    summary = {}
+    old_summary, new_summary = _summary_fields(kind, old["data"]), _summary_fields(kind, new["data"])
+    for field in sorted(set(old_summary) | set(new_summary)):
+        if old_summary.get(field) != new_summary.get(field):
+            summary[field] = _change(old_summary.get(field), new_summary.get(field))
+
+    field_changes: Dict[str, List[Dict[str, Any]]] = {}
+    for key in changed:
+        old_row, new_row = old_rows[key], new_rows[key]
+        for field in new_row.keys() | old_row.keys():
+            if field != id_key and old_row.get(field) != new_row.get(field):
+                entry = {id_key: new_row.get(id_key), **_change(old_row.get(field), new_row.get(field))}
+                field_changes.setdefault(field, []).append(entry)
+
+    if kind == "league":
+        # בדירוג, שינוי חיובי הוא טיפוס בטבלה
+        rank_moves = field_changes.pop("position", [])
+        for entry in rank_moves:
+            if "change" in entry:
+                entry["change"] = -entry["change"]
+        groups = {
+            "rank_moves": rank_moves,
+            "point_changes": field_changes.pop("points", []),
+            "new_teams": [new_rows[key] for key in added],
+            "removed_teams": [old_rows[key] for key in removed],
+        }
+    else:
+        groups = {
+            "transfers_in": [new_rows[key] for key in added],
+            "transfers_out": [old_rows[key] for key in removed],
+            "price_changes": field_changes.pop("price", []),
+        }
+    for field, entries in field_changes.items():
+        groups[f"{field}_changes"] = entries
+
+    # הרשימות מוגבלות ל-limit (השינויים הגדולים ראשונים), והספירות המלאות נשמרות ב-counts
+    counts = {name: len(entries) for name, entries in groups.items()}
+    for entries in groups.values():
+        entries.sort(key=lambda entry: abs(entry.get("change", 0)), reverse=True)
+        del entries[limit:]
+
+    return {
+        "changed": bool(summary or added or removed or changed),
+        "summary": summary,
+        **groups,
+        "counts": counts,
+        "unchanged_rows": len(new_hashes) - len(added) - len(changed),
+    }
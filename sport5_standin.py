@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for fantasyleague.sport5.co.il with a synthetic page generator
+
+Serves /login, /my-team, /league, the rival /team/<n> pages and the paged /players listing at configurable
+sizes and latency so the client and the MCP tools can be benchmarked offline.
+
+Usage:
+    python sport5_standin.py --port 8080 --players 15 --league-rows 100000 --latency-ms 50
+    SPORT5_BASE_URL=http://localhost:8080 python sport5_mcp_google.py
+"""
+
+import argparse
+import asyncio
+import hashlib
+import random
+from typing import Dict, Optional
+
+from aiohttp import web
+
+SESSION_COOKIE = "sport5_standin_session"
+
+
+def synthetic_team_page(players: int = 15, seed: int = 0, pool: int = 600, team_name: str = "הפועל ספסל") -> str:
+    """A /my-team page with the markup the extraction engine looks for
+
+    Seed 0 is "my" squad (players 0..players-1); any other seed picks a rival squad from `pool` catalogue
+    players, skewed towards low ids so that some players are owned by most of the league.
+    """
+    rng = random.Random(seed)
+    ids = list(range(players))
+    if seed:
+        picked = set()
+        while len(picked) < min(players, pool):
+            picked.add(int(pool * rng.random() ** 3))
+        ids = sorted(picked)
+    captain = ids[0] if not seed else rng.choice(ids[:3])
+    rows = "\n".join(
+        f'<div class="player-card pos-{i % 4}{" captain" if i == captain else ""}">'
+        f'<span class="player-name">שחקן {i}</span>'
+        f'<span class="player-club">קבוצה {rng.randint(1, 14)}</span>'
+        f'<span class="player-price">{rng.randint(40, 130) / 10}M</span>'
+        f'<span class="player-points">{rng.randint(0, 120)}</span>'
+        f'</div>'
+        for i in ids
+    )
+    return (
+        '<html><head><meta charset="utf-8"><title>הקבוצה שלי</title></head><body>'
+        f'<h2 class="my-team-title">{team_name}</h2>'
+        '<div class="team-summary"><span class="budget-left">3.5M</span>'
+        '<span class="total-points">812</span></div>'
+        f'<section class="squad">{rows}</section>'
+        '</body></html>'
+    )
+
+
+def synthetic_league_page(teams: int = 500, my_team_position: Optional[int] = None) -> str:
+    """A /league page with `teams` rows linking to /team/<n>; my team is placed at my_team_position (1-based)"""
+    rows = "\n".join(
+        f'<tr><td>{i + 1}</td>'
+        f'<td><a href="/team/{i + 1}">{"הפועל ספסל" if my_team_position == i + 1 else f"קבוצה {i + 1}"}</a></td>'
+        f'<td>{max(2000 - i // 10, 0)}</td></tr>'
+        for i in range(teams)
+    )
+    return (
+        '<html><head><meta charset="utf-8"><title>ליגה</title></head><body>'
+        '<table class="league-table"><tr><th>#</th><th>קבוצה</th><th>נקודות</th></tr>'
+        f'{rows}</table></body></html>'
+    )
+
+
+POSITIONS = ("GK", "DEF", "MID", "FWD")
+
+
+def synthetic_player(player_id: int, seed: int = 0) -> dict:
+    """One catalogue player; the same id and seed always give the same player"""
+    rng = random.Random(player_id * 7919 + seed)
+    # roughly a real squad mix: 10% goalkeepers, 30% defenders, 40% midfielders, 20% forwards
+    position = POSITIONS[(0, 1, 1, 1, 2, 2, 2, 2, 3, 3)[player_id % 10]]
+    return {
+        "id": str(player_id),
+        "name": f"שחקן {player_id}",
+        "club": f"קבוצה {rng.randint(1, 14)}",
+        "position": position,
+        "price": f"{rng.randint(40, 130) / 10}M",
+        "points": str(rng.randint(0, 180)),
+    }
+
+
+def synthetic_players_page(total: int = 600, page: int = 1, per_page: int = 50, seed: int = 0) -> str:
+    """Page `page` of a /players listing with `total` players and numbered page links"""
+    pages = max((total + per_page - 1) // per_page, 1)
+    first = (page - 1) * per_page
+    rows = "\n".join(
+        f'<tr class="player-row" data-player-id="{p["id"]}">'
+        f'<td class="player-name">{p["name"]}</td><td class="player-club">{p["club"]}</td>'
+        f'<td class="player-position">{p["position"]}</td><td class="player-price">{p["price"]}</td>'
+        f'<td class="player-points">{p["points"]}</td></tr>'
+        for p in (synthetic_player(i, seed) for i in range(first, min(first + per_page, total)))
+    )
+    links = "".join(f'<a href="/players?page={n}">{n}</a>' for n in range(1, pages + 1))
+    return (
+        '<html><head><meta charset="utf-8"><title>שחקנים</title></head><body>'
+        f'<table class="players-table"><tr><th>שם</th><th>קבוצה</th><th>עמדה</th><th>מחיר</th><th>נקודות</th></tr>'
+        f'{rows}</table><nav class="pagination">{links}</nav></body></html>'
+    )
+
+
+class Sport5StandIn:
+    """aiohttp app that imitates the fantasy site; settings can change while it runs"""
+
+    def __init__(self, players: int = 15, league_rows: int = 500, latency_ms: float = 0,
+                 etag: bool = True, require_login: bool = True, catalog_players: int = 600,
+                 players_per_page: int = 50):
+        self.players = players
+        self.league_rows = league_rows
+        self.catalog_players = catalog_players
+        self.players_per_page = players_per_page
+        self.catalog_seed = 0  # change to reprice/rescore the catalogue
+        self.latency_ms = latency_ms
+        self.etag = etag
+        self.require_login = require_login
+        self.requests: Dict[str, int] = {}
+        self._pages: Dict[tuple, bytes] = {}
+        self._runner = None
+        self.base_url = None
+
+    def page(self, path: str, page: int = 1) -> bytes:
+        if path == "/players":
+            key = (path, self.catalog_players, self.players_per_page, self.catalog_seed, page)
+            if key not in self._pages:
+                self._pages[key] = synthetic_players_page(
+                    self.catalog_players, page, self.players_per_page, self.catalog_seed
+                ).encode("utf-8")
+        elif path == "/my-team":
+            key = (path, self.players)
+            if key not in self._pages:
+                self._pages[key] = synthetic_team_page(self.players).encode("utf-8")
+        elif path.startswith("/team/"):
+            # rival squads are generated on demand and not kept - a large league has one page per team
+            number = int(path.rsplit("/", 1)[1])
+            return synthetic_team_page(self.players, seed=number, pool=self.catalog_players,
+                                       team_name=f"קבוצה {number}").encode("utf-8")
+        else:
+            key = (path, self.league_rows)
+            if key not in self._pages:
+                my_position = max(self.league_rows // 2, 1)
+                self._pages[key] = synthetic_league_page(self.league_rows, my_position).encode("utf-8")
+        return self._pages[key]
+
+    async def _delay(self):
+        if self.latency_ms:
+            await asyncio.sleep(self.latency_ms / 1000)
+
+    def _count(self, request):
+        name = f"{request.method} {request.path}"
+        self.requests[name] = self.requests.get(name, 0) + 1
+
+    async def _login_page(self, request):
+        self._count(request)
+        await self._delay()
+        return web.Response(
+            text='<html><body><form method="post"><input name="_token" value="standin-csrf">'
+                 '<input name="email"><input name="password"></form></body></html>',
+            content_type="text/html",
+        )
+
+    async def _login(self, request):
+        self._count(request)
+        await self._delay()
+        form = await request.post()
+        if form.get("_token") != "standin-csrf" or not form.get("email"):
+            return web.Response(text="<p>פרטי התחברות שגויים</p>", content_type="text/html")
+        response = web.HTTPFound("/my-team")
+        response.set_cookie(SESSION_COOKIE, hashlib.sha1(form["email"].encode("utf-8")).hexdigest())
+        raise response
+
+    async def _data_page(self, request):
+        self._count(request)
+        if self.require_login and SESSION_COOKIE not in request.cookies:
+            raise web.HTTPFound("/login")
+        await self._delay()
+
+        try:
+            page = max(int(request.query.get("page", "1")), 1)
+        except ValueError:
+            page = 1
+        body = self.page(request.path, page)
+        headers = {}
+        if self.etag:
+            etag = f'"{hashlib.md5(body).hexdigest()}"'
+            headers["ETag"] = etag
+            if request.headers.get("If-None-Match") == etag:
+                return web.Response(status=304, headers=headers)
+        return web.Response(body=body, content_type="text/html", charset="utf-8", headers=headers)
+
+    def make_app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_get("/login", self._login_page)
+        app.router.add_post("/login", self._login)
+        app.router.add_get("/my-team", self._data_page)
+        app.router.add_get("/league", self._data_page)
+        app.router.add_get("/players", self._data_page)
+        app.router.add_get("/team/{number:\\d+}", self._data_page)
+        return app
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        self._runner = web.AppRunner(self.make_app(), access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        # "localhost" rather than the IP: aiohttp's cookie jar ignores cookies set by IP hosts
+        self.base_url = f"http://localhost:{port}"
+        return self.base_url
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+
+async def serve(args):
+    standin = Sport5StandIn(args.players, args.league_rows, args.latency_ms, catalog_players=args.catalog_players)
+    base_url = await standin.start(args.host, args.port)
+    print(f"Sport5 stand-in listening on {base_url} (Ctrl+C to stop)")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await standin.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--players", type=int, default=15)
+    parser.add_argument("--league-rows", type=int, default=500)
+    parser.add_argument("--latency-ms", type=float, default=0)
+    parser.add_argument("--catalog-players", type=int, default=600)
+    try:
+        asyncio.run(serve(parser.parse_args()))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,416 @@
+#!/usr/bin/env python3
+"""
+שכבת התעבורה של הקליינט: live (ישירות לאתר), record (הקלטת כל בקשה ותשובה לארכיון) ו-replay (הגשה מהארכיון)
+בהקלטה ובהשמעה הקליינט מקבל אותו אובייקט תשובה מהזיכרון, כך שמסלול הקוד זהה והמדידות ניתנות להשוואה
+
+שימוש:
+    SPORT5_TRANSPORT=record SPORT5_TRANSPORT_ARCHIVE=site.sp5 python sport5_mcp_google.py
+    SPORT5_TRANSPORT=replay SPORT5_TRANSPORT_ARCHIVE=site.sp5 SPORT5_REPLAY_TIMING=1 python sport5_mcp_google.py
+    python sport5_transport.py info site.sp5
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import mmap
+import os
+import re
+import struct
+import threading
+import time
+import zlib
+from typing import TYPE_CHECKING, Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from sport5_metrics import metrics
+
+if TYPE_CHECKING:
+    import aiohttp
+
+logger = logging.getLogger(__name__)
+
+MODES = ("live", "record", "replay")
+DEFAULT_ARCHIVE = os.path.join(os.path.expanduser("~"), ".sport5_fantasy", "recording.sp5")
+
+_MAGIC = b"SP5REC1\n"
+_RECORD = struct.Struct(">II")  # אורך המטא-דאטה, אורך הגוף (אחרי דחיסה)
+
+# כותרות שלא נשמרות: עוגיות וטוקנים (סודות), וכותרות העברה שלא מתאימות לגוף המפוענח
+_SECRET_HEADERS = frozenset({"cookie", "set-cookie", "authorization", "proxy-authorization"})
+_TRANSFER_HEADERS = frozenset({"content-encoding", "content-length", "transfer-encoding", "connection", "keep-alive"})
+_KEPT_REQUEST_HEADERS = ("If-None-Match", "If-Modified-Since")
+
+_CHARSET = re.compile(r"charset=\"?([\w.:-]+)", re.IGNORECASE)
+
+
+class ReplayMissError(LookupError):
+    """אין בארכיון הקלטה לבקשה הזו"""
+
+    def __init__(self, method: str, key: str):
+        super().__init__(f"אין הקלטה עבור {method} {key}")
+        self.method = method
+        self.key = key
+
+
+def request_key(url: Any) -> str:
+    """נתיב + query בלי host - הארכיון עובד גם מול base_url אחר (למשל שרת מקומי)"""
+    from yarl import URL
+    url = URL(str(url))
+    return url.raw_path_qs or "/"
+
+
+class ReplayArchive:
+    """קובץ הקלטות: רשומות באורך ידוע (מטא-דאטה JSON + גוף דחוס ב-zlib), שנוספות לסוף הקובץ
+
+    בטעינה נבנה אינדקס לפי (method, נתיב), והגופים נפרסים מהקובץ רק כשמבקשים אותם
+    ונשמרים פרוסים - כך השמעה של אלפי בקשות לשנייה היא חיפוש במילון.
+    """
+
+    def __init__(self, path: str):
+        self.path = os.path.expanduser(path)
+        self._lock = threading.Lock()
+        self._index: Optional[Dict[Tuple[str, str], List[Dict[str, Any]]]] = None
+        self._bodies: Dict[int, bytes] = {}
+        self._cursors: Dict[Tuple[str, str], int] = {}
+        self._data = None
+
+    def append(self, meta: Dict[str, Any], body: bytes):
+        """הוספת בקשה ותשובה לסוף הארכיון (נקרא מ-thread - הדחיסה לא חוסמת את ה-loop)"""
+        compressed = zlib.compress(body, 6) if body else b""
+        if len(compressed) < len(body):
+            meta = dict(meta, z=1)
+        else:
+            compressed = body
+        encoded = json.dumps(meta, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        with self._lock:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            with open(self.path, "ab") as f:
+                if f.tell() == 0:
+                    f.write(_MAGIC)
+                f.write(_RECORD.pack(len(encoded), len(compressed)))
+                f.write(encoded)
+                f.write(compressed)
+            self._index = None  # הקלטה חדשה - האינדקס ייבנה מחדש בקריאה הבאה
+
+    def _load(self) -> Dict[Tuple[str, str], List[Dict[str, Any]]]:
+        with self._lock:
+            if self._index is not None:
+                return self._index
+            index: Dict[Tuple[str, str], List[Dict[str, Any]]] = {}
+            with open(self.path, "rb") as f:
+                data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if os.fstat(f.fileno()).st_size else b""
+            if data[:len(_MAGIC)] != _MAGIC:
+                raise ValueError(f"{self.path} אינו ארכיון הקלטות של sport5")
+            offset = len(_MAGIC)
+            while offset + _RECORD.size <= len(data):
+                meta_length, body_length = _RECORD.unpack_from(data, offset)
+                offset += _RECORD.size
+                meta = json.loads(bytes(data[offset:offset + meta_length]).decode("utf-8"))
+                offset += meta_length
+                meta["offset"], meta["length"] = offset, body_length
+                offset += body_length
+                index.setdefault((meta["method"], meta["key"]), []).append(meta)
+            if isinstance(self._data, mmap.mmap):
+                self._data.close()
+            self._data = data
+            self._bodies.clear()
+            self._index = index
+            return index
+
+    def entries(self) -> List[Dict[str, Any]]:
+        return sorted((meta for metas in self._load().values() for meta in metas), key=lambda meta: meta["offset"])
+
+    def body(self, meta: Dict[str, Any]) -> bytes:
+        body = self._bodies.get(meta["offset"])
+        if body is None:
+            raw = bytes(self._data[meta["offset"]:meta["offset"] + meta["length"]])
+            body = zlib.decompress(raw) if meta.get("z") else raw
+            self._bodies[meta["offset"]] = body
+        return body
+
+    def next(self, method: str, key: str) -> Optional[Dict[str, Any]]:
+        """ההקלטה הבאה לבקשה, לפי סדר ההקלטה; האחרונה חוזרת שוב ושוב"""
+        metas = self._load().get((method, key))
+        if not metas:
+            return None
+        cursor = self._cursors.get((method, key), 0)
+        self._cursors[(method, key)] = min(cursor + 1, len(metas) - 1)
+        return metas[cursor]
+
+    def latest_full(self, method: str, key: str, before: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """התשובה המלאה (לא 304) האחרונה שהוקלטה לבקשה עד ההקלטה before"""
+        full = [meta for meta in self._load().get((method, key), [])
+                if meta["status"] != 304 and meta["offset"] <= before["offset"]]
+        return full[-1] if full else None
+
+    def rewind(self):
+        self._cursors.clear()
+
+    def close(self):
+        with self._lock:
+            if isinstance(self._data, mmap.mmap):
+                self._data.close()
+            self._data = None
+            self._index = None
+            self._bodies.clear()
+
+
+class _Content:
+    """response.content של aiohttp מעל גוף שכבר בזיכרון"""
+
+    def __init__(self, response: "RecordedResponse"):
+        self._response = response
+
+    async def iter_chunked(self, size: int) -> AsyncIterator[bytes]:
+        body = self._response._body
+        delay = self._response._transfer_delay
+        per_chunk = delay * size / len(body) if body and delay else 0.0
+        view = memoryview(body)
+        for start in range(0, len(body), size):
+            if self._response.closed:
+                return
+            if per_chunk:
+                await asyncio.sleep(per_chunk)
+            yield bytes(view[start:start + size])
+
+    async def read(self) -> bytes:
+        return await self._response.read()
+
+
+class RecordedResponse:
+    """תשובה מהארכיון (או שהוקלטה עכשיו) עם החלק של ClientResponse שהקליינט משתמש בו"""
+
+    def __init__(self, method: str, url: str, meta: Dict[str, Any], body: bytes, transfer_delay: float = 0.0):
+        from multidict import CIMultiDict, CIMultiDictProxy
+        from yarl import URL
+        self.method = method
+        self.status = meta["status"]
+        self.reason = meta.get("reason") or ""
+        self.url = URL(url).join(URL(meta.get("final") or meta["key"]))
+        headers = CIMultiDict(meta.get("headers", []))
+        if body or self.status != 304:
+            headers["Content-Length"] = str(len(body))
+        self.headers = CIMultiDictProxy(headers)
+        self.content = _Content(self)
+        self.closed = False
+        self._body = body
+        self._transfer_delay = transfer_delay
+
+    @property
+    def content_length(self) -> Optional[int]:
+        value = self.headers.get("Content-Length")
+        return int(value) if value is not None else None
+
+    @property
+    def charset(self) -> Optional[str]:
+        match = _CHARSET.search(self.headers.get("Content-Type", ""))
+        return match.group(1).lower() if match else None
+
+    async def read(self) -> bytes:
+        if self._transfer_delay:
+            await asyncio.sleep(self._transfer_delay)
+        return self._body
+
+    async def text(self, encoding: Optional[str] = None) -> str:
+        return (await self.read()).decode(encoding or self.charset or "utf-8", errors="replace")
+
+    def raise_for_status(self):
+        if self.status >= 400:
+            import aiohttp
+            from multidict import CIMultiDictProxy, CIMultiDict
+            info = aiohttp.RequestInfo(self.url, self.method, CIMultiDictProxy(CIMultiDict()), self.url)
+            raise aiohttp.ClientResponseError(info, (), status=self.status, message=self.reason, headers=self.headers)
+
+    def close(self):
+        self.closed = True
+
+    def release(self):
+        self.closed = True
+
+
+class _RequestContext:
+    """תוצאת session.get(...) - async with מבצע את הבקשה"""
+
+    def __init__(self, send, method: str, url: Any, kwargs: Dict[str, Any]):
+        self._send = send
+        self._args = (method, url, kwargs)
+        self._response = None
+
+    async def __aenter__(self):
+        self._response = await self._send(*self._args)
+        return self._response
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        self._response.release()
+
+
+class _WrappedSession:
+    """ממשק ה-ClientSession שהקליינט משתמש בו; העוגיות והסגירה עוברות לסשן האמיתי"""
+
+    def __init__(self, session: aiohttp.ClientSession, transport: "Transport"):
+        self._session = session
+        self.transport = transport
+
+    @property
+    def cookie_jar(self):
+        return self._session.cookie_jar
+
+    @property
+    def closed(self) -> bool:
+        return self._session.closed
+
+    async def close(self):
+        await self._session.close()
+
+    def get(self, url, **kwargs) -> _RequestContext:
+        return _RequestContext(self._send, "GET", url, kwargs)
+
+    def post(self, url, **kwargs) -> _RequestContext:
+        return _RequestContext(self._send, "POST", url, kwargs)
+
+    def head(self, url, **kwargs) -> _RequestContext:
+        return _RequestContext(self._send, "HEAD", url, kwargs)
+
+    async def _send(self, method: str, url: Any, kwargs: Dict[str, Any]) -> RecordedResponse:
+        raise NotImplementedError
+
+
+class RecordingSession(_WrappedSession):
+    """כל בקשה יוצאת לאתר, הגוף נקרא במלואו ונשמר לארכיון עם הכותרות והזמנים
+
+    גוף הבקשה (למשל סיסמה בטופס הכניסה), עוגיות וכותרות הרשאה לא נשמרים.
+    """
+
+    async def _send(self, method: str, url: Any, kwargs: Dict[str, Any]) -> RecordedResponse:
+        started = time.perf_counter()
+        async with self._session.request(method, url, **kwargs) as response:
+            ttfb = time.perf_counter() - started
+            body = await response.read() if method != "HEAD" else b""
+            elapsed = time.perf_counter() - started
+            sent = kwargs.get("headers") or {}
+            meta = {
+                "method": method,
+                "key": request_key(url),
+                "request_headers": {name: sent[name] for name in _KEPT_REQUEST_HEADERS if name in sent},
+                "status": response.status,
+                "reason": response.reason,
+                "final": request_key(response.url),
+                "headers": [[name, value] for name, value in response.headers.items()
+                            if name.lower() not in _SECRET_HEADERS and name.lower() not in _TRANSFER_HEADERS],
+                "ttfb_ms": round(ttfb * 1000, 3),
+                "elapsed_ms": round(elapsed * 1000, 3),
+                "recorded_at": time.time(),
+            }
+        await asyncio.to_thread(self.transport.archive.append, meta, body)
+        self.transport.recorded += 1
+        metrics.inc("sport5_transport_recorded_total", method=method)
+        return RecordedResponse(method, str(url), meta, body)
+
+
+class ReplaySession(_WrappedSession):
+    """תשובות מהארכיון בלי פנייה לרשת; timing מכפיל את הזמנים שהוקלטו (0 = מיד)
+
+    GET מותנה מקבל 304 כשה-ETag שהקליינט שלח זהה לזה של ההקלטה, כמו באתר עצמו.
+    """
+
+    async def _send(self, method: str, url: Any, kwargs: Dict[str, Any]) -> RecordedResponse:
+        transport = self.transport
+        key = request_key(url)
+        meta = transport.archive.next(method, key)
+        if meta is None and method == "HEAD":
+            meta = transport.archive.next("GET", key)
+            if meta is not None:
+                # HEAD בלי הפניות: הפניה לדף הכניסה נראית כ-302
+                redirected = meta.get("final", key) != key
+                meta = dict(meta, method="HEAD", status=302 if redirected else meta["status"], final=key, length=0)
+        if meta is None:
+            transport.misses += 1
+            metrics.inc("sport5_transport_replay_misses_total", method=method)
+            raise ReplayMissError(method, key)
+
+        sent = kwargs.get("headers") or {}
+        etag = dict((name.lower(), value) for name, value in meta.get("headers", [])).get("etag")
+        if meta["status"] == 304 and not sent.get("If-None-Match"):
+            # ההקלטה היא 304 אבל לקליינט אין עותק - מגישים את התשובה המלאה האחרונה שלפניה
+            meta = transport.archive.latest_full(method, key, meta) or meta
+        elif meta["status"] == 200 and etag and sent.get("If-None-Match") == etag:
+            meta = dict(meta, status=304, length=0)
+
+        if transport.timing:
+            await asyncio.sleep(meta.get("ttfb_ms", 0) / 1000 * transport.timing)
+        body = transport.archive.body(meta) if meta.get("length") and meta["status"] != 304 and method != "HEAD" else b""
+        transfer = max(meta.get("elapsed_ms", 0) - meta.get("ttfb_ms", 0), 0) / 1000 * transport.timing
+        transport.replayed += 1
+        return RecordedResponse(method, str(url), meta, body, transfer_delay=transfer)
+
+
+class Transport:
+    """בחירת שכבת התעבורה: live, record או replay (ברירות מחדל מ-SPORT5_TRANSPORT*)"""
+
+    def __init__(self, mode: Optional[str] = None, archive: Optional[str] = None, timing: Optional[float] = None):
+        self.mode = (mode or os.getenv("SPORT5_TRANSPORT", "live")).lower()
+        if self.mode not in MODES:
+            logger.warning(f"שכבת תעבורה לא מוכרת '{self.mode}' - משתמשים ב-live")
+            self.mode = "live"
+        self.archive = ReplayArchive(archive or os.getenv("SPORT5_TRANSPORT_ARCHIVE") or DEFAULT_ARCHIVE)
+        self.timing = timing if timing is not None else float(os.getenv("SPORT5_REPLAY_TIMING", "0"))
+        self.recorded = 0
+        self.replayed = 0
+        self.misses = 0
+
+    def wrap(self, session: aiohttp.ClientSession):
+        """הסשן כמו שהוא (live), או עטיפה שמקליטה / משמיעה"""
+        if self.mode == "record":
+            return RecordingSession(session, self)
+        if self.mode == "replay":
+            return ReplaySession(session, self)
+        return session
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "mode": self.mode,
+            "archive": self.archive.path if self.mode != "live" else None,
+            "recorded": self.recorded,
+            "replayed": self.replayed,
+            "misses": self.misses,
+        }
+
+
+_default_transport: Optional[Transport] = None
+
+
+def default_transport() -> Transport:
+    """שכבת התעבורה המשותפת לכל הקליינטים בתהליך"""
+    global _default_transport
+    if _default_transport is None:
+        _default_transport = Transport()
+    return _default_transport
+
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=["info"])
+    parser.add_argument("archive")
+    args = parser.parse_args()
+
+    archive = ReplayArchive(args.archive)
+    entries = archive.entries()
+    summary: Dict[Tuple[str, str], Dict[str, Any]] = {}
+    for meta in entries:
+        item = summary.setdefault((meta["method"], meta["key"]), {"count": 0, "statuses": set(), "bytes": 0, "ms": []})
+        item["count"] += 1
+        item["statuses"].add(meta["status"])
+        item["bytes"] += len(archive.body(meta)) if meta["length"] else 0
+        item["ms"].append(meta.get("elapsed_ms", 0))
+    print(f"{len(entries)} הקלטות ב-{archive.path} ({os.path.getsize(archive.path) // 1024} KiB על הדיסק)")
+    for (method, key), item in sorted(summary.items(), key=lambda pair: -pair[1]["count"]):
+        statuses = ",".join(map(str, sorted(item["statuses"])))
+        print(f"{item['count']:>6}  {method:<5} {key:<40} {statuses:<8} {item['bytes'] // 1024:>8} KiB  "
+              f"median {sorted(item['ms'])[len(item['ms']) // 2]:.1f} ms")
+    archive.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -5,7 +5,50 @@ Test script for Sport5 Fantasy MCP Server
 
 import sys
 import asyncio
-from sport5_mcp_google import app, Sport5FantasyClient, GoogleOAuthHandler
+import io
+import json
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta
+from aiohttp import web
+import sport5_mcp_google as server
+from sport5_mcp_google import app, handle_call_tool, Sport5FantasyClient, Sport5SessionPool, GoogleOAuthHandler
+from sport5_metrics import metrics
+from sport5_parser_pool import ParserPool
+from sport5_session_store import SessionStore
+from sport5_snapshots import SnapshotStore
+from sport5_players import PlayerCatalog
+from sport5_standin import Sport5StandIn, synthetic_league_page, synthetic_players_page, synthetic_team_page
+from sport5_format import parse_amount, serialize, to_columnar
+from sport5_history import HistoryStore
+from sport5_outbound import OutboundPolicy, TokenBucket
+from sport5_prefetch import GameweekCalendar, PrefetchScheduler
+from sport5_transport import Transport
+from bench_optimizer import check_quality
+from bench_startup import DEFAULT_BUDGET_MS, measure_handshake, measure_imports
+from sport5_extract import (
+    LeagueTableStream, PlayerListStream, feed_stream, parse_csrf_token, parse_league_table, parse_league_window,
+    parse_my_team, parse_player_list,
+)
+
+TEAM_PAGE = """
+<html><body>
+  <h2 class="Team-Name">הפועל ספסל</h2>
+  <span class="budget">3.5M</span>
+  <span class="total-points">812</span>
+  <div class="player"><span class="name">שחקן א</span><span class="price">7.5M</span></div>
+  <div class="player"><span class="name">שחקן ב</span></div>
+</body></html>
+"""
+
+LEAGUE_PAGE = """
+<html><body><table class="league-table">
+  <tr><th>#</th><th>קבוצה</th><th>נקודות</th></tr>
+  <tr><td>1</td><td>הפועל ספסל</td><td>812</td></tr>
+  <tr><td>2</td><td>מכבי כורסה</td><td>790</td></tr>
+</table></body></html>
+"""
 
 async def test_server_initialization():
     """Test server components can be initialized"""
@@ -44,6 +87,1129 @@ async def test_server_initialization():
         return False
     
     print("\n🎉 All server components initialized successfully!")
+    return True
+
+async def test_extraction():
+    """Test the lxml extraction engine on sample pages"""
+    print("\nTesting HTML extraction...")
+    
+    team = parse_my_team(TEAM_PAGE)
+    expected_team = {
+        "players": [
+            {"name": "שחקן א", "price": "7.5M"},
+            {"name": "שחקן ב", "price": None},
+        ],
+        "budget": "3.5M",
+        "points": "812",
+        "team_name": "הפועל ספסל",
+        "captain": None,
+    }
+    if team != expected_team:
+        print(f"❌ parse_my_team returned {team}")
+        return False
+    print("✅ parse_my_team extracted team name, players, budget and points")
+    
+    league = parse_league_table(LEAGUE_PAGE.encode("utf-8"))
+    if [t["team_name"] for t in league["teams"]] != ["הפועל ספסל", "מכבי כורסה"]:
+        print(f"❌ parse_league_table returned {league}")
+        return False
+    print("✅ parse_league_table extracted league rows")
+    
+    window = parse_league_window(LEAGUE_PAGE, offset=1, limit=5)
+    around = parse_league_window(LEAGUE_PAGE, limit=1, team_name="מכבי כורסה")
+    if window["teams"] != league["teams"][1:] or window["has_more"] or around["my_team_index"] != 1:
+        print(f"❌ parse_league_window returned {window} / {around}")
+        return False
+    print("✅ parse_league_window streamed the requested window")
+    
+    if parse_csrf_token('<form><input name="_token" value="abc"></form>') != "abc":
+        print("❌ parse_csrf_token did not find the token")
+        return False
+    print("✅ parse_csrf_token found the CSRF token")
+    
+    return True
+
+async def start_fake_site(pages, delay=0):
+    """Serve the given {path: html} pages locally with ETag support"""
+    requests = []
+    
+    async def handler(request):
+        requests.append((request.path_qs, request.headers.get("If-None-Match")))
+        await asyncio.sleep(delay)
+        page = pages[request.path_qs if request.path_qs in pages else request.path]
+        etag = f'"{hash(page) & 0xffffffff:x}"'
+        if request.headers.get("If-None-Match") == etag:
+            return web.Response(status=304, headers={"ETag": etag})
+        return web.Response(text=page, content_type="text/html", headers={"ETag": etag})
+    
+    site_app = web.Application()
+    for path in {path.split("?")[0] for path in pages}:
+        site_app.router.add_get(path, handler)
+    runner = web.AppRunner(site_app, access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, f"http://localhost:{port}", requests
+
+async def test_cache():
+    """Test TTL caching and conditional revalidation"""
+    print("\nTesting response cache...")
+    
+    runner, base_url, requests = await start_fake_site({"/my-team": TEAM_PAGE})
+    client = Sport5FantasyClient(cache_ttl=60, cache_stale_ttl=0)
+    await client.__aenter__()
+    client.base_url = base_url
+    client.logged_in = True
+    
+    try:
+        first = await client.get_my_team()
+        second = await client.get_my_team()
+        if first != second or len(requests) != 1:
+            print(f"❌ Second call should be a cache hit (requests: {requests})")
+            return False
+        print("✅ Repeated get_my_team served from cache")
+        
+        await client.get_my_team(fresh=True)
+        if len(requests) != 2 or requests[-1][1] is None:
+            print(f"❌ fresh=True should send a conditional GET (requests: {requests})")
+            return False
+        stats = client.cache_stats()
+        if stats["hits"] != 1 or stats["not_modified"] != 1:
+            print(f"❌ Unexpected cache counters: {stats}")
+            return False
+        print("✅ fresh=True revalidated with If-None-Match and got 304")
+    finally:
+        await client.__aexit__(None, None, None)
+        await runner.cleanup()
+    
+    return True
+
+async def test_dashboard():
+    """Test concurrent dashboard fetch with a failing section"""
+    print("\nTesting dashboard...")
+    
+    runner, base_url, requests = await start_fake_site({"/my-team": TEAM_PAGE}, delay=0.3)
+    client = Sport5FantasyClient()
+    await client.__aenter__()
+    client.base_url = base_url
+    client.logged_in = True
+    
+    try:
+        client.dashboard_pages = dict(client.dashboard_pages, team_again=("/my-team?again", parse_my_team))
+        dashboard = await client.get_dashboard()
+        if dashboard["my_team"]["team_name"] != "הפועל ספסל" or dashboard["team_again"] is None:
+            print(f"❌ Dashboard is missing the team section: {dashboard}")
+            return False
+        if dashboard["league"] is not None or "league" not in dashboard.get("errors", {}):
+            print(f"❌ Failing league page should be reported per section: {dashboard}")
+            return False
+        if dashboard["elapsed_ms"] >= 600:
+            print(f"❌ Pages were not fetched concurrently ({dashboard['elapsed_ms']} ms)")
+            return False
+        print(f"✅ Dashboard fetched {len(requests)} pages concurrently in {dashboard['elapsed_ms']} ms with partial errors")
+    finally:
+        await client.__aexit__(None, None, None)
+        await runner.cleanup()
+    
+    return True
+
+async def test_session_pool():
+    """Test per-account sessions over a shared connector with LRU eviction"""
+    print("\nTesting session pool...")
+    
+    pool = Sport5SessionPool(max_sessions=2, idle_timeout=60)
+    try:
+        first = await pool.create("a")
+        second = await pool.create("b")
+        if first.session.connector is not second.session.connector or first.session is second.session:
+            print("❌ Accounts should share one connector but have separate sessions")
+            return False
+        print("✅ Accounts share one TCPConnector with separate sessions")
+        
+        await pool.get("a")  # "b" is now least recently used
+        await pool.create("c")
+        if pool.accounts() != ["a", "c"] or second.session is not None:
+            print(f"❌ LRU account should be evicted and closed (accounts: {pool.accounts()})")
+            return False
+        
+        replaced = await pool.create("a")
+        if first.session is not None or replaced is first:
+            print("❌ Re-login should close the previous session of the account")
+            return False
+        print("✅ Evicted and replaced sessions are closed deterministically")
+    finally:
+        await pool.close_all()
+    
+    return True
+
+async def start_login_site():
+    """Serve a site whose /my-team requires a session cookie set by POST /login"""
+    logins = []
+    
+    async def login_page(request):
+        return web.Response(text='<form><input name="_token" value="csrf"></form>', content_type="text/html")
+    
+    async def do_login(request):
+        form = await request.post()
+        if form.get("_token") != "csrf" or form.get("password") != "secret":
+            return web.Response(text="<p>שגיאה</p>", content_type="text/html")
+        logins.append(form.get("email"))
+        response = web.HTTPFound("/my-team")
+        response.set_cookie("sid", f"session-{len(logins)}")
+        raise response
+    
+    async def my_team(request):
+        if request.cookies.get("sid") != f"session-{len(logins)}":
+            raise web.HTTPFound("/login")
+        return web.Response(text=TEAM_PAGE, content_type="text/html")
+    
+    site_app = web.Application()
+    site_app.router.add_get("/login", login_page)
+    site_app.router.add_post("/login", do_login)
+    site_app.router.add_get("/my-team", my_team)
+    runner = web.AppRunner(site_app, access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, f"http://localhost:{port}", logins
+
+async def test_persistent_session():
+    """Test encrypted session persistence, probing and transparent re-login"""
+    print("\nTesting persistent sessions...")
+    
+    if SessionStore("~/sessions").directory != os.path.join(os.path.expanduser("~"), "sessions"):
+        print("❌ A ~ in the session directory should expand to the home directory, not ./~")
+        return False
+    
+    runner, base_url, logins = await start_login_site()
+    with tempfile.TemporaryDirectory() as directory:
+        store = SessionStore(directory)
+        pool = Sport5SessionPool(session_store=store)
+        try:
+            client = await pool.create("a")
+            client.base_url = base_url
+            result = await client.ensure_login("me@example.com", "secret")
+            if not result["success"] or logins != ["me@example.com"]:
+                print(f"❌ Login against the local site failed: {result}")
+                return False
+            await pool.close_all()
+            
+            # "Restart": a new pool restores the cookies and skips the login round trips
+            pool = Sport5SessionPool(session_store=SessionStore(directory))
+            restored = await pool.get("a")
+            if restored is None or not restored.logged_in:
+                print("❌ Saved session was not restored")
+                return False
+            restored.base_url = base_url
+            result = await restored.ensure_login("me@example.com", "secret")
+            if not result["success"] or len(logins) != 1:
+                print(f"❌ Valid restored session should skip re-login (logins: {logins})")
+                return False
+            print("✅ Encrypted session restored and validated with a probe instead of a login")
+            
+            # Session expires on the site: the next fetch re-logs in transparently
+            logins.append("elsewhere")
+            team = await restored.get_my_team(fresh=True)
+            if team.get("team_name") != "הפועל ספסל" or logins[-1] != "me@example.com":
+                print(f"❌ Expired session should re-login transparently: {team}")
+                return False
+            print("✅ Redirect to /login triggered a transparent re-login")
+        finally:
+            await pool.close_all()
+            await runner.cleanup()
+    
+    return True
+
+async def test_snapshots():
+    """Test that get_changes reports only rank moves, transfers and price changes"""
+    print("\nTesting snapshots and changes...")
+    
+    pages = {"/my-team": TEAM_PAGE, "/league": LEAGUE_PAGE}
+    runner, base_url, _ = await start_fake_site(pages)
+    client = Sport5FantasyClient(account="test", snapshot_store=SnapshotStore(tempfile.mkdtemp()))
+    await client.__aenter__()
+    client.base_url = base_url
+    client.logged_in = True
+    
+    try:
+        first = await client.get_changes()
+        if first["league"]["changed"] or first["my_team"]["changed"]:
+            print(f"❌ A single snapshot should have no changes: {first}")
+            return False
+        baseline = first["league"]["to"]["snapshot"]
+        
+        pages["/league"] = LEAGUE_PAGE.replace("<td>1</td><td>הפועל ספסל</td><td>812</td>", "<td>2</td><td>הפועל ספסל</td><td>815</td>") \
+                                      .replace("<td>2</td><td>מכבי כורסה</td><td>790</td>", "<td>1</td><td>מכבי כורסה</td><td>830</td>")
+        pages["/my-team"] = TEAM_PAGE.replace("7.5M", "8.0M").replace("שחקן ב", "שחקן ג")
+        changes = await client.get_changes(fresh=True)
+        
+        league = changes["league"]
+        moves = {move["team_name"]: move["change"] for move in league["rank_moves"]}
+        points = {change["team_name"]: change["change"] for change in league["point_changes"]}
+        if moves != {"מכבי כורסה": 1, "הפועל ספסל": -1} or points != {"מכבי כורסה": 40, "הפועל ספסל": 3}:
+            print(f"❌ Unexpected league changes: {league}")
+            return False
+        print("✅ League changes list rank moves and point changes")
+        
+        team = changes["my_team"]
+        if [p["name"] for p in team["transfers_in"]] != ["שחקן ג"] or \
+           [p["name"] for p in team["transfers_out"]] != ["שחקן ב"] or \
+           team["price_changes"] != [{"name": "שחקן א", "from": "7.5M", "to": "8.0M", "change": 0.5}]:
+            print(f"❌ Unexpected team changes: {team}")
+            return False
+        print("✅ Team changes list transfers and price changes")
+        
+        repeat = await client.get_changes(fresh=True)
+        if repeat["league"]["changed"] or repeat["my_team"]["changed"] \
+           or repeat["league"]["from"] != changes["league"]["to"]:
+            print(f"❌ A second call without new data should not repeat the last diff: {repeat}")
+            return False
+        print("✅ A second call without new data diffs against the snapshot served last time")
+        
+        again = await client.get_changes(since=baseline)
+        if list(again) != ["login_method", "league"] or again["league"]["counts"]["rank_moves"] != 2:
+            print(f"❌ since=<snapshot id> should compare the league against that snapshot: {again}")
+            return False
+        print("✅ since=<snapshot id> compares against an earlier snapshot")
+    finally:
+        await client.__aexit__(None, None, None)
+        await runner.cleanup()
+    
+    return True
+
+async def test_player_catalog():
+    """Test crawling the player listing into SQLite, indexed search and incremental refresh"""
+    print("\nTesting player catalogue...")
+    
+    amounts = [parse_amount(value) for value in ("7.5M", "₪ 7.5", "12,345", "812", "", None, "N/A")]
+    if amounts != [7.5, 7.5, 12345, 812, None, None, None]:
+        print(f"❌ Prices and points should parse the same way everywhere: {amounts}")
+        return False
+    
+    pages = {f"/players?page={page}": synthetic_players_page(120, page, per_page=50) for page in (1, 2, 3)}
+    runner, base_url, requests = await start_fake_site(pages)
+    catalog = PlayerCatalog(":memory:")
+    client = Sport5FantasyClient(player_catalog=catalog)
+    await client.__aenter__()
+    client.base_url = base_url
+    client.logged_in = True
+    
+    try:
+        synced = await client.sync_players()
+        if synced["added"] != 120 or synced["pages"] != 3:
+            print(f"❌ First sync should add 120 players from 3 pages: {synced}")
+            return False
+        print(f"✅ Crawled 3 pages into the catalogue in {synced['elapsed_ms']} ms")
+        
+        crawled = len(requests)
+        result = catalog.search(position="MID", max_price=9, sort_by="points", limit=5)
+        players = result["players"]
+        if len(requests) != crawled or not players or any(p["position"] != "MID" or p["price"] > 9 for p in players) \
+           or [p["points"] for p in players] != sorted((p["points"] for p in players), reverse=True):
+            print(f"❌ Unexpected search result: {result}")
+            return False
+        print(f"✅ Filtered top-5 search answered from the index in {result['query_ms']} ms")
+        
+        page = pages["/players?page=2"]
+        pages["/players?page=2"] = page.replace(">שחקן 60<", ">שחקן 60 (חדש)<")
+        refreshed = await client.sync_players()
+        if (refreshed["added"], refreshed["updated"], refreshed["removed"], refreshed["unchanged"]) != (0, 1, 0, 119):
+            print(f"❌ Refresh should update only the changed player: {refreshed}")
+            return False
+        revalidated = [etag for path, etag in requests[crawled:]]
+        if len(revalidated) != 3 or not all(revalidated):
+            print(f"❌ Refresh should revalidate every page with If-None-Match: {requests[crawled:]}")
+            return False
+        print("✅ Refresh revalidated the pages and rewrote only the changed player")
+    finally:
+        await client.__aexit__(None, None, None)
+        await runner.cleanup()
+        catalog.close()
+    
+    return True
+
+async def test_optimizer():
+    """Test the squad optimizer against brute force and the optimize_team transfer flow"""
+    print("\nTesting squad optimizer...")
+    
+    checked, mismatches = check_quality(20)
+    if mismatches:
+        print(f"❌ Optimizer differs from brute force: {mismatches}")
+        return False
+    print(f"✅ Optimal on {checked} small instances checked by brute force")
+    
+    pages = {f"/players?page={page}": synthetic_players_page(120, page, per_page=50) for page in (1, 2, 3)}
+    pages["/my-team"] = synthetic_team_page(15)
+    runner, base_url, requests = await start_fake_site(pages)
+    catalog = PlayerCatalog(":memory:")
+    client = Sport5FantasyClient(player_catalog=catalog)
+    await client.__aenter__()
+    client.base_url = base_url
+    client.logged_in = True
+    
+    try:
+        await client.sync_players()
+        result = await client.optimize_team(mode="transfers", max_transfers=3)
+        if "error" in result:
+            print(f"❌ optimize_team failed: {result}")
+            return False
+        squad = result["squad"]
+        clubs = [p["club"] for p in squad]
+        owned = {f"שחקן {i}" for i in range(15)}
+        positions = {pos: sum(p["position"] == pos for p in squad) for pos in ("GK", "DEF", "MID", "FWD")}
+        if len(squad) != 15 or positions != {"GK": 2, "DEF": 5, "MID": 5, "FWD": 3} \
+           or max(clubs.count(club) for club in clubs) > 3 or result["total_cost"] > result["budget"] \
+           or len(result["transfers_in"]) > 3 or sum(p["name"] not in owned for p in squad) != len(result["transfers_in"]):
+            print(f"❌ Transfer plan breaks the squad rules: {result}")
+            return False
+        print(f"✅ {len(result['transfers_in'])} transfers within budget and quotas in {result['elapsed_ms']} ms "
+              f"(optimal: {result['optimal']})")
+    finally:
+        await client.__aexit__(None, None, None)
+        await runner.cleanup()
+        catalog.close()
+    
+    return True
+
+async def test_history():
+    """Test per-round history: series and aggregates over memory-mapped columns, and CSV round trip"""
+    print("\nTesting history store...")
+    
+    pages = {"/league": LEAGUE_PAGE}
+    runner, base_url, _ = await start_fake_site(pages)
+    store = HistoryStore(tempfile.mkdtemp())
+    client = Sport5FantasyClient(account="test", history_store=store)
+    await client.__aenter__()
+    client.base_url = base_url
+    client.logged_in = True
+    
+    try:
+        for points in (812, 812, 830, 851):
+            pages["/league"] = LEAGUE_PAGE.replace("<td>812</td>", f"<td>{points}</td>")
+            await client.get_league_table(fresh=True)
+    finally:
+        await client.__aexit__(None, None, None)
+        await runner.cleanup()
+    
+    series = store.query("test", "league", key="הפועל ספסל")
+    if [point["points"] for point in series["series"]] != [812, 830, 851] or series["stats"]["change"] != 39:
+        print(f"❌ Unexpected series (an unchanged table should not add a round): {series}")
+        return False
+    print(f"✅ Three rounds recorded, series answered in {series['query_ms']} ms")
+    
+    top = store.query("test", "league", aggregate="change", from_round=1, to_round=3)
+    if [group["team"] for group in top["groups"]] != ["הפועל ספסל", "מכבי כורסה"] or top["groups"][0]["change"] != 39:
+        print(f"❌ Unexpected aggregate: {top}")
+        return False
+    print("✅ Per-team change aggregated over a round range")
+    
+    exported = io.StringIO()
+    store.export_csv("test", "league", exported)
+    copy = HistoryStore(tempfile.mkdtemp())
+    copy.import_csv("test", "league", io.StringIO(exported.getvalue()))
+    if copy.query("test", "league", key="הפועל ספסל")["series"] != series["series"]:
+        print("❌ CSV round trip changed the history")
+        return False
+    print("✅ CSV export and import round-trip the history")
+    
+    # a crash in the middle of an append leaves half a line at the end of the string table
+    with open(os.path.join(copy._dir("test"), "strings.jsonl"), "ab") as f:
+        f.write('"מכבי חצ'.encode("utf-8"))
+    reopened = HistoryStore(copy.directory)
+    recovered = reopened.query("test", "league", key="הפועל ספסל")["series"]
+    reopened.append("test", "league", [{"position": 1, "team": "מכבי חצי", "points": 900}])
+    if recovered != series["series"] or reopened.query("test", "league", key="מכבי חצי")["series"][-1]["points"] != 900:
+        print(f"❌ A partial last line in the string table should be dropped, not break the history: {recovered}")
+        return False
+    print("✅ A half-written string table line was truncated and appends continued")
+    
+    return True
+
+async def start_flaky_site(statuses):
+    """Serve TEAM_PAGE at /my-team after answering with the queued error statuses"""
+    requests = []
+    
+    async def my_team(request):
+        requests.append(request.path)
+        if statuses:
+            return web.Response(status=statuses.pop(0), headers={"Retry-After": "0"})
+        await asyncio.sleep(0.2)
+        return web.Response(text=TEAM_PAGE, content_type="text/html")
+    
+    site_app = web.Application()
+    site_app.router.add_get("/my-team", my_team)
+    runner = web.AppRunner(site_app, access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, f"http://localhost:{port}", requests
+
+async def test_outbound():
+    """Test request coalescing, retries, the circuit breaker and the token bucket"""
+    print("\nTesting outbound requests...")
+    
+    statuses = []
+    runner, base_url, requests = await start_flaky_site(statuses)
+    policy = OutboundPolicy(rate=0, attempts=3, backoff=0.01, breaker_threshold=3, breaker_reset=60)
+    client = Sport5FantasyClient(outbound=policy)
+    await client.__aenter__()
+    client.base_url = base_url
+    client.logged_in = True
+    
+    try:
+        results = await asyncio.gather(*(client.get_my_team(fresh=True) for _ in range(5)))
+        if len(requests) != 1 or any(result != results[0] for result in results) or client.cache_stats()["coalesced"] != 4:
+            print(f"❌ Concurrent identical fetches should share one request (requests: {requests})")
+            return False
+        print("✅ Five concurrent get_my_team calls shared one upstream request")
+        
+        statuses.extend([503, 429])
+        requests.clear()
+        result = await client.get_my_team(fresh=True)
+        if len(requests) != 3 or result.get("team_name") != "הפועל ספסל":
+            print(f"❌ 503 and 429 should be retried until the page loads (requests: {requests}, result: {result})")
+            return False
+        print("✅ Transient 503/429 answers were retried with backoff")
+        
+        statuses.extend([503] * 10)
+        requests.clear()
+        stale = await client.get_my_team(fresh=True)
+        again = await client.get_my_team(fresh=True)
+        stats = client.cache_stats()
+        breaker = stats["breakers"][base_url.split("//")[1]]
+        if len(requests) != 3 or breaker["state"] != "open" or stale != result or again != result \
+           or stats["stale_on_error"] != 2:
+            print(f"❌ Open breaker should fail fast and serve the cache (requests: {requests}, stats: {stats})")
+            return False
+        print("✅ Breaker opened after repeated failures and cached data was served without new requests")
+    finally:
+        await client.__aexit__(None, None, None)
+        await runner.cleanup()
+    
+    bucket = TokenBucket(rate=50, burst=2)
+    waited = [await bucket.acquire() for _ in range(6)]
+    if waited[:2] != [0.0, 0.0] or not 0.06 <= sum(waited) <= 0.2:
+        print(f"❌ Token bucket should pass the burst and then pace requests: {waited}")
+        return False
+    print(f"✅ Token bucket passed a burst of 2 and paced the rest ({sum(waited) * 1000:.0f} ms)")
+    
+    policy = OutboundPolicy(rate=20, burst=2)
+    policy.budgets["rivals"] = 0.5
+    
+    async def ok():
+        return "ok"
+    
+    start = time.perf_counter()
+    await asyncio.gather(*(policy.send("site", ok, budget="rivals") for _ in range(4)),
+                         *(policy.send("site", ok) for _ in range(10)))
+    elapsed = time.perf_counter() - start
+    if policy.bucket("site", "rivals").rate != 10 or elapsed < 0.55 \
+       or OutboundPolicy(rate=0).bucket("site", "rivals").rate != 0:
+        print(f"❌ Rival requests should share the host bucket, not add to it ({elapsed * 1000:.0f} ms for 14 at 20/s)")
+        return False
+    print(f"✅ Rival fan-out took a share of the host bucket: 14 requests at 20/s took {elapsed * 1000:.0f} ms")
+    
+    return True
+
+async def start_fake_google(expires_in):
+    """Serve a token endpoint and a userinfo endpoint that only accepts the latest access token"""
+    calls = []
+    
+    async def token(request):
+        form = await request.post()
+        calls.append(form.get("grant_type"))
+        if form.get("grant_type") == "refresh_token" and form.get("refresh_token") != "refresh-1":
+            return web.json_response({"error": "invalid_grant"}, status=400)
+        payload = {"access_token": f"access-{len(calls)}", "expires_in": expires_in[0]}
+        if form.get("grant_type") == "authorization_code":
+            payload["refresh_token"] = "refresh-1"
+        return web.json_response(payload)
+    
+    async def userinfo(request):
+        calls.append("userinfo")
+        return web.json_response({"email": "fan@example.com", "name": "אוהד", "token": request.headers["Authorization"]})
+    
+    site_app = web.Application()
+    site_app.router.add_post("/token", token)
+    site_app.router.add_get("/userinfo", userinfo)
+    runner = web.AppRunner(site_app, access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, f"http://localhost:{port}", calls
+
+async def test_oauth_tokens():
+    """Test code exchange, persisted tokens, cached userinfo and background refresh"""
+    print("\nTesting Google OAuth tokens...")
+    
+    expires_in = [3600]
+    runner, base_url, calls = await start_fake_google(expires_in)
+    store = SessionStore(tempfile.mkdtemp())
+    
+    def handler():
+        oauth = GoogleOAuthHandler("id", "secret", token_store=store)
+        oauth.tokens.token_url = f"{base_url}/token"
+        oauth.tokens.userinfo_url = f"{base_url}/userinfo"
+        return oauth
+    
+    first = handler()
+    second = handler()
+    try:
+        first.generate_auth_url()
+        first.account = "fan"
+        result = await first.handle_callback("code", first.state)
+        replay = await first.handle_callback("code", "")
+        session = first.tokens.session
+        if not result["success"] or replay["success"] or calls != ["authorization_code", "userinfo"]:
+            print(f"❌ Callback should exchange the code and fetch userinfo once: {result} / {calls}")
+            return False
+        print("✅ Callback exchanged the code and cached userinfo")
+        
+        # a restarted server reads the encrypted tokens instead of sending the user through the browser again
+        user = await second.cached_user("fan")
+        if user != result["user"] or len(calls) != 2:
+            print(f"❌ Stored token and userinfo should be reused without network calls: {user} / {calls}")
+            return False
+        print("✅ Restarted handler reused the stored token and userinfo without network calls")
+        
+        expires_in[0] = 1
+        second.tokens.refresh_margin = 0.8
+        await second.tokens.refresh("fan", force=True)
+        await asyncio.sleep(0.5)
+        token = await second.tokens.access_token("fan")
+        refreshes = calls.count("refresh_token")
+        if refreshes < 2 or token != f"access-{len(calls)}" or first.tokens.session is not session:
+            print(f"❌ Token should be refreshed in the background before it expires: {token} / {calls}")
+            return False
+        print(f"✅ Token refreshed {refreshes} times in the background over one pooled session")
+    finally:
+        await first.close()
+        await second.close()
+        await runner.cleanup()
+    
+    return True
+
+async def test_prefetch():
+    """Test calendar phases, learned live hours and the budgeted background prefetch"""
+    print("\nTesting prefetch scheduler...")
+    
+    now = time.time()
+    calendar = GameweekCalendar([{"deadline": now + 7200, "kickoffs": [now + 10800]}], deadline_window=3600)
+    phases = [calendar.phase(now + offset) for offset in (0, 4000, 11000, 20000)]
+    if phases != ["idle", "deadline", "live", "idle"] or calendar.next_change(now) != now + 3600:
+        print(f"❌ Unexpected calendar phases: {phases}")
+        return False
+    learned = GameweekCalendar()
+    kickoff = datetime(2026, 1, 5, 20, 30)
+    learned.learn([(kickoff + timedelta(days=days)).timestamp() for days in (0, 3, 7)])
+    if learned.phase((kickoff + timedelta(days=14)).timestamp()) != "live" \
+       or learned.phase((kickoff + timedelta(days=17)).timestamp()) != "idle":
+        print(f"❌ Hours with changes in two different weeks should be learned as live: {learned.learned_hours}")
+        return False
+    print("✅ Calendar phases from deadlines, kickoffs and learned change times")
+    
+    runner, base_url, requests = await start_fake_site({"/my-team": TEAM_PAGE, "/league": LEAGUE_PAGE})
+    pool = Sport5SessionPool(max_sessions=2)
+    try:
+        client = await pool.create("fan")
+        client.base_url = base_url
+        client.logged_in = True
+        client.cache_ttl = 0.05
+        scheduler = PrefetchScheduler(pool, calendar, budget=3, lead=30)
+        
+        ran = await scheduler.run_once(now)
+        await asyncio.sleep(0.1)
+        team = await client.get_my_team()
+        if len(ran) != 2 or len(requests) != 2 or client.cache_stats()["hits"] != 1 or "error" in team:
+            print(f"❌ Prefetched pages should stay fresh past the cache TTL (ran: {ran}, requests: {requests})")
+            return False
+        print("✅ Prefetched team and league answered from the cache after the TTL")
+        
+        # just before the deadline window opens both jobs are due again, but the budget only allows one
+        ran = await scheduler.run_once(now + 3570)
+        stats = scheduler.stats(now + 3570)
+        if len(ran) != 1 or stats["deferred"] != 1 or stats["unchanged"] != 1 or stats["spent_last_hour"] != 3:
+            print(f"❌ Refresh ahead of the window should stay within the budget: {stats}")
+            return False
+        print("✅ Refreshed ahead of the deadline window within the request budget")
+        
+        # without a cached ETag the refetch is a full 200 with a new dict but the same table
+        client.clear_cache()
+        changed, _ = await scheduler._run_job(client, "league", scheduler._jobs[("fan", "league")])
+        if changed or calendar._observed:
+            print(f"❌ An identical refetch should not count as a change: {changed}, {calendar._observed}")
+            return False
+        print("✅ An identical 200 refetch kept the backoff and taught the calendar nothing")
+    finally:
+        await pool.close_all()
+        await runner.cleanup()
+    
+    return True
+
+async def test_streaming():
+    """Test incremental parsers, early stop of windowed downloads and the body size limit"""
+    print("\nTesting streaming downloads...")
+    
+    league = synthetic_league_page(2000, 1000).encode("utf-8")
+    players = synthetic_players_page(600, 2).encode("utf-8")
+    if feed_stream(LeagueTableStream(), league, chunk_size=7) != parse_league_table(league) \
+       or feed_stream(PlayerListStream(), players, chunk_size=7) != parse_player_list(players):
+        print("❌ Incremental parsers should match the whole-page parsers for any chunk size")
+        return False
+    print("✅ Incremental league and player parsers match the whole-page parsers")
+    
+    page = synthetic_league_page(50000)
+    runner, base_url, _ = await start_fake_site({"/league": page})
+    client = Sport5FantasyClient()
+    await client.__aenter__()
+    client.base_url = base_url
+    client.logged_in = True
+    
+    try:
+        window = await client.get_league_table(fresh=True, limit=10)
+        read = max(series["max_bytes"] for series in metrics.snapshot()["histograms"]["sport5_response_bytes"]
+                   if series["labels"] == {"path": "/league"})
+        if [team["position"] for team in window["teams"]] != [str(i) for i in range(1, 11)] or read * 10 > len(page):
+            print(f"❌ A top-10 window should stop the download early (read {read} of {len(page)} bytes)")
+            return False
+        print(f"✅ Top-10 window parsed after reading {read // 1024} KiB of a {len(page) // 1024} KiB page")
+        
+        def phase_ms():
+            histograms = metrics.snapshot()["histograms"]
+            return sum(series["count"] * series["avg_ms"]
+                       for name, labels in (("sport5_http_phase_seconds", {"path": "/league", "phase": "body"}),
+                                            ("sport5_parse_seconds", {"page": "/league"}))
+                       for series in histograms.get(name, []) if series["labels"] == labels)
+        
+        before = phase_ms()
+        start = time.perf_counter()
+        await client.get_league_table(fresh=True)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        spent_ms = phase_ms() - before
+        if spent_ms > elapsed_ms * 1.05 + 1:
+            print(f"❌ Body and parse phases should not overlap: {spent_ms:.1f} ms recorded in {elapsed_ms:.1f} ms")
+            return False
+        print(f"✅ Body download and parse recorded separately ({spent_ms:.0f} of {elapsed_ms:.0f} ms)")
+        
+        client.cache_max_entries = 3
+        for offset in range(0, 50, 10):
+            await client.get_league_table(offset=offset, limit=10)
+        stats = client.cache_stats()
+        if stats["entries"] != 3 or stats["evicted"] < 2:
+            print(f"❌ League windows should be bounded by the cache size: {stats}")
+            return False
+        print(f"✅ Five league windows kept within a 3-entry LRU cache ({stats['evicted']} evicted)")
+        client.clear_cache()  # no ETag: the size check below must download the page again
+        
+        client.max_body_bytes = 100 * 1024
+        result = await client.get_league_table(fresh=True)
+        if "error" not in result:
+            print("❌ A page larger than max_body_bytes should be rejected")
+            return False
+        print("✅ Pages larger than max_body_bytes are rejected")
+    finally:
+        await client.__aexit__(None, None, None)
+        await runner.cleanup()
+    
+    return True
+
+async def test_analyze_league():
+    """Test bulk rival squad fetching, per-gameweek caching and the ownership statistics"""
+    print("\nTesting league analysis...")
+    
+    standin = Sport5StandIn(league_rows=500, latency_ms=20, require_login=False)
+    base_url = await standin.start()
+    client = Sport5FantasyClient(outbound=OutboundPolicy(rate=0))
+    await client.__aenter__()
+    client.base_url = base_url
+    client.logged_in = True
+    progress = []
+    
+    async def on_progress(done, total):
+        progress.append((done, total))
+    
+    try:
+        result = await client.analyze_league(gameweek="gw1", progress=on_progress)
+        fetched = sum(count for name, count in standin.requests.items() if name.startswith("GET /team/"))
+        if result.get("teams_analyzed") != 499 or fetched != 499 or progress[-1] != (499, 499) \
+           or [done for done, _ in progress] != sorted(done for done, _ in progress):
+            print(f"❌ Every rival squad should be fetched once with progress: {fetched} fetched, {progress[-3:]}, "
+                  f"{ {key: result.get(key) for key in ('teams_analyzed', 'error', 'errors')} }")
+            return False
+        print(f"✅ Analyzed 499 rival squads ({standin.latency_ms:.0f} ms latency each) in {result['elapsed_ms']} ms")
+        
+        squads = [parse_my_team(synthetic_team_page(15, seed=n, pool=600)) for n in range(1, 501) if n != 250]
+        owners = sum(any(p["name"] == "שחקן 0" for p in squad["players"]) for squad in squads)
+        captains = sum(squad["captain"] == "שחקן 0" for squad in squads)
+        top = result["most_owned"][0]
+        if top["name"] != "שחקן 0" or (top["owned_by"], top["captained_by"]) != (owners, captains) \
+           or top["effective_ownership_pct"] != round((owners + captains) * 100 / 499, 1):
+            print(f"❌ Ownership counts differ from a direct count ({owners}, {captains}): {top}")
+            return False
+        mine = {f"שחקן {i}" for i in range(15)}
+        if {p["name"] for p in result["my_differentials"]} != mine or any(p["name"] in mine for p in result["threats"]):
+            print(f"❌ Differentials should cover my squad and threats should exclude it: {result['threats'][:3]}")
+            return False
+        print(f"✅ Most owned {top['name']}: {top['ownership_pct']}% owned, {top['captaincy_pct']}% captain")
+        
+        again = await client.analyze_league(gameweek="gw1")
+        refetched = sum(count for name, count in standin.requests.items() if name.startswith("GET /team/")) - fetched
+        if refetched or again["from_cache"] != 499 or again["most_owned"] != result["most_owned"]:
+            print(f"❌ The same gameweek should reuse the cached squads ({refetched} refetched)")
+            return False
+        print(f"✅ Repeat analysis in the same gameweek answered from the squad cache in {again['elapsed_ms']} ms")
+        
+        client.rival_cache_size = 100
+        bounded = await client.analyze_league(gameweek="gw2", limit=150)
+        if bounded.get("teams_analyzed") != 150 or len(client._rival_squads["squads"]) != 100 \
+           or any("/team/" in key for key in client.cache):
+            print(f"❌ Rival squads should live only in the bounded squad cache: "
+                  f"{len(client._rival_squads['squads'])} kept, {len(client.cache)} page cache entries")
+            return False
+        print("✅ Rival squads stayed out of the page cache and the squad cache kept its bound")
+    finally:
+        await client.__aexit__(None, None, None)
+        await standin.stop()
+    
+    return True
+
+class RecordingSession:
+    """Stands in for an MCP ServerSession and records resource update notifications"""
+    
+    def __init__(self):
+        self.updated = []
+    
+    async def send_resource_updated(self, uri):
+        self.updated.append(str(uri))
+
+async def test_resources():
+    """Test MCP resources: reading through the cache and update notifications only on content changes"""
+    print("\nTesting MCP resources...")
+    
+    pages = {"/league": LEAGUE_PAGE, "/my-team": TEAM_PAGE}
+    runner, base_url, requests = await start_fake_site(pages)
+    catalog = PlayerCatalog(":memory:")
+    pool = Sport5SessionPool(session_store=None, player_catalog=catalog, on_update=server.publish_resources)
+    saved_pool, saved_catalog, saved_hub = server.session_pool, server.player_catalog, server.resource_hub
+    server.session_pool, server.player_catalog, server.resource_hub = pool, catalog, server.ResourceHub()
+    hub = server.resource_hub
+    session = RecordingSession()
+    
+    try:
+        client = await pool.create(server.DEFAULT_ACCOUNT)
+        client.base_url = base_url
+        client.logged_in = True
+        
+        uris = [str(resource.uri) for resource in await server.handle_list_resources()]
+        if uris != ["sport5://my-team", "sport5://league"]:
+            print(f"❌ Unexpected resource list: {uris}")
+            return False
+        
+        league = json.loads(await server.handle_read_resource("sport5://league"))
+        fetched = len(requests)
+        await server.handle_read_resource("sport5://league")
+        if [team["team_name"] for team in league["teams"]] != ["הפועל ספסל", "מכבי כורסה"] or len(requests) != fetched:
+            print(f"❌ Resource reads should come from the page cache: {league}, {requests}")
+            return False
+        print("✅ sport5://league is read through the page cache")
+        
+        hub.subscribe("sport5://league", session)
+        await client.get_league_table(fresh=True)
+        if session.updated:
+            print(f"❌ A refresh with the same content should not notify: {session.updated}")
+            return False
+        pages["/league"] = LEAGUE_PAGE.replace("790", "801")
+        await client.get_league_table(fresh=True)
+        await client.get_league_table(fresh=True)
+        if session.updated != ["sport5://league"]:
+            print(f"❌ A changed league should notify once: {session.updated}")
+            return False
+        print("✅ Subscribers are notified once when the league content changes, not on every refresh")
+        
+        await asyncio.to_thread(catalog.sync, [{"id": "7", "name": "שחקן 7", "price": "6.5M", "points": "40"}])
+        uri = server.player_uri("7")
+        hub.subscribe(uri, session)
+        hub.baseline(uri, json.loads(await server.handle_read_resource(uri)))
+        await server.publish_resources(server.DEFAULT_ACCOUNT, "players", {})
+        await asyncio.to_thread(catalog.sync, [{"id": "7", "name": "שחקן 7", "price": "7.0M", "points": "40"}])
+        await server.publish_resources(server.DEFAULT_ACCOUNT, "players", {})
+        hub.unsubscribe("sport5://league", session)
+        pages["/league"] = LEAGUE_PAGE
+        await client.get_league_table(fresh=True)
+        if session.updated != ["sport5://league", uri]:
+            print(f"❌ Only the repriced player should notify, and not after unsubscribing: {session.updated}")
+            return False
+        print("✅ Player resources notify on catalogue changes; unsubscribed URIs stay quiet")
+    finally:
+        await pool.close_all()
+        server.session_pool, server.player_catalog, server.resource_hub = saved_pool, saved_catalog, saved_hub
+        await runner.cleanup()
+        catalog.close()
+    
+    return True
+
+async def test_transport():
+    """Test recording a session against the stand-in and replaying it offline with the same results"""
+    print("\nTesting record/replay transport...")
+    
+    standin = Sport5StandIn(league_rows=2000, latency_ms=10)
+    base_url = await standin.start()
+    archive = tempfile.mktemp(suffix=".sp5")
+    
+    async def session(transport):
+        client = Sport5FantasyClient(cache_ttl=0, cache_stale_ttl=0, outbound=OutboundPolicy(rate=0),
+                                     transport=transport)
+        await client.__aenter__()
+        client.base_url = base_url
+        login = await client.login_with_credentials("fan@example.com", "hunter2-secret")
+        results = [login, await client.get_my_team(), await client.get_my_team(),
+                   await client.get_league_table(limit=20), await client.get_league_table()]
+        return client, results
+    
+    recorder = Transport("record", archive)
+    client, recorded = await session(recorder)
+    revalidated = client.cache_counters["not_modified"]
+    await client.__aexit__(None, None, None)
+    await standin.stop()
+    if not recorded[0].get("success") or revalidated != 1 or any("error" in r for r in recorded[1:]):
+        print(f"❌ Recording against the stand-in failed: {recorded[0]}, {revalidated} revalidations")
+        return False
+    
+    with open(archive, "rb") as f:
+        raw = f.read()
+    leaked = [secret for secret in (b"hunter2-secret", b"fan@example.com", b"sport5_standin_session") if secret in raw]
+    if leaked:
+        print(f"❌ The archive should not contain credentials or cookies: {leaked}")
+        return False
+    print(f"✅ Recorded {recorder.recorded} exchanges ({len(raw) // 1024} KiB) without cookies or credentials")
+    
+    # the stand-in is gone: every answer has to come from the archive
+    player = timed = Transport("replay", archive)
+    requests_before = sum(standin.requests.values())
+    try:
+        client, replayed = await session(player)
+        if replayed != recorded or client.cache_counters["not_modified"] != 1 \
+           or sum(standin.requests.values()) != requests_before:
+            print(f"❌ Replay should reproduce the recorded results and the 304: {client.cache_counters}")
+            return False
+        print(f"✅ Replayed login, team and league offline with identical results and the same 304 revalidation")
+        
+        # the rival squads were never recorded
+        missing = await client.analyze_league(limit=3, gameweek="gw1")
+        if missing.get("failed") != 3 or player.stats()["misses"] != 3:
+            print(f"❌ Requests that were never recorded should fail: {missing.get('errors')}, {player.stats()}")
+            return False
+        print("✅ Requests missing from the recording fail instead of reaching the network")
+        
+        calls = 2000
+        start = time.perf_counter()
+        await asyncio.gather(*(client.get_my_team(fresh=True) for _ in range(calls)))
+        rate = calls / (time.perf_counter() - start)
+        if rate < 1000:
+            print(f"❌ Replay should serve thousands of tool calls per second, got {rate:.0f}/s")
+            return False
+        print(f"✅ Replayed {calls} fresh get_my_team calls at {rate:.0f}/s")
+        await client.__aexit__(None, None, None)
+        
+        # timing=1 reproduces the recorded latency (the stand-in's 10 ms)
+        timed = Transport("replay", archive, timing=1.0)
+        client = Sport5FantasyClient(outbound=OutboundPolicy(rate=0), transport=timed)
+        await client.__aenter__()
+        client.base_url = base_url
+        client.logged_in = True
+        start = time.perf_counter()
+        await client.get_my_team(fresh=True)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        if elapsed_ms < standin.latency_ms * 0.8:
+            print(f"❌ Timed replay should wait about the recorded latency, took {elapsed_ms:.1f} ms")
+            return False
+        print(f"✅ Timed replay reproduced the recorded latency ({elapsed_ms:.1f} ms)")
+    finally:
+        await client.__aexit__(None, None, None)
+        for transport in (recorder, player, timed):
+            transport.archive.close()
+        os.unlink(archive)
+    
+    return True
+
+async def test_metrics():
+    """Test per-phase metrics, the get_metrics tool and on-demand profiling"""
+    print("\nTesting metrics...")
+    
+    exposition = metrics.render_prometheus()
+    for series in ('sport5_http_phase_seconds_bucket{path="/my-team",phase="ttfb"', 'sport5_parse_seconds_count{page="/my-team"}'):
+        if series not in exposition:
+            print(f"❌ Missing {series} in the Prometheus output")
+            return False
+    print("✅ Network and parse phases recorded in Prometheus format")
+    
+    # analyze_league fetched hundreds of /team/<n> pages earlier in the run
+    if 'path="/team/{id}"' not in exposition or 'path="/team/1"' in exposition:
+        print("❌ Rival team paths should be labelled by route template, not one series per team")
+        return False
+    print("✅ Per-team paths collapsed to the /team/{id} route label")
+    
+    await handle_call_tool("get_metrics", {"profile_tool": "get_cache_stats"})
+    await handle_call_tool("get_cache_stats", {"account": "nobody"})
+    result = json.loads((await handle_call_tool("get_metrics", {}))[0].text)
+    errors = {tuple(c["labels"].items()): c["value"] for c in result["counters"]["sport5_tool_errors_total"]}
+    if (result["last_profile"] or {}).get("tool") != "get_cache_stats" or errors.get((("tool", "get_cache_stats"),)) != 1:
+        print(f"❌ get_metrics did not report the profile and error count: {result}")
+        return False
+    print("✅ get_metrics returned per-tool errors and a cProfile capture")
+    
+    return True
+
+async def test_parser_pool():
+    """Test that parsing on thread and process workers returns plain dicts"""
+    print("\nTesting parser pool...")
+    
+    expected = parse_my_team(TEAM_PAGE)
+    for mode in ("thread", "process"):
+        pool = ParserPool(mode, workers=2)
+        try:
+            result = await pool.run(parse_my_team, TEAM_PAGE.encode("utf-8"), encoding="utf-8")
+        finally:
+            pool.shutdown()
+        if result != expected:
+            print(f"❌ {mode} pool returned {result}")
+            return False
+    print("✅ Thread and process workers parse raw bytes into plain dicts")
+    
+    page = synthetic_league_page(2000)
+    runner, base_url, _ = await start_fake_site({"/league": page})
+    pool = ParserPool("process", workers=2)
+    calls = {"run": 0, "run_local": 0}
+    run, run_local = pool.run, pool.run_local
+    
+    async def counted_run(*args, **kwargs):
+        calls["run"] += 1
+        return await run(*args, **kwargs)
+    
+    async def counted_run_local(*args):
+        calls["run_local"] += 1
+        return await run_local(*args)
+    
+    pool.run, pool.run_local = counted_run, counted_run_local
+    client = Sport5FantasyClient(parser_pool=pool)
+    await client.__aenter__()
+    client.base_url = base_url
+    client.logged_in = True
+    try:
+        window = await client.get_league_table(fresh=True, limit=10)
+    finally:
+        await client.__aexit__(None, None, None)
+        await runner.cleanup()
+        pool.shutdown()
+    if calls != {"run": 1, "run_local": 0} or len(window.get("teams", [])) != 10:
+        print(f"❌ Process mode should hand the whole page to a worker, not feed a stream on the loop: {calls}")
+        return False
+    print("✅ Process mode parses the whole page on a worker process instead of streaming on the event loop")
+    
+    return True
+
+async def test_output_formats():
+    """Test that compact and columnar output carry the same data in fewer bytes"""
+    print("\nTesting output formats...")
+    
+    league = parse_league_table(LEAGUE_PAGE)
+    columnar = to_columnar(league)
+    teams = columnar["teams"]
+    if teams["columns"][:3] != ["position", "team_name", "points"] or teams["rows"][0][:3] != [1, "הפועל ספסל", 812]:
+        print(f"❌ Unexpected columnar output: {columnar}")
+        return False
+    print("✅ Columnar output lists columns once and numbers as numbers")
+    
+    rows = to_columnar({"teams": [{"position": "1", "team_name": "1860", "id": "007", "points": "1,200"}]})["teams"]["rows"]
+    if rows != [[1, "1860", "007", 1200]]:
+        print(f"❌ Only numeric fields should become numbers, names and ids stay text: {rows}")
+        return False
+    print("✅ Numeric-looking team names and ids stayed text in columnar output")
+    
+    team = to_columnar({"budget": "3.5M", "players": [{"name": "א", "price": "7.5M"}, {"name": "ב", "price": "₪10"}]})
+    if team != {"budget": 3.5, "players": {"columns": ["name", "price"], "rows": [["א", 7.5], ["ב", 10]]}}:
+        print(f"❌ Prices and the budget should become numbers in columnar output: {team}")
+        return False
+    print("✅ Prices and the budget became numbers (in millions) in columnar output")
+    
+    pretty, compact = serialize(league, "pretty"), serialize(league, "compact")
+    if json.loads(compact) != json.loads(pretty) or len(compact) >= len(pretty):
+        print("❌ Compact output should match pretty output in fewer bytes")
+        return False
+    print(f"✅ Compact output: {len(compact)} bytes vs {len(pretty)} pretty")
+    
+    return True
+
+async def test_startup():
+    """Test that the server starts within the import budget and lists tools without heavy modules"""
+    print("\nTesting cold start...")
+    
+    imports = measure_imports(runs=3)
+    if imports["deferred_loaded"]:
+        print(f"❌ Loaded at startup but should be deferred: {', '.join(imports['deferred_loaded'])}")
+        return False
+    if imports["import_ms"] > DEFAULT_BUDGET_MS:
+        print(f"❌ Import took {imports['import_ms']} ms (budget {DEFAULT_BUDGET_MS:.0f} ms)")
+        return False
+    print(f"✅ Import took {imports['import_ms']} ms (budget {DEFAULT_BUDGET_MS:.0f} ms) without aiohttp, lxml or webbrowser")
+    
+    handshake = measure_handshake()
+    if "get_my_team" not in handshake["tools"]:
+        print(f"❌ tools/list returned {handshake['tools']}")
+        return False
+    print(f"✅ tools/list answered {handshake['list_tools_ms']} ms after spawning the server")
+    
+    return True
+
+async def run_all():
+    """Run all checks"""
+    if not await test_server_initialization():
+        return False
+    if not await test_extraction():
+        return False
+    if not await test_cache():
+        return False
+    if not await test_dashboard():
+        return False
+    if not await test_session_pool():
+        return False
+    if not await test_persistent_session():
+        return False
+    if not await test_snapshots():
+        return False
+    if not await test_player_catalog():
+        return False
+    if not await test_optimizer():
+        return False
+    if not await test_history():
+        return False
+    if not await test_outbound():
+        return False
+    if not await test_oauth_tokens():
+        return False
+    if not await test_prefetch():
+        return False
+    if not await test_streaming():
+        return False
+    if not await test_analyze_league():
+        return False
+    if not await test_resources():
+        return False
+    if not await test_transport():
+        return False
+    if not await test_metrics():
+        return False
+    if not await test_parser_pool():
+        return False
+    if not await test_output_formats():
+        return False
+    if not await test_startup():
+        return False
+    
     print("\nNext steps:")
     print("1. Set up Google OAuth credentials in Google Cloud Console")
     print("2. Configure Claude Desktop with the server path")
@@ -53,7 +1219,7 @@ async def test_server_initialization():
 
 if __name__ == "__main__":
     try:
-        result = asyncio.run(test_server_initialization())
+        result = asyncio.run(run_all())
         sys.exit(0 if result else 1)
     except KeyboardInterrupt:
         print("\nTest interrupted by user")